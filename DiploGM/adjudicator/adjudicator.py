@@ -58,15 +58,23 @@ def convoy_is_possible(start: Province, end: Province, check_fleet_orders=False)
     :param check_fleet_orders: if True, check that the fleets along the way are actually convoying the unit
     :return: True if there are fleets connecting start -> end
     """
-    visited: set[str] = set()
+    if start.on_same_board(end):
+        if _convoy_is_possible_on_board(start, end, check_fleet_orders):
+            return True
+        # Otherwise the only way could be through the seas of other boards
+        assert start.board is not None
+        if start.board.game is None or not start.board.game.adjacency.linked_boards(start.board):
+            return False
+
+    visited: set[int] = set()
     to_visit = collections.deque()
     to_visit.append(start)
     while 0 < len(to_visit):
         current = to_visit.popleft()
 
-        if current.longname in visited:
+        if current.key in visited:
             continue
-        visited.add(current.longname)
+        visited.add(current.key)
 
         for adjacent_province in current.adjacent:
             if adjacent_province == end:
@@ -88,8 +96,38 @@ def convoy_is_possible(start: Province, end: Province, check_fleet_orders=False)
     return False
 
 
+def _convoy_is_possible_on_board(start: Province, end: Province, check_fleet_orders: bool) -> bool:
+    # convoy_is_possible over the compiled adjacency of start's board, only passing over that board's seas
+    assert start.topology is not None and start.board is not None and start.id is not None
+    topology = start.topology
+    provinces = start.board.province_by_id
+    visited = bytearray(len(provinces))
+    visited[start.id] = 1
+    to_visit = [start.id]
+    while to_visit:
+        for adjacent_id in topology.neighbours(to_visit.pop()):
+            if adjacent_id == end.id:
+                return True
+            if visited[adjacent_id]:
+                continue
+            visited[adjacent_id] = 1
+            adjacent_province = provinces[adjacent_id]
+            if adjacent_province.type != ProvinceType.SEA:
+                continue
+            if adjacent_province.unit is None or adjacent_province.unit.unit_type != UnitType.FLEET:
+                continue
+            if check_fleet_orders:
+                fleet_order = adjacent_province.unit.order
+                if not isinstance(fleet_order, ConvoyTransport):
+                    continue
+                if fleet_order.source is not start or fleet_order.destination is not end:
+                    continue
+            to_visit.append(adjacent_id)
+    return False
+
+
 def _validate_move_army(province: Province, destination_province: Province) -> tuple[bool, str | None]:
-    if destination_province not in province.adjacent:
+    if not province.is_adjacent(destination_province):
         return False, f"{province} does not border {destination_province}"
     if destination_province.type == ProvinceType.SEA:
         return False, "Armies cannot move to sea provinces"
@@ -396,7 +434,7 @@ class RetreatsAdjudicator(Adjudicator):
         super().__init__(board)
 
     def run(self) -> Board:
-        retreats_by_destination: dict[str, set[Unit]] = {}
+        retreats_by_destination: dict[int, set[Unit]] = {}
         units_to_delete: set[Unit] = set()
         for unit in self._board.units:
             if unit != unit.province.dislodged_unit:
@@ -415,9 +453,9 @@ class RetreatsAdjudicator(Adjudicator):
                 units_to_delete.add(unit)
                 continue
 
-            if destination[0].longname not in retreats_by_destination:
-                retreats_by_destination[destination[0].longname] = set()
-            retreats_by_destination[destination[0].longname].add(unit)
+            if destination[0].key not in retreats_by_destination:
+                retreats_by_destination[destination[0].key] = set()
+            retreats_by_destination[destination[0].key].add(unit)
 
         for retreating_units in retreats_by_destination.values():
             if len(retreating_units) != 1:
@@ -475,9 +513,11 @@ class MovesAdjudicator(Adjudicator):
         super().__init__(game)
  
         self.orders: set[AdjudicableOrder] = set()
+        # The boards adjudicated; older moves boards that no orders on these involve are left as they were
+        self.boards: list[Board] = game.build_interacting_moves_boards()
 
         # run supports after everything else since illegal cores / moves should be treated as holds
-        units = sorted(game.get_moves_units(), key=lambda unit: isinstance(unit.order, Support))
+        units = sorted((unit for board in self.boards for unit in board.units), key=lambda unit: isinstance(unit.order, Support))
         for unit in units:
             # Replace invalid orders with holds
             # Importantly, this includes supports for which the corresponding unit didn't make the same move
@@ -530,19 +570,19 @@ class MovesAdjudicator(Adjudicator):
 
             self.orders.add(order)
 
-        self.orders_by_province = {order.current_province.longname: order for order in self.orders}
-        self.moves_by_destination: dict[str, set[AdjudicableOrder]] = {}
+        self.orders_by_province = {order.current_province.key: order for order in self.orders}
+        self.moves_by_destination: dict[int, set[AdjudicableOrder]] = {}
         for order in self.orders:
             if order.type == OrderType.MOVE:
-                if order.destination_province.longname not in self.moves_by_destination:
-                    self.moves_by_destination[order.destination_province.longname] = set()
-                self.moves_by_destination[order.destination_province.longname].add(order)
+                if order.destination_province.key not in self.moves_by_destination:
+                    self.moves_by_destination[order.destination_province.key] = set()
+                self.moves_by_destination[order.destination_province.key].add(order)
 
         for order in self.orders:
             if order.type == OrderType.SUPPORT and order.is_valid:
-                self.orders_by_province[order.source_province.longname].supports.add(order)
+                self.orders_by_province[order.source_province.key].supports.add(order)
             if order.type == OrderType.CONVOY and order.is_valid:
-                self.orders_by_province[order.source_province.longname].convoys.add(order)
+                self.orders_by_province[order.source_province.key].convoys.add(order)
 
         self._dependencies: list[AdjudicableOrder] = []
 
@@ -553,30 +593,34 @@ class MovesAdjudicator(Adjudicator):
             if order.type != OrderType.MOVE:
                 continue
 
-            if len(self.orders_by_province[order.source_province.longname].convoys) == 0:
+            if len(self.orders_by_province[order.source_province.key].convoys) == 0:
                 continue
 
             # According to the 1971 ruling in DATC, the army only is kidnapped if
             # 1. the army's destination is moving back at it
             # 2.  the convoy isn't disrupted
 
-            if order.destination_province.longname in self.orders_by_province:
-                attacked_order = self.orders_by_province[order.destination_province.longname]
+            if order.destination_province.key in self.orders_by_province:
+                attacked_order = self.orders_by_province[order.destination_province.key]
                 if attacked_order.destination_province == order.source_province:
                     if self._adjudicate_convoys_for_order(order) == Resolution.SUCCEEDS:
                         order.is_convoy = True
 
     def run(self) -> Game:
+        self.resolve()
+        self._update_board()
+        return self._game
+
+    def resolve(self):
+        """Resolves every order, marking failed ones, and saves them; the boards are only moved on by _update_board."""
         for order in self.orders:
             order.state = ResolutionState.UNRESOLVED
         for order in self.orders:
             self._resolve_order(order)
             order.get_original_order().hasFailed = (order.resolution == Resolution.FAILS)
         if self.save_orders:
-            for board in self._game.get_moves_boards():
+            for board in self.boards:
                 database.get_connection().save_order_for_units(board, set(o.base_unit for o in self.orders if o.base_unit.province.turn == board.turn))
-        self._update_board()
-        return self._game
 
     def _update_board(self):
         if not all(order.state == ResolutionState.RESOLVED for order in self.orders):
@@ -620,7 +664,7 @@ class MovesAdjudicator(Adjudicator):
 
         #for board in self._game.get_moves_provinces()
         #[self.game.get_board(t) for t in itertools.chain(self._games.all_turns()) if t.is_moves()]:
-        for province in self._game.get_moves_provinces():
+        for province in (province for board in self.boards for province in board.provinces):
             #board.provinces:
             if province.corer:
                 if province.half_core == province.corer:
@@ -634,7 +678,7 @@ class MovesAdjudicator(Adjudicator):
 
         contested = self._find_contested_areas()
 
-        for unit in self._game.get_moves_units():
+        for unit in (unit for board in self.boards for unit in board.units):
             unit.order = None
             if unit.retreat_options is not None:
                 unit.remove_many_retreat_options(contested)
@@ -655,8 +699,8 @@ class MovesAdjudicator(Adjudicator):
                         bounces_and_occupied.add(order.destination_province)
                 else:
                     # TODO duplicated head on code
-                    if order.destination_province.longname in self.orders_by_province:
-                        attacked_order = self.orders_by_province[order.destination_province.longname]
+                    if order.destination_province.key in self.orders_by_province:
+                        attacked_order = self.orders_by_province[order.destination_province.key]
                         if (
                             attacked_order.type == OrderType.MOVE
                             and attacked_order.destination_province == order.current_province
@@ -668,7 +712,7 @@ class MovesAdjudicator(Adjudicator):
 
                     bounces_and_occupied.add(order.destination_province)
 
-        for unit in self._game.get_moves_units():
+        for unit in (unit for board in self.boards for unit in board.units):
             bounces_and_occupied.add(unit.province)
 
         return bounces_and_occupied
@@ -677,22 +721,22 @@ class MovesAdjudicator(Adjudicator):
         # Breadth-first search to determine if there is a convoy connection for order.
         # Only considers it a success if it passes through at least one fleet to get to the destination
         assert order.type == OrderType.MOVE
-        visited: set[str] = set()
+        visited: set[int] = set()
         to_visit = collections.deque()
         to_visit.append(order.source_province)
         while 0 < len(to_visit):
             current = to_visit.popleft()
             # Have to pass through at least one convoying fleet
-            if current != order.source_province and order.destination_province in current.adjacent:
+            if current != order.source_province and current.is_adjacent(order.destination_province):
                 return Resolution.SUCCEEDS
 
-            visited.add(current.longname)
+            visited.add(current.key)
 
             adjacent_convoys = {
-                convoy_order for convoy_order in order.convoys if convoy_order.current_province in current.adjacent
+                convoy_order for convoy_order in order.convoys if current.is_adjacent(convoy_order.current_province)
             }
             for convoy in adjacent_convoys:
-                if convoy.current_province.longname in visited:
+                if convoy.current_province.key in visited:
                     continue
                 if self._resolve_order(convoy) == Resolution.SUCCEEDS:
                     to_visit.append(convoy.current_province)
@@ -704,7 +748,7 @@ class MovesAdjudicator(Adjudicator):
             return Resolution.SUCCEEDS
         elif order.type == OrderType.CORE or order.type == OrderType.SUPPORT:
             # Both these orders fail if attacked by nation, even if that order isn't successful
-            moves_here = self.moves_by_destination.get(order.current_province.longname, set()) - {order}
+            moves_here = self.moves_by_destination.get(order.current_province.key, set()) - {order}
             for move_here in moves_here:
                 # coring should fail even if the attack comes from the same nation
                 if move_here.country == order.country and order.type == OrderType.SUPPORT:
@@ -728,7 +772,7 @@ class MovesAdjudicator(Adjudicator):
                         return Resolution.FAILS
             return Resolution.SUCCEEDS
         elif order.type == OrderType.CONVOY:
-            moves_here = self.moves_by_destination.get(order.current_province.longname, set())
+            moves_here = self.moves_by_destination.get(order.current_province.key, set())
             for move_here in moves_here:
                 # see https://webdiplomacy.net/doc/DATC_v3_0.html#5.D
                 if self._adjudicate_order(move_here) == Resolution.SUCCEEDS:
@@ -746,13 +790,13 @@ class MovesAdjudicator(Adjudicator):
                 return Resolution.FAILS
 
         # X -> Z, Y -> Z scenario, prevent strength
-        orders_to_overcome = self.moves_by_destination[order.destination_province.longname] - {order}
+        orders_to_overcome = self.moves_by_destination[order.destination_province.key] - {order}
         # X -> Y, Y -> Z scenario
         attacked_order: AdjudicableOrder | None = None
 
         head_on = False
-        if order.destination_province.longname in self.orders_by_province:
-            attacked_order = self.orders_by_province[order.destination_province.longname]
+        if order.destination_province.key in self.orders_by_province:
+            attacked_order = self.orders_by_province[order.destination_province.key]
 
             if attacked_order.type == OrderType.MOVE and attacked_order.destination_province == order.current_province:
                 # only head on if not convoy
@@ -25,6 +25,12 @@ class OrderType(Enum):
 
 
 class AdjudicableOrder:
+    __slots__ = (
+        "state", "resolution", "country", "is_army", "current_province", "current_coast", "supports", "convoys", "type",
+        "destination_province", "destination_coast", "source_province", "is_convoy", "not_supportable", "is_valid",
+        "base_unit",
+    )
+
     def __init__(self, unit: Unit):
         self.state = ResolutionState.UNRESOLVED
         self.resolution = Resolution.FAILS
@@ -19,6 +19,7 @@ from DiploGM.config import (
     IMPDIP_SERVER_BOT_STATUS_CHANNEL_ID,
     EXTENSIONS_TO_LOAD_ON_STARTUP,
 )
+from DiploGM.db.async_database import get_async_connection
 from DiploGM.events.eventbus import EventBus
 from DiploGM.perms import CommandPermissionError
 from DiploGM.utils import send_message_and_file
@@ -61,9 +62,11 @@ class DiploGM(commands.Bot):
         # bind command invocation handling methods
         self.before_invoke(self.before_any_command)
         self.after_invoke(self.after_any_command)
+        self.add_check(self.load_game)
 
         current_servers = [g.id async for g in self.fetch_guilds()]
-        self.manager = Manager(board_ids=current_servers)
+        # Games are loaded when first used; this only reads which servers have one, on a database reader thread
+        self.manager = await get_async_connection().read(Manager, board_ids=current_servers)
 
         self.eventbus = EventBus()
         for module_path in DiploGM.get_all_listeners():
@@ -216,8 +219,19 @@ class DiploGM(commands.Bot):
             except Exception as e:
                 logger.warning(f"Failed to close Cog '{name}' safely: {e}")
 
+        # Writes queued by write_behind() haven't necessarily been saved yet
+        await get_async_connection().close()
+        logger.info("Flushed database writes")
+
         await super().close()
 
+    async def load_game(self, ctx: commands.Context) -> bool:
+        # As a global check this runs before every other check and the command itself, which use the game through
+        # Manager.get_game; loading it here keeps that from blocking the event loop
+        if ctx.guild is not None:
+            await self.manager.load_game(ctx.guild.id)
+        return True
+
     async def before_any_command(self, ctx: commands.Context):
         if isinstance(ctx.channel, (discord.DMChannel, discord.PartialMessageable)):
             return
@@ -1,9 +1,10 @@
+import asyncio
 import logging
 import os
 import re
 
 from discord import HTTPException, NotFound, TextChannel
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord.utils import find as discord_find
 
 from DiploGM import config
@@ -19,6 +20,34 @@ manager = Manager()
 class AdminCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # An in-memory database has nothing to back up
+        if config.DB_BACKUP_EVERY_HOURS > 0 and config.DB_BACKEND == "sqlite":
+            self.backup_database.change_interval(hours=config.DB_BACKUP_EVERY_HOURS)
+            self.backup_database.start()
+
+    async def close(self):
+        self.backup_database.cancel()
+
+    @tasks.loop(hours=24)
+    async def backup_database(self):
+        # The copy runs on a thread of its own, so commands aren't held up while it's made
+        try:
+            await asyncio.to_thread(manager.backup_database)
+        except Exception as ex:
+            # An exception would stop the loop for good; the next backup might well work
+            logger.error("Could not back up the database", exc_info=ex)
+
+    @backup_database.before_loop
+    async def before_backup_database(self):
+        await self.bot.wait_until_ready()
+
+    @commands.command(hidden=True)
+    @perms.superuser_only("back up the database")
+    async def backup_now(self, ctx: commands.Context) -> None:
+        path = await asyncio.to_thread(manager.backup_database)
+        size = path.stat().st_size / 2**20
+        log_command(logger, ctx, message=f"Backed up the database to {path}")
+        await send_message_and_file(channel=ctx.channel, message=f"Backed up the database to `{path}` ({size:.1f} MiB).")
 
     @commands.command(hidden=True)
     @perms.superuser_only("send a GM announcement")
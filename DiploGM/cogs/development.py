@@ -12,6 +12,7 @@ from DiploGM.config import (
 from DiploGM.bot import DiploGM
 from DiploGM import perms
 from DiploGM.utils import send_message_and_file
+from DiploGM.db.database import get_connection
 from DiploGM.manager import Manager
 
 logger = logging.getLogger(__name__)
@@ -22,6 +23,7 @@ class DevelopmentCog(commands.Cog):
     """
     Superuser features primarily used for Development of the bot
     .su_dashboard
+    .sql_stats
     .shutdown_the_bot_yes_i_want_to_do_this
     """
 
@@ -46,6 +48,10 @@ class DevelopmentCog(commands.Cog):
         for cog in self.bot.cogs.keys():
             cogs_body += f"- {cog}\n"
 
+        game_cache_body = ""
+        for name, value in manager.game_cache_stats().items():
+            game_cache_body += f"- {name}: {value}\n"
+
         guild = self.bot.get_guild(IMPDIP_SERVER_ID)
         bot_wizard_role = guild.get_role(IMPDIP_BOT_WIZARD_ROLE) if guild else None
         bot_wizards = bot_wizard_role.members if bot_wizard_role else []
@@ -60,10 +66,35 @@ class DevelopmentCog(commands.Cog):
         await send_message_and_file(
             channel=ctx.channel,
             title=f"DiplomacyGM Dashboard",
-            fields=[("Extensions", extensions_body), ("Loaded Cogs", cogs_body)],
+            fields=[("Extensions", extensions_body), ("Loaded Cogs", cogs_body), ("Game Cache", game_cache_body)],
             footer_content=footer,
         )
 
+    @commands.command(
+        hidden=True,
+        brief="Time spent in each SQL statement, with the query plans of the slowest",
+        description="Totals for each SQL statement since the bot started or the last `.sql_stats reset`, "
+        "with EXPLAIN QUERY PLAN for the statements that took the most time in total. "
+        "`.sql_stats reset` starts the totals over after showing them.",
+    )
+    @perms.superuser_only("show SQL statistics")
+    async def sql_stats(self, ctx: commands.Context):
+        arguments = ctx.message.content.removeprefix(f"{ctx.prefix}{ctx.invoked_with}").strip()
+        database = get_connection()
+        report = database.query_report()
+        if arguments == "reset" and database.query_stats is not None:
+            database.query_stats.reset()
+
+        # The first lines are the totals and the statements that took the most time; the rest is in the file
+        summary = "\n".join(report.splitlines()[:12])
+        await send_message_and_file(
+            channel=ctx.channel,
+            title="SQL statistics",
+            message=f"```\n{summary}\n```",
+            file=report.encode(),
+            file_name="sql_stats.txt",
+        )
+
     @commands.command(hidden=True)
     @perms.superuser_only("shutdown the bot")
     async def shutdown_the_bot_yes_i_want_to_do_this(self, ctx: commands.Context):
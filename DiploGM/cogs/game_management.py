@@ -14,7 +14,7 @@ from discord import (
     Guild,
 )
 from discord.abc import GuildChannel
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 from DiploGM import config
 from DiploGM.config import MAP_ARCHIVE_SAS_TOKEN
@@ -29,6 +29,7 @@ from DiploGM.utils import (
 )
 
 from DiploGM.perms import is_gm
+from DiploGM.db.async_database import on_database_thread, write_behind
 from DiploGM.db.database import get_connection
 from DiploGM.models.order import Disband, Build
 from DiploGM.models.player import Player
@@ -39,10 +40,33 @@ from DiploGM.manager import Manager, SEVERENCE_A_ID, SEVERENCE_B_ID
 logger = logging.getLogger(__name__)
 manager = Manager()
 
+ARCHIVE_CHECK_HOURS = 6
+
 
 class GameManagementCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        if config.GAME_ARCHIVE_AFTER_DAYS > 0:
+            self.archive_idle_games.start()
+
+    async def close(self):
+        self.archive_idle_games.cancel()
+
+    @tasks.loop(hours=ARCHIVE_CHECK_HOURS)
+    async def archive_idle_games(self):
+        # Packing games away and reclaiming the space can take seconds, which would hold up every command
+        try:
+            archived = await on_database_thread(manager.archive_idle_games, config.GAME_ARCHIVE_AFTER_DAYS)
+        except Exception as ex:
+            # An exception would stop the loop for good
+            logger.error("Could not archive idle games", exc_info=ex)
+            return
+        if archived:
+            logger.info(f"Archived {len(archived)} games unchanged for {config.GAME_ARCHIVE_AFTER_DAYS} days: {archived}")
+
+    @archive_idle_games.before_loop
+    async def before_archive_idle_games(self):
+        await self.bot.wait_until_ready()
 
     @commands.command(
         brief="Create a game of Imp Dip and output the map.",
@@ -57,7 +81,7 @@ class GameManagementCog(commands.Cog):
         else:
             gametype = gametype.removeprefix(" ")
 
-        message = manager.create_game(ctx.guild.id, gametype)
+        message = await on_database_thread(manager.create_game, ctx.guild.id, gametype)
         log_command(logger, ctx, message=message)
         await send_message_and_file(channel=ctx.channel, message=message)
 
@@ -65,10 +89,26 @@ class GameManagementCog(commands.Cog):
     @perms.gm_only("delete the game")
     async def delete_game(self, ctx: commands.Context) -> None:
         assert ctx.guild is not None
-        manager.total_delete(ctx.guild.id)
+        await on_database_thread(manager.total_delete, ctx.guild.id)
         log_command(logger, ctx, message="Deleted game")
         await send_message_and_file(channel=ctx.channel, title="Deleted game")
 
+    @commands.command(brief="packs the game away in the database until it's next used")
+    @perms.gm_only("archive the game")
+    async def archive_game(self, ctx: commands.Context) -> None:
+        assert ctx.guild is not None
+        message = await on_database_thread(manager.archive_game, ctx.guild.id)
+        log_command(logger, ctx, message=message)
+        await send_message_and_file(channel=ctx.channel, message=message)
+
+    @commands.command(brief="restores an archived game")
+    @perms.gm_only("restore the game")
+    async def restore_game(self, ctx: commands.Context) -> None:
+        assert ctx.guild is not None
+        message = await on_database_thread(manager.restore_game, ctx.guild.id)
+        log_command(logger, ctx, message=message)
+        await send_message_and_file(channel=ctx.channel, message=message)
+
     @commands.command(brief="produces a log")
     @perms.gm_only("log orders")
     async def log_orders(self, ctx: commands.Context) -> None:
@@ -282,32 +322,30 @@ class GameManagementCog(commands.Cog):
     @commands.command(
         brief="disables orders until .unlock_orders is run.",
         description="""disables orders until .enable_orders is run.
-                 Note: Currently does not persist after the bot is restarted""",
+                 Note: Currently does not persist after the bot is restarted; the game is kept in memory meanwhile""",
         aliases=["lock"],
     )
     @perms.gm_only("lock orders")
     async def lock_orders(self, ctx: commands.Context) -> None:
         assert ctx.guild is not None
-        board = manager.get_board(ctx.guild.id)
-        board.orders_enabled = False
+        game = manager.lock_orders(ctx.guild.id)
         log_command(logger, ctx, message="Locked orders")
         await send_message_and_file(
             channel=ctx.channel,
             title="Locked orders",
-            message=f"{board.turn}",
+            message="\n".join(str(timeline[-1]) for timeline in game.all_turns()),
         )
 
     @commands.command(brief="re-enables orders", aliases=["unlock"])
     @perms.gm_only("unlock orders")
     async def unlock_orders(self, ctx: commands.Context) -> None:
         assert ctx.guild is not None
-        board = manager.get_board(ctx.guild.id)
-        board.orders_enabled = True
+        game = manager.unlock_orders(ctx.guild.id)
         log_command(logger, ctx, message="Unlocked orders")
         await send_message_and_file(
             channel=ctx.channel,
             title="Unlocked orders",
-            message=f"{board.turn}",
+            message="\n".join(str(timeline[-1]) for timeline in game.all_turns()),
         )
 
     @commands.command(brief="Clears all players orders.")
@@ -319,7 +357,7 @@ class GameManagementCog(commands.Cog):
             unit.order = None
 
         database = get_connection()
-        database.save_order_for_units(board, board.units)
+        write_behind(database.save_order_for_units, board, set(board.units))
         log_command(logger, ctx, message="Removed all Orders")
         await send_message_and_file(channel=ctx.channel, title="Removed all Orders")
 
@@ -457,7 +495,7 @@ class GameManagementCog(commands.Cog):
         with open(fileName,mode="w") as orderfile:
             orderfile.write(manager.print_orders(guild.id))
         await ctx.channel.send("orders logged to "+repr(fileName)+"\nstarting adjudication")
-        manager.adjudicate(guild.id)
+        await on_database_thread(manager.adjudicate, guild.id)
         #game = manager.get_game(guild.id)
         await ctx.channel.send("adjudication complete")
 
@@ -488,7 +526,7 @@ class GameManagementCog(commands.Cog):
     @perms.gm_only("rollback")
     async def rollback(self, ctx: commands.Context) -> None:
         assert ctx.guild is not None
-        message = manager.rollback(ctx.guild.id)
+        message = await on_database_thread(manager.rollback, ctx.guild.id)
         log_command(logger, ctx, message=message)
         await send_message_and_file(channel=ctx.channel, message=message)
 
@@ -496,7 +534,7 @@ class GameManagementCog(commands.Cog):
     @perms.gm_only("reload")
     async def reload(self, ctx: commands.Context) -> None:
         assert ctx.guild is not None
-        message, file, file_name = manager.reload(ctx.guild.id)
+        message, file, file_name = await on_database_thread(manager.reload, ctx.guild.id)
         log_command(logger, ctx, message=message)
         await send_message_and_file(channel=ctx.channel, message=message, file=file, file_name=file_name)
 
@@ -32,6 +32,8 @@ class ScheduleCog(commands.Cog):
         self.bot = bot
         self.scheduled_storage = "bot/assets/schedule.json"
         self.scheduled_tasks = {}
+        # Games with a command scheduled, like adjudicating at the deadline, are in progress and kept in memory
+        self.pinned_games: set[int] = set()
 
         try:
             logger.info("Reading stored scheduled tasks")
@@ -56,6 +58,7 @@ class ScheduleCog(commands.Cog):
             logger.warning(f"Could not load previous store of scheduled tasks: {e}")
             raise e
 
+        self.pin_scheduled_games()
         self.process_scheduled_tasks.start()
 
     async def close(self):
@@ -357,7 +360,16 @@ class ScheduleCog(commands.Cog):
     async def before_process_scheduled_tasks(self):
         await self.bot.wait_until_ready()
 
+    def pin_scheduled_games(self):
+        scheduled = {task["guild_id"] for task in self.scheduled_tasks.values()}
+        for guild_id in scheduled - self.pinned_games:
+            manager.pin_game(guild_id)
+        for guild_id in self.pinned_games - scheduled:
+            manager.unpin_game(guild_id)
+        self.pinned_games = scheduled
+
     async def save_scheduled_tasks(self):
+        self.pin_scheduled_games()
         logger.info(f"Saving {len(self.scheduled_tasks)} stored scheduled tasks")
         with open(self.scheduled_storage, "w") as f:
             curr_tasks = deepcopy(self.scheduled_tasks)
@@ -65,6 +65,24 @@ IMPDIP_SERVER_WINTER_SCOREBOARD_OUTPUT_CHANNEL_ID = all_config["hub"]["winter_sc
 ## Roles
 IMPDIP_BOT_WIZARD_ROLE = all_config["hub"]["bot_wizard"]
 
+# DATABASE
+DB_BACKEND = all_config["database"]["backend"]
+DB_FILE = all_config["database"]["file"]
+DB_PROVINCE_KEYFRAME_INTERVAL = all_config["database"]["province_keyframe_interval"]
+DB_READ_CONNECTIONS = all_config["database"]["read_connections"]
+DB_GAME_SNAPSHOTS = all_config["database"]["game_snapshots"]
+DB_LAZY_BOARDS = all_config["database"]["lazy_boards"]
+DB_BACKUP_EVERY_HOURS = all_config["database"]["backup_every_hours"]
+DB_BACKUP_DIRECTORY = all_config["database"]["backup_directory"]
+DB_BACKUPS_KEPT = all_config["database"]["backups_kept"]
+DB_BACKUP_PAGES_PER_STEP = all_config["database"]["backup_pages_per_step"]
+DB_QUERY_STATS = all_config["database"]["query_stats"]
+DB_SLOW_QUERY_MS = all_config["database"]["slow_query_ms"]
+
+# GAMES
+GAME_CACHE_MEGABYTES = all_config["games"]["cache_megabytes"]
+GAME_ARCHIVE_AFTER_DAYS = all_config["games"]["archive_after_days"]
+
 # PERMISSIONS
 SUPERUSERS = all_config["permissions"]["superusers"]
 
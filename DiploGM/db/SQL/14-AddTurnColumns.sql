@@ -0,0 +1,20 @@
+BEGIN TRANSACTION;
+
+-- Numeric copies of the turn in boards.phase ("1901 Spring Moves Timeline 3"), so turns can be read and searched without parsing strings
+ALTER TABLE boards ADD COLUMN timeline int;
+ALTER TABLE boards ADD COLUMN year int;
+ALTER TABLE boards ADD COLUMN phase_ordinal int;
+
+UPDATE boards
+SET timeline = CAST(substr(phase, instr(phase, ' Timeline ') + 10) AS INTEGER),
+    year = CAST(substr(phase, 1, instr(phase, ' ') - 1) AS INTEGER),
+    phase_ordinal = CASE
+        WHEN phase LIKE '% Spring Moves %' THEN 0
+        WHEN phase LIKE '% Spring Retreats %' THEN 1
+        WHEN phase LIKE '% Fall Moves %' THEN 2
+        WHEN phase LIKE '% Fall Retreats %' THEN 3
+        WHEN phase LIKE '% Winter Builds %' THEN 4
+    END
+WHERE instr(phase, ' Timeline ') > 0;
+
+COMMIT;
@@ -0,0 +1,238 @@
+BEGIN TRANSACTION;
+
+-- Store province and player names once in `names` and refer to them by id.
+-- The old tables are replaced by views of the same name, so existing queries keep working.
+CREATE TABLE IF NOT EXISTS names (
+    name_id INTEGER PRIMARY KEY,
+    name text NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS provinces_encoded (
+    board_id int,
+    phase text,
+    province_id int,
+    owner_id int,
+    core_id int,
+    half_core_id int,
+    PRIMARY KEY (board_id, phase, province_id),
+    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS retreat_options_encoded (
+    board_id int,
+    phase text,
+    origin_id int,
+    retreat_loc_id int,
+    PRIMARY KEY (board_id, phase, origin_id, retreat_loc_id),
+    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS units_encoded (
+    board_id int,
+    phase text,
+    location_id int,
+    is_dislodged boolean,
+    owner_id int,
+    is_army boolean,
+    order_type text,
+    order_destination text,
+    order_source text,
+    failed_order boolean,
+    PRIMARY KEY (board_id, phase, location_id, is_dislodged),
+    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS builds_encoded (
+    board_id int,
+    phase text,
+    player_id int,
+    location_id int,
+    is_build boolean,
+    is_army boolean,
+    PRIMARY KEY (board_id, phase, player_id, location_id),
+    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase)
+) WITHOUT ROWID;
+
+
+INSERT OR IGNORE INTO names (name)
+SELECT province_name FROM provinces UNION SELECT owner FROM provinces
+UNION SELECT core FROM provinces UNION SELECT half_core FROM provinces
+UNION SELECT origin FROM retreat_options UNION SELECT retreat_loc FROM retreat_options
+UNION SELECT location FROM units UNION SELECT owner FROM units
+UNION SELECT player FROM builds UNION SELECT location FROM builds;
+
+INSERT INTO provinces_encoded
+SELECT board_id, phase,
+    (SELECT name_id FROM names WHERE name = province_name),
+    (SELECT name_id FROM names WHERE name = owner),
+    (SELECT name_id FROM names WHERE name = core),
+    (SELECT name_id FROM names WHERE name = half_core)
+FROM provinces;
+INSERT INTO retreat_options_encoded
+SELECT board_id, phase,
+    (SELECT name_id FROM names WHERE name = origin),
+    (SELECT name_id FROM names WHERE name = retreat_loc)
+FROM retreat_options;
+INSERT INTO units_encoded
+SELECT board_id, phase,
+    (SELECT name_id FROM names WHERE name = location),
+    is_dislodged,
+    (SELECT name_id FROM names WHERE name = owner),
+    is_army, order_type, order_destination, order_source, failed_order
+FROM units;
+INSERT INTO builds_encoded
+SELECT board_id, phase,
+    (SELECT name_id FROM names WHERE name = player),
+    (SELECT name_id FROM names WHERE name = location),
+    is_build, is_army
+FROM builds;
+
+DROP TABLE provinces;
+DROP TABLE retreat_options;
+DROP TABLE units;
+DROP TABLE builds;
+
+CREATE VIEW IF NOT EXISTS provinces AS
+SELECT board_id, phase,
+    (SELECT name FROM names WHERE name_id = province_id) AS province_name,
+    (SELECT name FROM names WHERE name_id = owner_id) AS owner,
+    (SELECT name FROM names WHERE name_id = core_id) AS core,
+    (SELECT name FROM names WHERE name_id = half_core_id) AS half_core
+FROM provinces_encoded;
+CREATE TRIGGER IF NOT EXISTS provinces_insert INSTEAD OF INSERT ON provinces BEGIN
+    INSERT OR IGNORE INTO names (name) VALUES (NEW.province_name), (NEW.owner), (NEW.core), (NEW.half_core);
+    INSERT INTO provinces_encoded (board_id, phase, province_id, owner_id, core_id, half_core_id) VALUES (
+        NEW.board_id,
+        NEW.phase,
+        (SELECT name_id FROM names WHERE name = NEW.province_name),
+        (SELECT name_id FROM names WHERE name = NEW.owner),
+        (SELECT name_id FROM names WHERE name = NEW.core),
+        (SELECT name_id FROM names WHERE name = NEW.half_core));
+END;
+CREATE TRIGGER IF NOT EXISTS provinces_update INSTEAD OF UPDATE ON provinces BEGIN
+    INSERT OR IGNORE INTO names (name) VALUES (NEW.province_name), (NEW.owner), (NEW.core), (NEW.half_core);
+    UPDATE provinces_encoded SET
+        board_id = NEW.board_id,
+        phase = NEW.phase,
+        province_id = (SELECT name_id FROM names WHERE name = NEW.province_name),
+        owner_id = (SELECT name_id FROM names WHERE name = NEW.owner),
+        core_id = (SELECT name_id FROM names WHERE name = NEW.core),
+        half_core_id = (SELECT name_id FROM names WHERE name = NEW.half_core)
+    WHERE board_id = OLD.board_id AND phase = OLD.phase
+        AND province_id = (SELECT name_id FROM names WHERE name = OLD.province_name);
+END;
+CREATE TRIGGER IF NOT EXISTS provinces_delete INSTEAD OF DELETE ON provinces BEGIN
+    DELETE FROM provinces_encoded
+    WHERE board_id = OLD.board_id AND phase = OLD.phase
+        AND province_id = (SELECT name_id FROM names WHERE name = OLD.province_name);
+END;
+
+CREATE VIEW IF NOT EXISTS retreat_options AS
+SELECT board_id, phase,
+    (SELECT name FROM names WHERE name_id = origin_id) AS origin,
+    (SELECT name FROM names WHERE name_id = retreat_loc_id) AS retreat_loc
+FROM retreat_options_encoded;
+CREATE TRIGGER IF NOT EXISTS retreat_options_insert INSTEAD OF INSERT ON retreat_options BEGIN
+    INSERT OR IGNORE INTO names (name) VALUES (NEW.origin), (NEW.retreat_loc);
+    INSERT INTO retreat_options_encoded (board_id, phase, origin_id, retreat_loc_id) VALUES (
+        NEW.board_id,
+        NEW.phase,
+        (SELECT name_id FROM names WHERE name = NEW.origin),
+        (SELECT name_id FROM names WHERE name = NEW.retreat_loc));
+END;
+CREATE TRIGGER IF NOT EXISTS retreat_options_update INSTEAD OF UPDATE ON retreat_options BEGIN
+    INSERT OR IGNORE INTO names (name) VALUES (NEW.origin), (NEW.retreat_loc);
+    UPDATE retreat_options_encoded SET
+        board_id = NEW.board_id,
+        phase = NEW.phase,
+        origin_id = (SELECT name_id FROM names WHERE name = NEW.origin),
+        retreat_loc_id = (SELECT name_id FROM names WHERE name = NEW.retreat_loc)
+    WHERE board_id = OLD.board_id AND phase = OLD.phase
+        AND origin_id = (SELECT name_id FROM names WHERE name = OLD.origin)
+        AND retreat_loc_id = (SELECT name_id FROM names WHERE name = OLD.retreat_loc);
+END;
+CREATE TRIGGER IF NOT EXISTS retreat_options_delete INSTEAD OF DELETE ON retreat_options BEGIN
+    DELETE FROM retreat_options_encoded
+    WHERE board_id = OLD.board_id AND phase = OLD.phase
+        AND origin_id = (SELECT name_id FROM names WHERE name = OLD.origin)
+        AND retreat_loc_id = (SELECT name_id FROM names WHERE name = OLD.retreat_loc);
+END;
+
+CREATE VIEW IF NOT EXISTS units AS
+SELECT board_id, phase,
+    (SELECT name FROM names WHERE name_id = location_id) AS location,
+    is_dislodged,
+    (SELECT name FROM names WHERE name_id = owner_id) AS owner,
+    is_army, order_type, order_destination, order_source, failed_order
+FROM units_encoded;
+-- Views can't be UPSERTed, so inserting a unit that already exists updates its owner and type instead
+CREATE TRIGGER IF NOT EXISTS units_insert INSTEAD OF INSERT ON units BEGIN
+    INSERT OR IGNORE INTO names (name) VALUES (NEW.location), (NEW.owner);
+    INSERT INTO units_encoded (board_id, phase, location_id, is_dislodged, owner_id, is_army,
+                               order_type, order_destination, order_source, failed_order) VALUES (
+        NEW.board_id,
+        NEW.phase,
+        (SELECT name_id FROM names WHERE name = NEW.location),
+        NEW.is_dislodged,
+        (SELECT name_id FROM names WHERE name = NEW.owner),
+        NEW.is_army,
+        NEW.order_type,
+        NEW.order_destination,
+        NEW.order_source,
+        NEW.failed_order)
+    ON CONFLICT (board_id, phase, location_id, is_dislodged) DO UPDATE SET owner_id = excluded.owner_id, is_army = excluded.is_army;
+END;
+CREATE TRIGGER IF NOT EXISTS units_update INSTEAD OF UPDATE ON units BEGIN
+    INSERT OR IGNORE INTO names (name) VALUES (NEW.location), (NEW.owner);
+    UPDATE units_encoded SET
+        board_id = NEW.board_id,
+        phase = NEW.phase,
+        location_id = (SELECT name_id FROM names WHERE name = NEW.location),
+        is_dislodged = NEW.is_dislodged,
+        owner_id = (SELECT name_id FROM names WHERE name = NEW.owner),
+        is_army = NEW.is_army,
+        order_type = NEW.order_type,
+        order_destination = NEW.order_destination,
+        order_source = NEW.order_source,
+        failed_order = NEW.failed_order
+    WHERE board_id = OLD.board_id AND phase = OLD.phase AND is_dislodged = OLD.is_dislodged
+        AND location_id = (SELECT name_id FROM names WHERE name = OLD.location);
+END;
+CREATE TRIGGER IF NOT EXISTS units_delete INSTEAD OF DELETE ON units BEGIN
+    DELETE FROM units_encoded
+    WHERE board_id = OLD.board_id AND phase = OLD.phase AND is_dislodged = OLD.is_dislodged
+        AND location_id = (SELECT name_id FROM names WHERE name = OLD.location);
+END;
+
+CREATE VIEW IF NOT EXISTS builds AS
+SELECT board_id, phase,
+    (SELECT name FROM names WHERE name_id = player_id) AS player,
+    (SELECT name FROM names WHERE name_id = location_id) AS location,
+    is_build, is_army
+FROM builds_encoded;
+CREATE TRIGGER IF NOT EXISTS builds_insert INSTEAD OF INSERT ON builds BEGIN
+    INSERT OR IGNORE INTO names (name) VALUES (NEW.player), (NEW.location);
+    INSERT INTO builds_encoded (board_id, phase, player_id, location_id, is_build, is_army) VALUES (
+        NEW.board_id,
+        NEW.phase,
+        (SELECT name_id FROM names WHERE name = NEW.player),
+        (SELECT name_id FROM names WHERE name = NEW.location),
+        NEW.is_build,
+        NEW.is_army);
+END;
+CREATE TRIGGER IF NOT EXISTS builds_update INSTEAD OF UPDATE ON builds BEGIN
+    INSERT OR IGNORE INTO names (name) VALUES (NEW.player), (NEW.location);
+    UPDATE builds_encoded SET
+        board_id = NEW.board_id,
+        phase = NEW.phase,
+        player_id = (SELECT name_id FROM names WHERE name = NEW.player),
+        location_id = (SELECT name_id FROM names WHERE name = NEW.location),
+        is_build = NEW.is_build,
+        is_army = NEW.is_army
+    WHERE board_id = OLD.board_id AND phase = OLD.phase
+        AND player_id = (SELECT name_id FROM names WHERE name = OLD.player)
+        AND location_id = (SELECT name_id FROM names WHERE name = OLD.location);
+END;
+CREATE TRIGGER IF NOT EXISTS builds_delete INSTEAD OF DELETE ON builds BEGIN
+    DELETE FROM builds_encoded
+    WHERE board_id = OLD.board_id AND phase = OLD.phase
+        AND player_id = (SELECT name_id FROM names WHERE name = OLD.player)
+        AND location_id = (SELECT name_id FROM names WHERE name = OLD.location);
+END;
+
+COMMIT;
@@ -0,0 +1,7 @@
+BEGIN TRANSACTION;
+
+-- Boards with a delta_depth above 0 only have provinces_encoded rows for the provinces that differ from their parent board.
+-- Existing boards store every province, which is what NULL means.
+ALTER TABLE boards ADD COLUMN delta_depth int;
+
+COMMIT;
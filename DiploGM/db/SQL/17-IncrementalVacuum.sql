@@ -0,0 +1,5 @@
+-- Lets deleting or archiving a game give the space it took back to the filesystem (see reclaim_space).
+-- Switching an existing database needs one full VACUUM, which rewrites the whole file; stop the bot first,
+-- and expect it to take a while on a large database. VACUUM can't run inside a transaction.
+PRAGMA auto_vacuum = INCREMENTAL;
+VACUUM;
@@ -0,0 +1,135 @@
+import asyncio
+import functools
+import logging
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from DiploGM.db.database import _DatabaseConnection, get_connection
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_Job = tuple[Callable[..., Any], tuple, dict, Future]
+
+
+class AsyncDatabase:
+    """Runs database work on a dedicated thread, so that SQLite never blocks the event loop.
+
+    Writes run one at a time in the order they were queued. While the thread is running, synchronous calls
+    to the connection's write methods from other threads are queued the same way and wait for their result,
+    so code that still uses get_connection() directly stays in order. Reads run on a separate pool of
+    threads using the connection's read-only connections; see _DatabaseConnection for what they can see.
+    """
+
+    def __init__(self, database: _DatabaseConnection):
+        self._database = database
+        self._jobs: queue.SimpleQueue[_Job | None] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._readers = ThreadPoolExecutor(
+            max(database.read_connections, 1), thread_name_prefix="database-read"
+        )
+        self._thread = threading.Thread(target=self._run, name="database", daemon=True)
+        database._database_thread = self
+        self._thread.start()
+
+    def is_current_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, function: Callable[..., T], *args, **kwargs) -> Future[T]:
+        future: Future[T] = Future()
+        with self._lock:
+            if not self._stopped:
+                self._jobs.put((function, args, kwargs, future))
+                return future
+        # Once the thread has stopped, the caller's thread is the only one left using the connection
+        self._run_job((function, args, kwargs, future))
+        return future
+
+    async def read(self, function: Callable[..., T], *args, **kwargs) -> T:
+        """Runs `function` on a reader thread, e.g. `await database.read(connection.get_game, board_id)`."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._readers, functools.partial(function, *args, **kwargs)
+        )
+
+    def write(self, function: Callable[..., Any], *args, **kwargs) -> None:
+        """Queues `function` without waiting for it to run; failures are logged.
+
+        The arguments are read when the job runs, not when it is queued.
+        """
+        self.submit(function, *args, **kwargs).add_done_callback(_log_failure)
+
+    async def flush(self) -> None:
+        """Waits for every write queued so far."""
+        await asyncio.wrap_future(self.submit(lambda: None))
+
+    async def close(self) -> None:
+        """Runs every queued write, then stops the threads."""
+        self._jobs.put(None)
+        await asyncio.to_thread(self._thread.join)
+        await asyncio.to_thread(self._readers.shutdown)
+
+    def _run(self):
+        while (job := self._jobs.get()) is not None:
+            self._run_job(job)
+        with self._lock:
+            self._stopped = True
+            self._database._database_thread = None
+            # Anything queued after close() was called
+            while True:
+                try:
+                    job = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    self._run_job(job)
+        logger.info("Database thread stopped")
+
+    @staticmethod
+    def _run_job(job: _Job):
+        function, args, kwargs, future = job
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(function(*args, **kwargs))
+        except BaseException as error:
+            future.set_exception(error)
+
+
+def _log_failure(future: Future):
+    if future.exception() is not None:
+        logger.error("Queued database write failed", exc_info=future.exception())
+
+
+_async_db: AsyncDatabase | None = None
+
+
+def get_async_connection() -> AsyncDatabase:
+    """Starts the database thread on first use."""
+    global _async_db
+    if _async_db:
+        return _async_db
+    _async_db = AsyncDatabase(get_connection())
+    return _async_db
+
+
+async def on_database_thread(function: Callable[..., T], *args, **kwargs) -> T:
+    """Runs `function` on the database thread if it has been started, and awaits it without blocking the event loop.
+
+    The database calls it makes run straight away, in order with the queued writes. Meant for work like
+    adjudicating or loading a game, which is mostly database calls; without the thread, it runs straight away.
+    """
+    if _async_db is None:
+        return function(*args, **kwargs)
+    return await asyncio.wrap_future(_async_db.submit(function, *args, **kwargs))
+
+
+def write_behind(function: Callable[..., Any], *args, **kwargs) -> None:
+    """Queues a write on the database thread if it has been started, and runs it straight away otherwise."""
+    if _async_db is None:
+        function(*args, **kwargs)
+    else:
+        _async_db.write(function, *args, **kwargs)
@@ -1,14 +1,38 @@
+import contextlib
+import copy
+import datetime
+import functools
+import gc
+import gzip
+import json
 import logging
+import marshal
+import pathlib
+import queue
+import shutil
 import sqlite3
-from collections.abc import Iterable
-from typing import Optional
-
+import threading
+import time
+import zlib
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from typing import TYPE_CHECKING, Optional
+
+from DiploGM.config import (
+    DB_BACKEND,
+    DB_FILE,
+    DB_PROVINCE_KEYFRAME_INTERVAL,
+    DB_QUERY_STATS,
+    DB_READ_CONNECTIONS,
+    DB_SLOW_QUERY_MS,
+)
+from DiploGM.db.query_stats import InstrumentedConnection, QueryStats
 # TODO: Find a better way to do this
 # maybe use a copy from manager?
 from DiploGM.map_parser.vector.vector import get_parser
 from DiploGM.models.turn import Turn,PhaseName
 from DiploGM.models.board import Board
-from DiploGM.models.game import Game
+from DiploGM.models.game import BoardPlaceholder, Game, active_turns
 from DiploGM.models.order import (
     Core,
     NMR,
@@ -33,23 +57,633 @@ from DiploGM.models.player import Player
 from DiploGM.models.spec_request import SpecRequest
 from DiploGM.models.unit import UnitType, Unit
 
+if TYPE_CHECKING:
+    from DiploGM.db.async_database import AsyncDatabase
+
 logger = logging.getLogger(__name__)
 
-SQL_FILE_PATH = "bot_db.sqlite"
+SQL_FILE_PATH = DB_FILE
+# The columns of boards that get_games reads, and that game_snapshots and archived_games blobs keep
+_BOARDS_COLUMNS = "board_id, phase, data_file, fish, name, parent_phase, delta_depth, timeline, year, phase_ordinal"
+# How long backup() waits between steps, leaving the disk to everything else
+BACKUP_STEP_PAUSE_SECONDS = 0.005
+
+
+class _BoardRows:
+    """The rows needed to finish building every board of a set of games.
+
+    select() reads each table with a single query for all requested board_ids and groups it in memory,
+    so loading costs one query per table rather than one per table per board.
+    `deltas` maps (board_id, phase) of each board saved as a province delta to (parent_phase, delta_depth).
+    """
+
+    def __init__(
+        self,
+        builds: dict[tuple, list[tuple]],
+        vassal_orders: dict[tuple, list[tuple]],
+        provinces: dict[tuple, list[tuple]],
+        units: dict[tuple, list[tuple]],
+        retreat_options: dict[tuple, list[tuple]],
+        deltas: Optional[dict[tuple[int, str], tuple[str, int]]] = None,
+    ):
+        self.builds = builds
+        self.vassal_orders = vassal_orders
+        self.provinces = provinces
+        self.units = units
+        self.retreat_options = retreat_options
+        self._deltas = deltas or {}
+        self._resolved_provinces: dict[tuple[int, str], dict[str, tuple]] = {}
+
+    @classmethod
+    def select(
+        cls,
+        cursor: sqlite3.Cursor,
+        board_ids: Optional[list[int]],
+        deltas: Optional[dict[tuple[int, str], tuple[str, int]]] = None,
+    ) -> "_BoardRows":
+        def select_grouped(key_columns: tuple[str, ...], columns: str, table: str) -> dict[tuple, list[tuple]]:
+            sql = f"SELECT {', '.join(key_columns)}, {columns} FROM {table}"
+            args: list[int] = []
+            if board_ids is not None:
+                sql += f" WHERE board_id IN ({','.join('?' for _ in board_ids)})"
+                args = board_ids
+            key_length = len(key_columns)
+            grouped: dict[tuple, list[tuple]] = defaultdict(list)
+            for row in cursor.execute(sql, args):
+                grouped[row[:key_length]].append(row[key_length:])
+            return grouped
+
+        return cls(
+            builds=select_grouped(("board_id", "phase"), "player, location, is_build, is_army", "builds"),
+            vassal_orders=select_grouped(("board_id", "phase"), "player, target_player, order_type", "vassal_orders"),
+            provinces=select_grouped(("board_id", "phase"), "province_name, owner, core, half_core", "provinces"),
+            units=select_grouped(
+                ("board_id", "phase"),
+                "location, is_dislodged, owner, is_army, order_type, order_destination, order_source, failed_order",
+                "units",
+            ),
+            retreat_options=select_grouped(("board_id", "phase", "origin"), "retreat_loc", "retreat_options"),
+            deltas=deltas,
+        )
+
+    @classmethod
+    def from_boards(cls, boards: Iterable[Board]) -> "_BoardRows":
+        """The rows of boards that are in memory, named as select() would read them back after save_board."""
+        rows = cls({}, {}, {}, {}, defaultdict(list))
+        for board in boards:
+            key = (board.board_id, board.turn.get_indexed_name())
+            rows.builds[key] = _build_rows(board)
+            rows.vassal_orders[key] = _vassal_order_rows(board)
+            rows.provinces[key] = _province_rows(board)
+            rows.units[key] = _unit_rows(board)
+            for origin, retreat_loc in _retreat_option_rows(board):
+                rows.retreat_options[(*key, origin)].append((retreat_loc,))
+        return rows
+
+    def for_board(self, table: dict[tuple, list[tuple]], board: Board) -> list[tuple]:
+        return table.get((board.board_id, board.turn.get_indexed_name()), [])
+
+    def for_unit(self, table: dict[tuple, list[tuple]], board: Board, location: str) -> list[tuple]:
+        return table.get((board.board_id, board.turn.get_indexed_name(), location), [])
+
+    def provinces_for_board(self, board: Board) -> list[tuple]:
+        return list(self._resolve_provinces((board.board_id, board.turn.get_indexed_name())).values())
+
+    def _resolve_provinces(self, key: tuple[int, str]) -> dict[str, tuple]:
+        # A delta board's provinces are its parent's with its own rows applied on top
+        if key in self._resolved_provinces:
+            return self._resolved_provinces[key]
+        own_rows = {row[0]: row for row in self.provinces.get(key, [])}
+        if key in self._deltas:
+            parent_phase, _ = self._deltas[key]
+            resolved = dict(self._resolve_provinces((key[0], parent_phase)))
+            resolved.update(own_rows)
+        else:
+            resolved = own_rows
+        self._resolved_provinces[key] = resolved
+        return resolved
+
+
+class _GameParameters:
+    """A game's board_parameters and players rows, which are the same for every board of the game."""
+
+    def __init__(self, parameters: list[tuple[str, str]], players: list[tuple[str, str, str | None, int]]):
+        self.parameters = parameters
+        self.players = {player_name: (color, liege, points) for player_name, color, liege, points in players}
+
+    def build_data(self, variant_data: dict) -> dict:
+        """The variant's data with the game's parameters applied."""
+        data = copy.deepcopy(variant_data)
+        # Turning a key deliniated with slashes into a nested dict
+        for key, value in self.parameters:
+            cur_dict = data
+            split_key = key.split("/", 1)
+            while len(split_key) > 1:
+                if split_key[0] not in cur_dict:
+                    cur_dict[split_key[0]] = {}
+                cur_dict = cur_dict[split_key[0]]
+                split_key = split_key[1].split("/", 1)
+            cur_dict[split_key[0]] = value
+        return data
+
+
+class _BoardSource:
+    """Builds the boards of a game that get_games left as placeholders, from the rows it read for the game.
+
+    copy_orders and insert_boards keep `rows` and `game_parameters` in step with what Manager saves afterwards,
+    so a board built later comes out as it would from a reload.
+    """
+
+    def __init__(self, database: "_DatabaseConnection", rows: _BoardRows, game_parameters: _GameParameters):
+        self.database = database
+        self.rows = rows
+        self.game_parameters = game_parameters
+
+    def build(self, placeholder: BoardPlaceholder, game: Game) -> Board:
+        fish, name, parent, data_file = placeholder.args
+        return self.database._get_board_partial(
+            placeholder.board_id, placeholder.turn, fish, name, parent, data_file, None, data=placeholder.data
+        )
+
+    def finish(self, board: Board, game: Game):
+        self.database._finish_build_board(board, game, None, self.rows, self.game_parameters)
+
+    def order_turns(self, placeholder: BoardPlaceholder) -> set[Turn]:
+        turns = set()
+        for *_, order_destination, order_source, _ in self.rows.units.get(
+            (placeholder.board_id, placeholder.turn.get_indexed_name()), ()
+        ):
+            for location in (order_destination, order_source):
+                if location is not None:
+                    turns.add(Turn.from_code(location)[0])
+        return turns
+
+
+# The rows of a board in the column order of the views in schema.sql, with names rather than name ids;
+# save_board stores these and _BoardRows.from_boards copies boards through them.
+def _player_rows(board: Board) -> list[tuple[str, str, str | None, int]]:
+    return [
+        (player.name, player.render_color, (None if player.liege is None else str(player.liege)), player.points)
+        for player in board.players
+    ]
+
+
+def _province_rows(board: Board) -> list[tuple[str, str | None, str | None, str | None]]:
+    return [
+        (
+            province.name,
+            province.owner.name if province.owner else None,
+            province.core.name if province.core else None,
+            province.half_core.name if province.half_core else None,
+        )
+        for province in board.provinces
+    ]
+
+
+def _build_rows(board: Board) -> list[tuple[str, str, bool, bool]]:
+    return [
+        (
+            player.name,
+            build_order.province.get_name(build_order.coast),
+            isinstance(build_order, Build),
+            getattr(build_order, "unit_type", None) == UnitType.ARMY,
+        )
+        for player in board.players
+        for build_order in player.build_orders if isinstance(build_order, PlayerOrder)
+    ]
+
+
+def _vassal_order_rows(board: Board) -> list[tuple[str, str, str]]:
+    return [
+        (player.name, order.player.name, order.__class__.__name__)
+        for player in board.players
+        for order in player.vassal_orders.values()
+    ]
+
+
+def _unit_rows(board: Board) -> list[tuple]:
+    return [
+        (
+            unit.province.get_name(unit.coast),
+            unit == unit.province.dislodged_unit,
+            unit.player.name,
+            unit.unit_type == UnitType.ARMY,
+            *_order_columns(unit),
+        )
+        for unit in board.get_units()
+    ]
+
+
+def _order_columns(unit: Unit) -> tuple[str | None, str | None, str | None, bool]:
+    # order_type, order_destination, order_source and failed_order of units
+    if unit.order is None:
+        return None, None, None, False
+    return unit.order.__class__.__name__, unit.order.get_destination_str(), unit.order.get_source_str(), unit.order.hasFailed
+
+
+def order_rows(board: Board, units: Iterable[Unit]) -> list[tuple[str, bool, str | None, str | None, str | None, bool]]:
+    """(location, is_dislodged, order_type, order_destination, order_source, failed_order) of those of units on board.
+
+    Taken when the orders are given, so that a write queued with them doesn't see later changes to the units.
+    """
+    return [
+        (unit.province.get_name(unit.coast), unit == unit.province.dislodged_unit, *_order_columns(unit))
+        for unit in units
+        if unit.province.turn == board.turn
+    ]
+
+
+def build_order_rows(
+    board: Board, player: Player | None
+) -> tuple[list[tuple[str, str, bool, bool]], list[tuple[str, str, str]]]:
+    """(player, location, is_build, is_army) of the build orders and (player, target_player, order_type) of the vassal
+    orders of player on board, or of every player.
+
+    Taken when the orders are given, like order_rows.
+    """
+    players = board.players if player is None else {board.name_to_player[player.name.lower()]}
+    builds = [
+        (
+            player.name,
+            build_order.province.get_name(build_order.coast if isinstance(build_order, Build) else None),
+            isinstance(build_order, Build),
+            getattr(build_order, "unit_type", None) == UnitType.ARMY,
+        )
+        for player in players
+        for build_order in player.build_orders if isinstance(build_order, PlayerOrder)
+    ]
+    vassal_orders = [
+        (player.name, order.player.name, order.__class__.__name__)
+        for player in players
+        for order in player.vassal_orders.values()
+    ]
+    return builds, vassal_orders
+
+
+def _retreat_option_rows(board: Board) -> list[tuple[str, str]]:
+    return [
+        (unit.province.get_name(unit.coast), retreat_option[0].get_name(retreat_option[1]))
+        for unit in board.get_units()
+        if unit.retreat_options is not None
+        for retreat_option in unit.retreat_options
+    ]
+
+
+# The tables with a game's rows; any write to them bumps the game's revision in game_revisions
+_GAME_TABLES = (
+    "boards",
+    "players",
+    "board_parameters",
+    "provinces_encoded",
+    "units_encoded",
+    "builds_encoded",
+    "retreat_options_encoded",
+    "vassal_orders",
+)
+
+# Bump whenever the layout of a snapshot changes, so that older snapshots are reloaded from the tables rather than misread
+_SNAPSHOT_FORMAT = 2
+
+
+def _snapshot_fingerprint(data_file: str) -> str:
+    return f"{_SNAPSHOT_FORMAT}:{get_parser(data_file).fingerprint}"
+
+
+def _encode_snapshot(
+    board_id: int,
+    board_rows: list[tuple],
+    rows: _BoardRows,
+    game_parameters: _GameParameters,
+    province_names: tuple[str, ...],
+) -> bytes:
+    """Packs one game's rows into a game_snapshots blob.
+
+    Each board's provinces are stored resolved against its parents, as one (owner, core, half_core) per province
+    of the variant in province_names order, or None where it has no row. The other tables keep their rows, keyed
+    like _BoardRows without the board_id. Repeated names are stored once.
+    The rows are written with marshal, which only reads back plain values, since these blobs come from the database.
+    """
+    names: dict[str, str] = {}
+
+    def share(row: tuple) -> tuple:
+        return tuple(names.setdefault(value, value) if isinstance(value, str) else value for value in row)
+
+    provinces = {}
+    units = {}
+    retreat_options = {}
+    builds = {}
+    vassal_orders = {}
+    for board_row in board_rows:
+        phase = board_row[1]
+        resolved = rows._resolve_provinces((board_id, phase))
+        provinces[phase] = tuple(share(resolved[name][1:]) if name in resolved else None for name in province_names)
+        if unit_rows := rows.units.get((board_id, phase)):
+            units[phase] = [share(row) for row in unit_rows]
+            for location, is_dislodged, *_ in unit_rows:
+                if is_dislodged and (options := rows.retreat_options.get((board_id, phase, location))):
+                    retreat_options[(phase, location)] = [share(row) for row in options]
+        if build_rows := rows.builds.get((board_id, phase)):
+            builds[phase] = [share(row) for row in build_rows]
+        if vassal_rows := rows.vassal_orders.get((board_id, phase)):
+            vassal_orders[phase] = [share(row) for row in vassal_rows]
+    players = [share((player_name, *info)) for player_name, info in game_parameters.players.items()]
+    state = (board_rows, provinces, units, retreat_options, builds, vassal_orders, game_parameters.parameters, players)
+    return zlib.compress(marshal.dumps(state))
+
+
+def _decode_snapshot(
+    board_id: int, snapshot: bytes, province_names: tuple[str, ...]
+) -> tuple[list[tuple], _BoardRows, _GameParameters]:
+    """The boards rows, other rows and parameters of a game, from a blob made by _encode_snapshot."""
+    board_rows, provinces, units, retreat_options, builds, vassal_orders, parameters, players = marshal.loads(
+        zlib.decompress(snapshot)
+    )
+    rows = _BoardRows(
+        builds={(board_id, phase): build_rows for phase, build_rows in builds.items()},
+        vassal_orders={(board_id, phase): vassal_rows for phase, vassal_rows in vassal_orders.items()},
+        provinces={
+            (board_id, phase): [(name, *state) for name, state in zip(province_names, states) if state is not None]
+            for phase, states in provinces.items()
+        },
+        units={(board_id, phase): unit_rows for phase, unit_rows in units.items()},
+        retreat_options={(board_id, *key): options for key, options in retreat_options.items()},
+    )
+    return board_rows, rows, _GameParameters(parameters, players)
+
+
+_gc_pause_lock = threading.Lock()
+_gc_pauses = 0
+_gc_was_enabled = False
+
+
+@contextlib.contextmanager
+def _cyclic_gc_paused() -> Iterator[None]:
+    # Building games allocates hundreds of thousands of objects which all stay alive, and each collection that
+    # triggers walks the whole graph built so far for nothing; that was about half the time of a load.
+    # Counted, so that one of several concurrent loads finishing doesn't turn collection back on under the others
+    global _gc_pauses, _gc_was_enabled
+    with _gc_pause_lock:
+        if not _gc_pauses:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_pauses += 1
+    try:
+        yield
+    finally:
+        with _gc_pause_lock:
+            _gc_pauses -= 1
+            if not _gc_pauses and _gc_was_enabled:
+                gc.enable()
+
+
+def _turn_columns(turn: Turn) -> tuple[int, int, int]:
+    return turn.timeline, turn.year, turn.phase.value
+
+
+def _turn_from_columns(phase: str, timeline: int | None, year: int | None, phase_ordinal: int | None) -> Turn | None:
+    # Boards saved before the numeric columns were added only have the phase string
+    if timeline is None or year is None or phase_ordinal is None:
+        return Turn.turn_from_string(phase)
+    return Turn(year, PhaseName(phase_ordinal), timeline=timeline)
+
+
+def _on_database_thread(method):
+    # While an AsyncDatabase is running, the connection is only used from its thread;
+    # calls from anywhere else are queued behind its pending writes and wait for the result
+    @functools.wraps(method)
+    def wrapper(self: "_DatabaseConnection", *args, **kwargs):
+        database_thread = self._database_thread
+        if database_thread is None or database_thread.is_current_thread():
+            return method(self, *args, **kwargs)
+        return database_thread.submit(method, self, *args, **kwargs).result()
+
+    return wrapper
+
+
+def _read_on_database_thread(method):
+    # Reads use the read-only connections when there are any (see _read_cursor). Without them, as for an in-memory
+    # database, they'd share the writer connection with the AsyncDatabase thread, so they're queued there like writes
+    @functools.wraps(method)
+    def wrapper(self: "_DatabaseConnection", *args, **kwargs):
+        database_thread = self._database_thread
+        if self._has_read_connections() or database_thread is None or database_thread.is_current_thread():
+            return method(self, *args, **kwargs)
+        return database_thread.submit(method, self, *args, **kwargs).result()
+
+    return wrapper
 
 
 class _DatabaseConnection:
-    def __init__(self, db_file: str = SQL_FILE_PATH):
+    """The bot's SQLite database: one connection for writing, and a pool of read-only connections.
+
+    Isolation:
+    - Writes all go through the one writer connection (on the AsyncDatabase thread while that is running),
+      so they never run concurrently. A transaction() is only visible to other connections once it commits.
+    - Reads from any other thread, such as AsyncDatabase.read(), use a pooled read-only connection and run
+      in a transaction of their own, so e.g. get_games sees one committed snapshot for all of its queries.
+      A read made while an adjudication is being written sees the game from before the adjudication.
+    - A read first waits for the writes queued on the AsyncDatabase thread before it was made,
+      so it always sees those (including write-behind ones), but not writes queued after it.
+    - Reads made on the writer's own thread, or inside a transaction(), use the writer connection
+      and see its uncommitted writes.
+    - Without read-only connections (read_connections = 0, or an in-memory database, which nothing else can open),
+      reads from other threads run on the AsyncDatabase thread while it is running, after the writes queued before them.
+    """
+
+    def __init__(
+        self,
+        db_file: str = SQL_FILE_PATH,
+        province_keyframe_interval: int = DB_PROVINCE_KEYFRAME_INTERVAL,
+        read_connections: int = DB_READ_CONNECTIONS,
+        query_stats: bool = DB_QUERY_STATS,
+    ):
+        self._db_file: str | None = db_file
+        # Shared by every connection below when query_stats is on; see query_report
+        self.query_stats: QueryStats | None = QueryStats(DB_SLOW_QUERY_MS / 1000) if query_stats else None
         try:
-            self._connection = sqlite3.connect(db_file)
+            self._connection = self._connect(db_file)
             logger.info("Connection to SQLite DB successful")
         except IOError as ex:
             logger.error("Could not open SQLite DB", exc_info=ex)
-            self._connection = sqlite3.connect(
-                ":memory:"
-            )  # Special wildcard; in-memory db
-
+            self._connection = self._connect(":memory:")  # Special wildcard; in-memory db
+            self._db_file = None
+        if self._db_file == ":memory:":
+            # Nothing else can open a private in-memory database
+            self._db_file = None
+
+        # Lets reclaim_space hand freed pages back without rewriting the file. This only applies to new databases;
+        # existing ones are converted by 17-IncrementalVacuum.sql
+        self._connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        # With WAL, readers don't block the writer and a commit only appends to the log.
+        # synchronous=NORMAL then only syncs at checkpoints: a power cut can lose the last commits, but can't corrupt the database.
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
         self._initialize_schema()
+        self._name_ids: dict[str, int] = {}
+        self._province_keyframe_interval = province_keyframe_interval
+        self._transaction_depth = 0
+        self._database_thread: "AsyncDatabase | None" = None
+        # board_id -> its game's parameters. Any change to a game's board_parameters or players rows has to
+        # call invalidate_game_parameters; _parameters_version lets loads tell whether one happened while they ran
+        self._game_parameters: dict[int, _GameParameters] = {}
+        self._parameters_version = 0
+        self._parameters_lock = threading.Lock()
+        self._stale_parameters: set[int] = set()
+        self.read_connections = read_connections
+        # Connections are opened the first time they're needed; None marks a free slot
+        self._readers: queue.LifoQueue[sqlite3.Connection | None] = queue.LifoQueue()
+        for _ in range(read_connections):
+            self._readers.put(None)
+        self._backup_lock = threading.Lock()
+
+    @property
+    def persistent(self) -> bool:
+        """Whether the data outlives this object, in a file that other connections and backup() can open."""
+        return self._db_file is not None
+
+    def _has_read_connections(self) -> bool:
+        return self._db_file is not None and self.read_connections > 0
+
+    def _connect(self, database: str, uri: bool = False) -> sqlite3.Connection:
+        if self.query_stats is None:
+            return sqlite3.connect(database, uri=uri, check_same_thread=False)
+        connection = sqlite3.connect(database, uri=uri, check_same_thread=False, factory=InstrumentedConnection)
+        connection.query_stats = self.query_stats
+        return connection
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Groups every write made inside the block into a single transaction.
+
+        The methods below commit only once the outermost block exits, and nothing is kept if it raises.
+        """
+        self._begin_transaction()
+        try:
+            yield
+        except BaseException:
+            self._end_transaction(commit=False)
+            raise
+        else:
+            self._end_transaction(commit=True)
+
+    @_on_database_thread
+    def _begin_transaction(self):
+        self._transaction_depth += 1
+
+    @_on_database_thread
+    def _end_transaction(self, commit: bool):
+        self._transaction_depth -= 1
+        if self._transaction_depth:
+            return
+        if commit:
+            self._connection.commit()
+        else:
+            self._connection.rollback()
+            # Names inserted by the rolled back transaction are gone again
+            self._name_ids.clear()
+        for board_id in list(self._stale_parameters):
+            self.invalidate_game_parameters(board_id)
+        self._stale_parameters.clear()
+
+    @contextlib.contextmanager
+    def _read_cursor(self) -> Iterator[sqlite3.Cursor]:
+        """A cursor for read-only queries; see the class docstring for what it can see."""
+        database_thread = self._database_thread
+        on_writer_thread = database_thread.is_current_thread() if database_thread else self._transaction_depth > 0
+        if not self._has_read_connections() or on_writer_thread:
+            cursor = self._connection.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+            return
+
+        if database_thread is not None:
+            database_thread.submit(lambda: None).result()
+        connection = self._readers.get()
+        try:
+            if connection is None:
+                uri = f"{pathlib.Path(self._db_file).absolute().as_uri()}?mode=ro"
+                connection = self._connect(uri, uri=True)
+            cursor = connection.cursor()
+            cursor.execute("BEGIN")
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+                connection.rollback()
+        finally:
+            self._readers.put(connection)
+
+    def _commit(self):
+        if not self._transaction_depth:
+            self._connection.commit()
+
+    @staticmethod
+    def _bump_revision(cursor: sqlite3.Cursor, board_id: int):
+        # Once per write to a game's rows, which stops any game_snapshots row taken before it from being used
+        cursor.execute(
+            "INSERT INTO game_revisions (board_id) VALUES (?) ON CONFLICT (board_id) DO UPDATE SET revision = revision + 1",
+            (board_id,),
+        )
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _bumping_revisions(cursor: sqlite3.Cursor) -> Iterator[None]:
+        # SQL from outside this class doesn't say which games it changes, so while it runs, temporary triggers bump
+        # the revision of each game it writes a row of. They're dropped again so that other writes don't pay for them
+        triggers = [
+            (f"{table}_{event.lower()}_revision", event, table, row)
+            for table in _GAME_TABLES
+            for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD"))
+        ]
+        for name, event, table, row in triggers:
+            cursor.execute(
+                f"CREATE TEMP TRIGGER {name} AFTER {event} ON main.{table} BEGIN "
+                f"INSERT INTO game_revisions (board_id) VALUES ({row}.board_id) "
+                "ON CONFLICT (board_id) DO UPDATE SET revision = revision + 1; END"
+            )
+        try:
+            yield
+        finally:
+            for name, *_ in triggers:
+                cursor.execute(f"DROP TRIGGER temp.{name}")
+
+    def invalidate_game_parameters(self, board_id: int):
+        """Drops the cached board_parameters and players rows of a game, after they've been changed."""
+        with self._parameters_lock:
+            self._parameters_version += 1
+            self._game_parameters.pop(board_id, None)
+            if self._transaction_depth:
+                # Loads can still read the old rows until the transaction commits
+                self._stale_parameters.add(board_id)
+
+    def _get_game_parameters(
+        self, cursor: sqlite3.Cursor, board_ids: list[int], version: int, cached: bool = True
+    ) -> dict[int, _GameParameters]:
+        # `version` is _parameters_version from before the cursor's snapshot was taken.
+        # Without `cached` every game's rows are read again, e.g. for a snapshot that outlives this process
+        game_parameters = {board_id: self._game_parameters.get(board_id) if cached else None for board_id in board_ids}
+        missing = [board_id for board_id, parameters in game_parameters.items() if parameters is None]
+        if not missing:
+            return game_parameters
+        placeholders = ",".join("?" for _ in missing)
+        parameter_rows = defaultdict(list)
+        for board_id, *row in cursor.execute(
+            f"SELECT board_id, parameter_key, parameter_value FROM board_parameters WHERE board_id IN ({placeholders})", missing
+        ):
+            parameter_rows[board_id].append(tuple(row))
+        player_rows = defaultdict(list)
+        for board_id, *row in cursor.execute(
+            f"SELECT board_id, player_name, color, liege, points FROM players WHERE board_id IN ({placeholders})", missing
+        ):
+            player_rows[board_id].append(tuple(row))
+        loaded = {board_id: _GameParameters(parameter_rows[board_id], player_rows[board_id]) for board_id in missing}
+        with self._parameters_lock:
+            if version == self._parameters_version:
+                self._game_parameters.update(loaded)
+        game_parameters.update(loaded)
+        return game_parameters
 
     def _initialize_schema(self):
         # FIXME: move the sql file somewhere more accessible (maybe it shouldn't be inside the package? /resources ?)
@@ -58,55 +692,187 @@ class _DatabaseConnection:
             cursor.executescript(sql_file.read())
             cursor.close()
 
+    # Province, location and player names are stored as ids into the names table (see schema.sql).
+    # The views named after the tables decode them for reading; bulk writes encode them here instead of going through triggers.
+    def _name_id(self, cursor: sqlite3.Cursor, name: str | None) -> int | None:
+        if name is None:
+            return None
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            cursor.execute("INSERT OR IGNORE INTO names (name) VALUES (?)", (name,))
+            name_id = self._existing_name_id(cursor, name)
+        return name_id
+
+    # Like _name_id, but doesn't add unknown names; they can't match anything stored
+    def _existing_name_id(self, cursor: sqlite3.Cursor, name: str | None) -> int | None:
+        if name is None:
+            return None
+        if name not in self._name_ids:
+            row = cursor.execute("SELECT name_id FROM names WHERE name=?", (name,)).fetchone()
+            if row is None:
+                return None
+            self._name_ids[name] = row[0]
+        return self._name_ids[name]
+
     def get_game(self, board_id: int) -> Game:
         return self.get_games([board_id])[board_id]
 
-    def get_games(self, board_ids:Optional[list[int]]=None) -> dict[int, Game]:
-        cursor = self._connection.cursor()
+    @_read_on_database_thread
+    def get_games(
+        self, board_ids: Optional[list[int]] = None, use_snapshots: bool = False, lazy: bool = False
+    ) -> dict[int, Game]:
+        """Loads the games with the given ids, or every game.
+
+        With use_snapshots, a game with an up to date row in game_snapshots is restored from that instead of
+        being read from the tables, and a snapshot is saved for every game that had to be read from the tables.
+        With lazy, only the boards in models.game.active_turns are built; the rest are left as placeholders
+        that the game builds from the rows read here when they're first asked for.
+        """
+        parameters_version = self._parameters_version
+        snapshots_to_save: list[tuple[int, int, str, str, bytes]] = []
+        with _cyclic_gc_paused(), self._read_cursor() as cursor:
+            snapshots = self._get_snapshots(cursor, board_ids) if use_snapshots else {}
+            sql = f"SELECT {_BOARDS_COLUMNS} FROM boards"
+            conditions = []
+            args: list[int] = []
+            if board_ids is not None:
+                conditions.append(f"board_id IN ({','.join('?' for _ in board_ids)})")
+                args.extend(board_ids)
+            if snapshots:
+                conditions.append(f"board_id NOT IN ({','.join('?' for _ in snapshots)})")
+                args.extend(snapshots)
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+            board_data = cursor.execute(sql, args).fetchall()
+
+            # Parents are boards of the same game, so their numeric turn columns are usually in board_data too
+            turn_keys = {(row[0], row[1]): row[7:] for row in board_data}
+            deltas = {(row[0], row[1]): (row[5], row[6]) for row in board_data if row[5] and row[6]}
+            for (board_id, phase_string), (parent, _) in deltas.items():
+                if (board_id, parent) not in turn_keys:
+                    logger.warning(f"Board {board_id} {phase_string} only stores changed provinces, but its parent {parent} is missing")
+            table_ids = sorted({row[0] for row in board_data})
+            game_parameters = self._get_game_parameters(cursor, table_ids, parameters_version, cached=not use_snapshots)
+            rows_by_game: dict[int, _BoardRows] = {}
+            if table_ids:
+                table_rows = _BoardRows.select(cursor, table_ids if snapshots else board_ids, deltas)
+                rows_by_game = dict.fromkeys(table_ids, table_rows)
+            if use_snapshots and table_ids:
+                snapshots_to_save = self._encode_snapshots(cursor, board_data, table_rows, game_parameters)
+            for board_id, (snapshot_board_rows, snapshot_rows, snapshot_parameters) in snapshots.items():
+                board_data.extend(snapshot_board_rows)
+                turn_keys.update({(row[0], row[1]): row[7:] for row in snapshot_board_rows})
+                rows_by_game[board_id] = snapshot_rows
+                game_parameters[board_id] = snapshot_parameters
+
+            logger.info(f"Loading {len(board_data)} boards from DB")
+            games: dict[int, tuple[Board,list[tuple[Turn,BoardPlaceholder]]]] = {}
+            sources: dict[int, _BoardSource] = {}
+            for board_row in board_data:
+                board_id, phase_string, data_file, fish, name, parent, _, *turn_key = board_row
+
+                current_turn = _turn_from_columns(phase_string, *turn_key)
+                if current_turn is None:
+                    logger.warning(f"Could not parse turn string '{phase_string}' for board {board_id}")
+                    continue
+                if parent:
+                    parent = _turn_from_columns(parent, *turn_keys.get((board_id, parent), (None, None, None)))
+                #if (board_id, str(current_turn.get_next_turn())) in board_keys:
+                #    continue
+
+                if fish is None:
+                    fish = 0
+
+                if board_id not in games:
+                    # Every board of the game shares the one data dict
+                    topology = get_parser(data_file).get_topology()
+                    games[board_id]=(topology.create_board(game_parameters[board_id].build_data(topology.data)),[])
+                    sources[board_id] = _BoardSource(self, rows_by_game[board_id], game_parameters[board_id])
+                placeholder = BoardPlaceholder(
+                    current_turn, board_id, games[board_id][0].data, sources[board_id], (fish, name, parent, data_file)
+                )
+                games[board_id][1].append( (current_turn, placeholder) )
+
+            game_dict = {}
+            for k,v in games.items():
+                g = Game(*v)
+                if lazy:
+                    active = active_turns(g.all_turns())
+                    g.build_boards([t for ts in g.all_turns() for t in ts if t in active])
+                else:
+                    g.build_boards([t for ts in g.all_turns() for t in ts])
+                game_dict[k] = g
+            logger.info("Successfully loaded")
+        if snapshots_to_save:
+            self._save_snapshots(snapshots_to_save)
+        return game_dict
 
+    def _get_snapshots(
+        self, cursor: sqlite3.Cursor, board_ids: Optional[list[int]]
+    ) -> dict[int, tuple[list[tuple], _BoardRows, _GameParameters]]:
+        # Snapshots which still match both the game's rows and the variant's files, decoded
+        sql = (
+            "SELECT board_id, game_snapshots.revision, COALESCE(game_revisions.revision, 0), data_file, fingerprint, snapshot"
+            " FROM game_snapshots LEFT JOIN game_revisions USING (board_id)"
+        )
+        args: list[int] = []
         if board_ids is not None:
-            placeholders = ",".join("?" for _ in board_ids)
-            sql = f"SELECT * FROM boards WHERE board_id IN ({placeholders})"
-            board_data = cursor.execute(sql, board_ids).fetchall()
-        else:
-            board_data = cursor.execute("SELECT * FROM boards").fetchall()
-
-        board_keys = [(row[0], row[1]) for row in board_data]
-        logger.info(f"Loading {len(board_data)} boards from DB")
-        games: dict[int, tuple[str,list[tuple[Turn,Board]]]] = {}
-        for board_row in board_data:
-            board_id, phase_string, data_file, fish, name, parent = board_row
-
-            current_turn = Turn.turn_from_string(phase_string)
-            if current_turn is None:
-                logger.warning(f"Could not parse turn string '{phase_string}' for board {board_id}")
+            sql += f" WHERE board_id IN ({','.join('?' for _ in board_ids)})"
+            args = board_ids
+        snapshots = {}
+        for board_id, revision, current_revision, data_file, fingerprint, snapshot in cursor.execute(sql, args).fetchall():
+            if revision != current_revision:
+                logger.info(f"Snapshot of game {board_id} is out of date; loading it from the tables")
                 continue
-            if parent:
-                parent = Turn.turn_from_string(parent)
-            #if (board_id, str(current_turn.get_next_turn())) in board_keys:
-            #    continue
-
-            if fish is None:
-                fish = 0
-
-            board = self._get_board_partial(
-                board_id, current_turn, fish, name, parent, data_file, cursor, year_offset=True
+            try:
+                if fingerprint != _snapshot_fingerprint(data_file):
+                    logger.info(f"Snapshot of game {board_id} is from another version of {data_file}; loading it from the tables")
+                    continue
+                topology = get_parser(data_file).get_topology()
+                snapshots[board_id] = _decode_snapshot(board_id, snapshot, topology.province_names)
+            except Exception as ex:
+                logger.warning(f"Could not restore the snapshot of game {board_id}; loading it from the tables", exc_info=ex)
+        logger.info(f"Restoring {len(snapshots)} games from snapshots")
+        return snapshots
+
+    def _encode_snapshots(
+        self,
+        cursor: sqlite3.Cursor,
+        board_data: list[tuple],
+        rows: _BoardRows,
+        game_parameters: dict[int, _GameParameters],
+    ) -> list[tuple[int, int, str, str, bytes]]:
+        # game_snapshots rows for the games just read from the tables, at the revision `cursor` sees them at
+        boards_by_game: dict[int, list[tuple]] = defaultdict(list)
+        for board_row in board_data:
+            boards_by_game[board_row[0]].append(board_row)
+        revisions = dict(
+            cursor.execute(
+                f"SELECT board_id, revision FROM game_revisions WHERE board_id IN ({','.join('?' for _ in boards_by_game)})",
+                list(boards_by_game),
             )
-            if board_id not in games:
-                games[board_id]=(get_parser(data_file).parse(),[]) # TODO: don't reparse the file for every board
-            games[board_id][1].append( (current_turn, board) )
-
-        logger.info("Successfully loaded")
-        game_dict = {}
-        for k,v in games.items():
-            g = Game(*v)
-            for ts in g.all_turns():
-                for t in ts:
-                    self._finish_build_board(g.get_board(t), g, cursor)
-            game_dict[k] = g
-            g.add_adjacencies()
+        )
+        snapshots = []
+        for board_id, game_board_rows in boards_by_game.items():
+            data_files = {board_row[2] for board_row in game_board_rows}
+            if len(data_files) != 1:
+                continue
+            data_file = data_files.pop()
+            province_names = get_parser(data_file).get_topology().province_names
+            snapshot = _encode_snapshot(board_id, game_board_rows, rows, game_parameters[board_id], province_names)
+            snapshots.append((board_id, revisions.get(board_id, 0), data_file, _snapshot_fingerprint(data_file), snapshot))
+        return snapshots
+
+    @_on_database_thread
+    def _save_snapshots(self, snapshots: list[tuple[int, int, str, str, bytes]]):
+        # A snapshot taken before a later write keeps the older revision, so it's simply never used
+        cursor = self._connection.cursor()
+        cursor.executemany(
+            "INSERT OR REPLACE INTO game_snapshots (board_id, revision, data_file, fingerprint, snapshot) VALUES (?, ?, ?, ?, ?)",
+            snapshots,
+        )
         cursor.close()
-        return game_dict
+        self._commit()
     """
     def get_board(
         self,
@@ -141,11 +907,11 @@ class _DatabaseConnection:
         data_file: str,
         cursor,
         year_offset: bool = False,
+        data: dict | None = None,
     ) -> Board:
         logger.info(f"Loading board with ID {board_id}")
-        # TODO - we should eventually store things like coords, adjacencies, etc
-        #  so we don't have to reparse the whole board each time
-        board = get_parser(data_file).parse()
+        # The SVG is only parsed once per variant; this builds the board from the cached topology
+        board = get_parser(data_file).get_topology().create_board(data)
         #print("_get_board_partial ",board.year_offset, turn,turn.timeline)
         board.turn = turn #Turn(turn.year, turn.phase, board.year_offset, turn.timeline) if year_offset else turn
         board.fish = fish
@@ -159,37 +925,17 @@ class _DatabaseConnection:
         board: Board,
         game: Game, # dict[(int, PhaseName, int)],
         cursor,
+        rows: _BoardRows,
+        game_parameters: _GameParameters,
         clear_status: bool = False,
         ):
-        # It's not the end of the world if we rebuild the params afresh for each board, although they could be calculated per game
         board_id = board.board_id
 
-        board_params = cursor.execute(
-            "SELECT parameter_key, parameter_value FROM board_parameters WHERE board_id=?",
-            (board_id,),
-        ).fetchall()
-
-        # Turning a key deliniated with slashes into a nested dict
-        for key, value in board_params:
-            cur_dict = board.data
-            split_key = key.split("/", 1)
-            while len(split_key) > 1:
-                if split_key[0] not in cur_dict:
-                    cur_dict[split_key[0]] = {}
-                cur_dict = cur_dict[split_key[0]]
-                split_key = split_key[1].split("/", 1)
-            cur_dict[split_key[0]] = value
+        # board.data already has the game's parameters applied
         if board.data["players"] != "chaos":
             board.update_players()
 
-        player_data = cursor.execute(
-            "SELECT player_name, color, liege, points FROM players WHERE board_id=?",
-            (board_id,),
-        ).fetchall()
-        player_info_by_name = {
-            player_name: (color, liege, points)
-            for player_name, color, liege, points in player_data
-        }
+        player_info_by_name = game_parameters.players
         name_to_player = {player.name: player for player in board.players}
         for player in board.players:
             if player.name not in player_info_by_name:
@@ -208,10 +954,7 @@ class _DatabaseConnection:
             player.centers = set()
             # TODO - player build orders
         if board.turn.is_builds():
-            builds_data = cursor.execute(
-                "SELECT player, location, is_build, is_army FROM builds WHERE board_id=? and phase=?",
-                (board_id, board.turn.get_indexed_name()),
-            ).fetchall()
+            builds_data = rows.for_board(rows.builds, board)
 
             def get_player_by_name(player_name) -> Player | None:
                 player_by_name = {player.name: player for player in board.players}
@@ -229,20 +972,14 @@ class _DatabaseConnection:
                     continue
 
                 if is_build:
-                    player_order = Build(
-                        board.get_province_and_coast(location)[0],
-                        UnitType.ARMY if is_army else UnitType.FLEET,
-                        board.get_province_and_coast(location)[1],
-                    )
+                    province, coast = board.get_location(location)
+                    player_order = Build(province, UnitType.ARMY if is_army else UnitType.FLEET, coast)
                 else:
-                    player_order = Disband(board.get_province(location))
+                    player_order = Disband(board.get_location(location)[0])
 
                 player.build_orders.add(player_order)
 
-            vassals_data = cursor.execute(
-                "SELECT player, target_player, order_type FROM vassal_orders WHERE board_id=? and phase=?",
-                (board_id, board.turn.get_indexed_name()),
-            ).fetchall()
+            vassals_data = rows.for_board(rows.vassal_orders, board)
 
             order_classes = [
                 Vassal,
@@ -268,23 +1005,18 @@ class _DatabaseConnection:
 
                 player.vassal_orders[target_player] = order
 
-        province_data = cursor.execute(
-            "SELECT province_name, owner, core, half_core FROM provinces WHERE board_id=? and phase=?",
-            (board_id, board.turn.get_indexed_name()),
-        ).fetchall()
+        province_data = rows.provinces_for_board(board)
         province_info_by_name = {
             province_name: (owner, core, half_core)
             for province_name, owner, core, half_core in province_data
         }
         
+        unit_data = rows.for_board(rows.units, board)
         if clear_status:
-            cursor.execute("UPDATE units SET failed_order=False WHERE board_id=? and phase=?",
+            cursor.execute("UPDATE units_encoded SET failed_order=False WHERE board_id=? and phase=?",
                 (board_id, board.turn.get_indexed_name()))
-        
-        unit_data = cursor.execute(
-            "SELECT location, is_dislodged, owner, is_army, order_type, order_destination, order_source, failed_order FROM units WHERE board_id=? and phase=?",
-            (board_id, board.turn.get_indexed_name()),
-        ).fetchall()
+            self._bump_revision(cursor, board_id)
+            unit_data = [unit_info[:-1] + (False,) for unit_info in unit_data]
         for province in board.provinces:
             province.set_turn(board.turn)
             if province.name not in province_info_by_name:
@@ -330,19 +1062,16 @@ class _DatabaseConnection:
                 order_source,
                 hasFailed,
             ) = unit_info
-            province, coast = board.get_province_and_coast(location)
+            province, coast = board.get_location(location)
             owner_player = board.get_player(owner)
             if owner_player is None:
                 logger.warning(f"Couldn't find corresponding player for {owner} in DB")
                 continue
             if is_dislodged:
-                retreat_ops = cursor.execute(
-                    "SELECT retreat_loc FROM retreat_options WHERE board_id=? and phase=? and origin=?",
-                    (board_id, board.turn.get_indexed_name(), location),
-                )
-                retreat_options = set(
-                    map(board.get_province_and_coast, set().union(*retreat_ops))
-                )
+                retreat_options = {
+                    board.get_location(retreat_loc)
+                    for (retreat_loc,) in rows.for_unit(rows.retreat_options, board, location)
+                }
             else:
                 retreat_options = None
             unit = Unit(
@@ -360,6 +1089,11 @@ class _DatabaseConnection:
             board.units.add(unit)
         # AAAAA We shouldn't be having to loop twice; why is ComplexOrder.source a Unit? Turn it into a province or something
         # Currently we have to loop twice because it's a unit and we need to have all the units set up before parsing orders because of it
+        self._set_unit_orders(board, game, unit_data)
+        return board
+
+    def _set_unit_orders(self, board: Board, game: Game, unit_data: list[tuple]):
+        # The units at unit_data's locations must already be on `board`
         for unit_info in unit_data:
             try:
                 (
@@ -411,7 +1145,7 @@ class _DatabaseConnection:
                     
                     order.hasFailed = hasFailed
 
-                    province, coast = board.get_province_and_coast(location)
+                    province, coast = board.get_location(location)
                     if is_dislodged:
                         assert province.dislodged_unit is not None
                         province.dislodged_unit.order = order
@@ -422,14 +1156,116 @@ class _DatabaseConnection:
                 raise e # TODO: !!! remove this when stable
                 logger.warning("BAD UNIT INFO: replacing with hold")
                 continue
-        return board
 
+    def copy_game(self, game: Game, turns: Iterable[Turn]) -> Game:
+        """A game with copies of the boards at `turns`, sharing game's own boards for every other turn.
+
+        The copies are built from the rows save_board would write for them, so they come out as they would from
+        a reload, and can be changed (e.g. by an adjudicator) without touching `game`. Only the copies are 5D-adjacent
+        to the boards of the new game, the shared boards staying adjacent to game's own, so every moves board that is
+        looked at across boards has to be copied too.
+        Boards that are still placeholders are shared rather than copied, since building one leaves `game` as it was.
+        """
+        with _cyclic_gc_paused():
+            originals = {}
+            for turn in turns:
+                board = game.get_board_or_placeholder(turn)
+                if not isinstance(board, BoardPlaceholder):
+                    originals[turn] = board
+            copies = {
+                key: self._get_board_partial(
+                    board.board_id, board.turn, board.fish, board.name, board.parent, board.datafile, None, data=board.data
+                )
+                for key, board in originals.items()
+            }
+            boards = []
+            for timeline in game.all_turns():
+                for turn in timeline:
+                    board = copies.get(turn) or game.get_board_or_placeholder(turn)
+                    boards.append((board.turn, board))
+            copied_game = Game(game.variant, boards)
+            rows = _BoardRows.from_boards(originals.values())
+            for key, board in copies.items():
+                self._finish_build_board(board, copied_game, None, rows, _GameParameters([], _player_rows(originals[key])))
+        return copied_game
+
+    def copy_orders(self, game: Game, boards: Iterable[Board]):
+        """Gives the units of game's boards the orders of their copies in `boards` (see copy_game)."""
+        boards = list(boards)
+        rows = _BoardRows.from_boards(boards)
+        for board in boards:
+            unit_data = rows.for_board(rows.units, board)
+            original = game.get_board_or_placeholder(board.turn)
+            if isinstance(original, BoardPlaceholder):
+                # It's built from these once it's needed
+                original.source.rows.units[(board.board_id, board.turn.get_indexed_name())] = unit_data
+            else:
+                self._set_unit_orders(original, game, unit_data)
+
+    def insert_boards(self, game: Game, boards: list[Board]):
+        """Adds copies of boards that were just saved with save_board to `game`, so that it matches a reload.
+
+        save_board also rewrites the game's players rows, which every board of a reloaded game would pick up,
+        so the players of game's other boards are updated from them as well.
+        """
+        with _cyclic_gc_paused():
+            rows = _BoardRows.from_boards(boards)
+            players = {}
+            for board in boards:
+                players.update((row[0], row) for row in _player_rows(board))
+            game_parameters = _GameParameters([], list(players.values()))
+            for board in game.loaded_boards():
+                self._update_players(board, game_parameters)
+            for source in {id(placeholder.source): placeholder.source for placeholder in game.placeholders()}.values():
+                source.game_parameters = _GameParameters(
+                    source.game_parameters.parameters,
+                    [(name, *info) for name, info in {**source.game_parameters.players, **game_parameters.players}.items()],
+                )
+
+            new_boards = [
+                self._get_board_partial(
+                    board.board_id, board.turn, board.fish, board.name, board.parent, board.datafile, None, data=game.data
+                )
+                for board in boards
+            ]
+            game.add_boards(new_boards)
+            for board in new_boards:
+                self._finish_build_board(board, game, None, rows, game_parameters)
+
+    @staticmethod
+    def _update_players(board: Board, game_parameters: _GameParameters):
+        # The players part of _finish_build_board, for a board that already has its units and centers
+        name_to_player = {player.name: player for player in board.players}
+        for player in board.players:
+            if player.name in game_parameters.players:
+                color, liege, points = game_parameters.players[player.name]
+                player.render_color = color
+                player.liege = None if liege is None else name_to_player.get(liege)
+                player.points = points
+            player.vassals = []
+        for player in board.players:
+            if player.liege is not None:
+                player.liege.vassals.append(player)
+
+    @_on_database_thread
     def save_board(self, board_id: int, board: Board):
         # TODO: Check if board already exists
         cursor = self._connection.cursor()
+        parent_phase = board.parent and board.parent.get_indexed_name()
+        delta_depth = self._next_delta_depth(cursor, board_id, parent_phase)
         cursor.execute(
-            "INSERT INTO boards (board_id, phase, data_file, fish, name, parent_phase) VALUES (?, ?, ?, ?, ?, ?)",
-            (board_id, board.turn.get_indexed_name(), board.datafile, board.fish, board.name, board.parent and board.parent.get_indexed_name()),
+            "INSERT INTO boards (board_id, phase, data_file, fish, name, parent_phase, timeline, year, phase_ordinal, delta_depth) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                board_id,
+                board.turn.get_indexed_name(),
+                board.datafile,
+                board.fish,
+                board.name,
+                parent_phase,
+                *_turn_columns(board.turn),
+                delta_depth,
+            ),
         )
         cursor.executemany(
             "INSERT INTO players (board_id, player_name, color, liege, points) VALUES (?, ?, ?, ?, ?) ON CONFLICT "
@@ -437,19 +1273,7 @@ class _DatabaseConnection:
             "color = ?, "
             "liege = ?, "
             "points = ?",
-            [
-                (
-                    board_id,
-                    player.name,
-                    player.render_color,
-                    (None if player.liege is None else str(player.liege)),
-                    player.points,
-                    player.render_color,
-                    (None if player.liege is None else str(player.liege)),
-                    player.points,
-                )
-                for player in board.players
-            ],
+            [(board_id, *row, *row[1:]) for row in _player_rows(board)],
         )
 
         # cache = []
@@ -472,33 +1296,22 @@ class _DatabaseConnection:
                 print(f"{p.name} repeats!!!")
             cache.append(p.name)
 
+        province_rows = [
+            (board_id, board.turn.get_indexed_name(), *(self._name_id(cursor, name) for name in row))
+            for row in _province_rows(board)
+        ]
+        if delta_depth:
+            parent_provinces = self._stored_provinces(cursor, board_id, parent_phase)
+            province_rows = [row for row in province_rows if parent_provinces.get(row[2]) != row[3:]]
         cursor.executemany(
-            "INSERT INTO provinces (board_id, phase, province_name, owner, core, half_core) VALUES (?, ?, ?, ?, ?, ?)",
-            [
-                (
-                    board_id,
-                    board.turn.get_indexed_name(),
-                    province.name,
-                    province.owner.name if province.owner else None,
-                    province.core.name if province.core else None,
-                    province.half_core.name if province.half_core else None,
-                )
-                for province in board.provinces
-            ],
+            "INSERT INTO provinces_encoded (board_id, phase, province_id, owner_id, core_id, half_core_id) VALUES (?, ?, ?, ?, ?, ?)",
+            province_rows,
         )
         cursor.executemany(
-            "INSERT INTO builds (board_id, phase, player, location, is_build, is_army) VALUES (?, ?, ?, ?, ?, ?)",
+            "INSERT INTO builds_encoded (board_id, phase, player_id, location_id, is_build, is_army) VALUES (?, ?, ?, ?, ?, ?)",
             [
-                (
-                    board_id,
-                    board.turn.get_indexed_name(),
-                    player.name,
-                    build_order.province.get_name(build_order.coast),
-                    isinstance(build_order, Build),
-                    getattr(build_order, "unit_type", None) == UnitType.ARMY,
-                )
-                for player in board.players
-                for build_order in player.build_orders if isinstance(build_order, PlayerOrder)
+                (board_id, board.turn.get_indexed_name(), self._name_id(cursor, player_name), self._name_id(cursor, location), is_build, is_army)
+                for player_name, location, is_build, is_army in _build_rows(board)
             ],
         )
         # print("SAVING units ",board.turn)
@@ -527,24 +1340,17 @@ class _DatabaseConnection:
         #     for x in board.get_units():
         #         print(x.province.turn,x,x.order)
         cursor.executemany(
-            "INSERT INTO units (board_id, phase, location, is_dislodged, owner, is_army, order_type, order_destination, order_source, failed_order) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            "INSERT INTO units_encoded (board_id, phase, location_id, is_dislodged, owner_id, is_army, order_type, order_destination, order_source, failed_order) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
             [
                 (
                     board_id,
                     board.turn.get_indexed_name(),
-                    unit.province.get_name(unit.coast),
-                    unit == unit.province.dislodged_unit,
-                    unit.player.name,
-                    unit.unit_type == UnitType.ARMY,
-                    unit.order.__class__.__name__ if unit.order is not None else None,
-                    unit.order.get_destination_str() if unit.order is not None else None,
-                    unit.order.get_source_str() if unit.order is not None else None,
-                    unit.order.hasFailed if unit.order is not None else False
+                    self._name_id(cursor, location),
+                    is_dislodged,
+                    self._name_id(cursor, owner),
+                    *other_columns,
                 )
-                for unit in board.get_units()
-                # for province in board.provinces
-                # for unit in [province.unit, province.dislodged_unit]
-                # if unit is not None
+                for location, is_dislodged, owner, *other_columns in _unit_rows(board)
             ],
         )
         # print("RETREAT SAVING", board.turn, [
@@ -559,53 +1365,97 @@ class _DatabaseConnection:
         #         for retreat_option in unit.retreat_options
         #     ])
         cursor.executemany(
-            "INSERT INTO retreat_options (board_id, phase, origin, retreat_loc) VALUES (?, ?, ?, ?)",
+            "INSERT INTO retreat_options_encoded (board_id, phase, origin_id, retreat_loc_id) VALUES (?, ?, ?, ?)",
             [
-                (
-                    board_id,
-                    board.turn.get_indexed_name(),
-                    unit.province.get_name(unit.coast),
-                    retreat_option[0].get_name(retreat_option[1]),
-                )
-                for unit in board.get_units()
-                #for unit in board.units
-                if unit.retreat_options is not None
-                for retreat_option in unit.retreat_options
+                (board_id, board.turn.get_indexed_name(), self._name_id(cursor, origin), self._name_id(cursor, retreat_loc))
+                for origin, retreat_loc in _retreat_option_rows(board)
             ],
         )
+        self._bump_revision(cursor, board_id)
         cursor.close()
-        self._connection.commit()
+        self._commit()
+        # The players rows were just rewritten
+        self.invalidate_game_parameters(board_id)
+
+    def _next_delta_depth(self, cursor: sqlite3.Cursor, board_id: int, parent_phase: str | None) -> int:
+        """The delta_depth to save a child of parent_phase with; 0 means storing every province."""
+        if parent_phase is None or self._province_keyframe_interval <= 1:
+            return 0
+        row = cursor.execute(
+            "SELECT delta_depth FROM boards WHERE board_id=? AND phase=?", (board_id, parent_phase)
+        ).fetchone()
+        if row is None:
+            return 0
+        delta_depth = (row[0] or 0) + 1
+        return delta_depth if delta_depth < self._province_keyframe_interval else 0
+
+    def _stored_provinces(self, cursor: sqlite3.Cursor, board_id: int, phase: str) -> dict[int, tuple]:
+        """province_id -> (owner_id, core_id, half_core_id) of a board, following its parents back to the last full board."""
+        phases = []
+        while True:
+            phases.append(phase)
+            row = cursor.execute(
+                "SELECT parent_phase, delta_depth FROM boards WHERE board_id=? AND phase=?", (board_id, phase)
+            ).fetchone()
+            if row is None or not row[0] or not row[1]:
+                break
+            phase = row[0]
+        provinces = {}
+        for phase in reversed(phases):
+            for province_id, *values in cursor.execute(
+                "SELECT province_id, owner_id, core_id, half_core_id FROM provinces_encoded WHERE board_id=? AND phase=?",
+                (board_id, phase),
+            ):
+                provinces[province_id] = tuple(values)
+        return provinces
+
+    def _store_all_provinces(self, cursor: sqlite3.Cursor, board_id: int, phase: str):
+        # Turns a delta board into one with a row for every province
+        cursor.executemany(
+            "INSERT OR REPLACE INTO provinces_encoded (board_id, phase, province_id, owner_id, core_id, half_core_id) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(board_id, phase, province_id, *values) for province_id, values in self._stored_provinces(cursor, board_id, phase).items()],
+        )
+        cursor.execute("UPDATE boards SET delta_depth=0 WHERE board_id=? AND phase=?", (board_id, phase))
+
+    @_on_database_thread
+    def detach_board(self, board: Board):
+        """Stores every province of the board and of its children that are deltas against it.
+
+        Needed before changing a saved board in place, since the province rows being edited might be
+        stored on an ancestor, and children would otherwise pick up the change too.
+        """
+        cursor = self._connection.cursor()
+        phase = board.turn.get_indexed_name()
+        children = cursor.execute(
+            "SELECT phase FROM boards WHERE board_id=? AND parent_phase=? AND delta_depth > 0", (board.board_id, phase)
+        ).fetchall()
+        # Children first, so that they still see this board as it was
+        for (child_phase,) in children:
+            self._store_all_provinces(cursor, board.board_id, child_phase)
+        row = cursor.execute(
+            "SELECT delta_depth FROM boards WHERE board_id=? AND phase=?", (board.board_id, phase)
+        ).fetchone()
+        if row is not None and row[0]:
+            self._store_all_provinces(cursor, board.board_id, phase)
+        if children or (row is not None and row[0]):
+            self._bump_revision(cursor, board.board_id)
+        cursor.close()
+        self._commit()
 
+    @_on_database_thread
     def save_order_for_units(self, board: Board, units: Iterable[Unit]):
         units = list(units)
         #print("save_order_for_units",board.turn, [(u.province.order_str(),str(u.order)) for u in units])
         cursor = self._connection.cursor()
+        self._write_orders(cursor, board.board_id, board.turn.get_indexed_name(), order_rows(board, units))
         cursor.executemany(
-            "UPDATE units SET order_type=?, order_destination=?, order_source=?, failed_order=? "
-            "WHERE board_id=? and phase=? and (location=? or location=?) and is_dislodged=?",
-            [
-                (
-                    unit.order.__class__.__name__ if unit.order is not None else None,
-                    unit.order.get_destination_str() if unit.order is not None else None,
-                    unit.order.get_source_str() if unit.order is not None else None,
-                    unit.order.hasFailed if unit.order is not None else False,
-                    board.board_id,
-                    board.turn.get_indexed_name(),
-                    unit.province.get_name(unit.coast),
-                    f"{unit.province.get_name()} coast" if not unit.coast else None, # Legacy coast support
-                    unit.province.dislodged_unit == unit,
-                )
-                for unit in units
-                if unit.province.turn == board.turn
-            ],
-        )
-        cursor.executemany(
-            "DELETE FROM retreat_options WHERE board_id=? and phase=? and origin=?",
+            "DELETE FROM retreat_options_encoded WHERE board_id=? and phase=? and origin_id=?",
             [
                 (
                     board.board_id,
                     board.turn.get_indexed_name(),
-                    unit.province.get_name(unit.coast),
+                    self._name_id(cursor, unit.province.get_name(unit.coast)),
                 )
                 for unit in units
                 if unit.province.turn == board.turn
@@ -613,13 +1463,13 @@ class _DatabaseConnection:
             ],
         )
         cursor.executemany(
-            "INSERT INTO retreat_options (board_id, phase, origin, retreat_loc) VALUES (?, ?, ?, ?)",
+            "INSERT INTO retreat_options_encoded (board_id, phase, origin_id, retreat_loc_id) VALUES (?, ?, ?, ?)",
             [
                 (
                     board.board_id,
                     board.turn.get_indexed_name(),
-                    unit.province.get_name(unit.coast),
-                    retreat_option[0].get_name(retreat_option[1]),
+                    self._name_id(cursor, unit.province.get_name(unit.coast)),
+                    self._name_id(cursor, retreat_option[0].get_name(retreat_option[1])),
                 )
                 for unit in units
                 if unit.province.turn == board.turn
@@ -627,59 +1477,145 @@ class _DatabaseConnection:
                 for retreat_option in unit.retreat_options
             ],
         )
+        self._bump_revision(cursor, board.board_id)
         cursor.close()
-        self._connection.commit()
+        self._commit()
+
+    @_on_database_thread
+    def save_submitted_orders(self, board_id: int, orders: dict[str, list[tuple]], submitted_by: str | None = None) -> int:
+        """Saves the orders from one submission, given as order_rows by phase, in one transaction.
+
+        Only units whose stored order differs are written, and each board's changes are added to order_journal, so
+        submitting the same orders again writes nothing. Returns how many units' orders changed.
+        """
+        changed = 0
+        with self.transaction():
+            cursor = self._connection.cursor()
+            for phase, rows in orders.items():
+                changed_rows = self._write_orders(cursor, board_id, phase, rows)
+                if not changed_rows:
+                    continue
+                cursor.execute(
+                    "INSERT INTO order_journal (board_id, phase, submitted_at, submitted_by, changes) "
+                    "VALUES (?, ?, CAST(strftime('%s', 'now') AS INTEGER), ?, ?)",
+                    (board_id, phase, submitted_by, json.dumps(changed_rows)),
+                )
+                changed += len(changed_rows)
+            if changed:
+                self._bump_revision(cursor, board_id)
+            cursor.close()
+        return changed
+
+    def _write_orders(self, cursor: sqlite3.Cursor, board_id: int, phase: str, rows: list[tuple]) -> list[tuple]:
+        # Updates the units whose stored order differs from theirs in `rows` (see order_rows), and returns those rows
+        stored = {
+            (location_id, bool(is_dislodged)): (order_type, order_destination, order_source, bool(failed_order))
+            for location_id, is_dislodged, order_type, order_destination, order_source, failed_order in cursor.execute(
+                "SELECT location_id, is_dislodged, order_type, order_destination, order_source, failed_order "
+                "FROM units_encoded WHERE board_id=? AND phase=?",
+                (board_id, phase),
+            )
+        }
+        updates = []
+        changed_rows = []
+        for row in rows:
+            location, is_dislodged, order_type, order_destination, order_source, failed_order = row
+            order = (order_type, order_destination, order_source, bool(failed_order))
+            # Units saved without a coast used to be stored as "<province> coast"
+            for name in (location, f"{location} coast"):
+                location_id = self._existing_name_id(cursor, name)
+                key = (location_id, bool(is_dislodged))
+                if location_id is None or key not in stored:
+                    continue
+                if stored[key] != order:
+                    updates.append((*order, board_id, phase, location_id, is_dislodged))
+                    changed_rows.append(row)
+                break
+        cursor.executemany(
+            "UPDATE units_encoded SET order_type=?, order_destination=?, order_source=?, failed_order=? "
+            "WHERE board_id=? and phase=? and location_id=? and is_dislodged=?",
+            updates,
+        )
+        return changed_rows
+
+    @_read_on_database_thread
+    def get_order_journal(self, board_id: int, phase: str | None = None) -> list[tuple[int, str, int, str | None, list[tuple]]]:
+        """(entry_id, phase, submitted_at, submitted_by, changed order_rows) of a game's order submissions, oldest first."""
+        sql = "SELECT entry_id, phase, submitted_at, submitted_by, changes FROM order_journal WHERE board_id=?"
+        args: list = [board_id]
+        if phase is not None:
+            sql += " AND phase=?"
+            args.append(phase)
+        with self._read_cursor() as cursor:
+            rows = cursor.execute(sql + " ORDER BY entry_id", args).fetchall()
+        return [
+            (entry_id, entry_phase, submitted_at, submitted_by, [tuple(row) for row in json.loads(changes)])
+            for entry_id, entry_phase, submitted_at, submitted_by, changes in rows
+        ]
+
+    def replay_orders(self, board_id: int, phase: str, until: int | None = None) -> dict[tuple[str, bool], tuple]:
+        """The submitted orders of a board as of journal entry `until` (or the latest), replayed from order_journal.
+
+        Maps (location, is_dislodged) to (order_type, order_destination, order_source, failed_order) for every unit
+        that was given an order.
+        """
+        orders = {}
+        for entry_id, _, _, _, changes in self.get_order_journal(board_id, phase):
+            if until is not None and entry_id > until:
+                break
+            for location, is_dislodged, *order in changes:
+                orders[(location, is_dislodged)] = tuple(order)
+        return orders
 
     def save_build_orders_for_players(self, board: Board, player: Player | None):
-        #print("Saving builds "+str(board.turn),len(player.build_orders))
-        if player is None:
-            players = board.players
-        else:
-            players = {board.name_to_player[player.name.lower()]}
+        self.save_build_orders(board.board_id, board.turn.get_indexed_name(), *build_order_rows(board, player))
+
+    @_on_database_thread
+    def save_build_orders(
+        self, board_id: int, phase: str, builds: list[tuple[str, str, bool, bool]], vassal_orders: list[tuple[str, str, str]]
+    ):
+        """Saves the build and vassal orders of build_order_rows."""
         cursor = self._connection.cursor()
         cursor.executemany(
-            "INSERT INTO builds (board_id, phase, player, location, is_build, is_army) VALUES (?, ?, ?, ?, ?, ?) "
-            "ON CONFLICT (board_id, phase, player, location) DO UPDATE SET is_build=?, is_army=?",
+            "INSERT INTO builds_encoded (board_id, phase, player_id, location_id, is_build, is_army) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (board_id, phase, player_id, location_id) DO UPDATE SET is_build=?, is_army=?",
             [
                 (
-                    board.board_id,
-                    board.turn.get_indexed_name(),
-                    player.name,
-                    build_order.province.get_name(build_order.coast if isinstance(build_order, Build) else None),
-                    isinstance(build_order, Build),
-                    getattr(build_order, "unit_type", None) == UnitType.ARMY,
-                    isinstance(build_order, Build),
-                    getattr(build_order, "unit_type", None) == UnitType.ARMY,
+                    board_id,
+                    phase,
+                    self._name_id(cursor, player_name),
+                    self._name_id(cursor, location),
+                    is_build,
+                    is_army,
+                    is_build,
+                    is_army,
                 )
-                for player in players
-                for build_order in player.build_orders if isinstance(build_order, PlayerOrder)
+                for player_name, location, is_build, is_army in builds
             ],
         )
         cursor.executemany(
             "INSERT INTO vassal_orders (board_id, phase, player, target_player, order_type) VALUES (?, ?, ?, ?, ?) ",
-            [
-                (
-                    board.board_id,
-                    board.turn.get_indexed_name(),
-                    player.name,
-                    build_order.player.name,
-                    build_order.__class__.__name__,
-                )
-                for player in players
-                for build_order in player.vassal_orders.values()
-            ],
+            [(board_id, phase, *row) for row in vassal_orders],
         )
+        self._bump_revision(cursor, board_id)
         cursor.close()
-        self._connection.commit()
+        self._commit()
+
+    @_read_on_database_thread
+    def get_game_ids(self, board_ids: Optional[list[int]] = None) -> set[int]:
+        """The ids of the games that have boards or are archived (only out of board_ids, if given), without loading them."""
+        with self._read_cursor() as cursor:
+            ids = {board_id for (board_id,) in cursor.execute("SELECT DISTINCT board_id FROM boards UNION SELECT board_id FROM archived_games")}
+        return ids if board_ids is None else ids & set(board_ids)
 
+    @_read_on_database_thread
     def get_spec_requests(self) -> dict[int, list[SpecRequest]]:
         requests = {}
 
-        cursor = self._connection.cursor()
-        request_data = cursor.execute(
-            "SELECT server_id, user_id, role_id FROM spec_requests"
-        ).fetchall()
-        cursor.close()
+        with self._read_cursor() as cursor:
+            request_data = cursor.execute(
+                "SELECT server_id, user_id, role_id FROM spec_requests"
+            ).fetchall()
 
         for s_id, u_id, r_id in request_data:
             if s_id not in requests:
@@ -690,6 +1626,7 @@ class _DatabaseConnection:
 
         return requests
 
+    @_on_database_thread
     def save_spec_request(self, request: SpecRequest):
         cursor = self._connection.cursor()
 
@@ -699,77 +1636,364 @@ class _DatabaseConnection:
         )
 
         cursor.close()
-        self._connection.commit()
+        self._commit()
 
+    @_on_database_thread
     def delete_board(self, board: Board):
         logger.info(f"deleting {board.board_id} {board.turn}")
+        self.detach_board(board)
         cursor = self._connection.cursor()
         cursor.execute(
             "DELETE FROM boards WHERE board_id=? AND phase=?",
             (board.board_id, board.turn.get_indexed_name()),
         )
         cursor.execute(
-            "DELETE FROM provinces WHERE board_id=? AND phase=?",
+            "DELETE FROM provinces_encoded WHERE board_id=? AND phase=?",
             (board.board_id, board.turn.get_indexed_name()),
         )
         cursor.execute(
-            "DELETE FROM units WHERE board_id=? AND phase=?",
+            "DELETE FROM units_encoded WHERE board_id=? AND phase=?",
             (board.board_id, board.turn.get_indexed_name()),
         )
         cursor.execute(
-            "DELETE FROM builds WHERE board_id=? AND phase=?",
+            "DELETE FROM builds_encoded WHERE board_id=? AND phase=?",
             (board.board_id, board.turn.get_indexed_name()),
         )
         cursor.execute(
-            "DELETE FROM retreat_options WHERE board_id=? AND phase=?",
+            "DELETE FROM retreat_options_encoded WHERE board_id=? AND phase=?",
             (board.board_id, board.turn.get_indexed_name()),
         )
         cursor.execute(
             "DELETE FROM vassal_orders WHERE board_id=? AND phase=?",
             (board.board_id, board.turn.get_indexed_name()),
         )
-        cursor.close()
-        self._connection.commit()
-
-    def total_delete(self, board: Board):
-        cursor = self._connection.cursor()
-        cursor.execute("DELETE FROM boards WHERE board_id=?", (board.board_id,))
-        cursor.execute("DELETE FROM board_parameters WHERE board_id=?", (board.board_id,))
-        cursor.execute("DELETE FROM provinces WHERE board_id=?", (board.board_id,))
-        cursor.execute("DELETE FROM units WHERE board_id=?", (board.board_id,))
-        cursor.execute("DELETE FROM builds WHERE board_id=?", (board.board_id,))
         cursor.execute(
-            "DELETE FROM retreat_options WHERE board_id=?", (board.board_id,)
+            "DELETE FROM order_journal WHERE board_id=? AND phase=?",
+            (board.board_id, board.turn.get_indexed_name()),
         )
-        cursor.execute("DELETE FROM players WHERE board_id=?", (board.board_id,))
-        cursor.execute("DELETE FROM spec_requests WHERE server_id=?", (board.board_id,))
+        self._bump_revision(cursor, board.board_id)
         cursor.close()
+        self._commit()
+
+    @_on_database_thread
+    def total_delete(self, board: Board):
+        self.delete_game(board.board_id)
+
+    @_on_database_thread
+    def delete_game(self, board_id: int):
+        """Deletes every row of a game, archived or not, and frees the space they took."""
+        with self.transaction():
+            cursor = self._connection.cursor()
+            self._delete_game_rows(cursor, board_id)
+            self._bump_revision(cursor, board_id)
+            cursor.execute("DELETE FROM spec_requests WHERE server_id=?", (board_id,))
+            cursor.execute("DELETE FROM archived_games WHERE board_id=?", (board_id,))
+            cursor.close()
+            self.invalidate_game_parameters(board_id)
+        self.reclaim_space()
+
+    @staticmethod
+    def _delete_game_rows(cursor: sqlite3.Cursor, board_id: int):
+        for table in (
+            "boards",
+            "board_parameters",
+            "provinces_encoded",
+            "units_encoded",
+            "builds_encoded",
+            "retreat_options_encoded",
+            "vassal_orders",
+            "players",
+            "game_snapshots",
+            "order_journal",
+        ):
+            cursor.execute(f"DELETE FROM {table} WHERE board_id=?", (board_id,))
+
+    @_on_database_thread
+    def archive_game(self, board_id: int) -> int:
+        """Moves a game's rows into a single compressed archived_games row and frees the space they took.
+
+        Returns the size of the archive in bytes. The game can't be loaded again until restore_game puts its rows back.
+        """
+        with self.transaction():
+            cursor = self._connection.cursor()
+            board_data = cursor.execute(f"SELECT {_BOARDS_COLUMNS} FROM boards WHERE board_id=?", (board_id,)).fetchall()
+            if not board_data:
+                cursor.close()
+                raise ValueError(f"There is no game {board_id} to archive")
+            deltas = {(row[0], row[1]): (row[5], row[6]) for row in board_data if row[5] and row[6]}
+            rows = _BoardRows.select(cursor, [board_id], deltas)
+            game_parameters = self._get_game_parameters(cursor, [board_id], self._parameters_version, cached=False)[board_id]
+            province_names = tuple(sorted({name for row in board_data for name in rows._resolve_provinces((board_id, row[1]))}))
+            archive = _encode_snapshot(board_id, board_data, rows, game_parameters, province_names)
+            cursor.execute(
+                "INSERT OR REPLACE INTO archived_games (board_id, archived_at, data_file, province_names, archive) "
+                "VALUES (?, CAST(strftime('%s', 'now') AS INTEGER), ?, ?, ?)",
+                (board_id, board_data[0][2], "\n".join(province_names), archive),
+            )
+            self._delete_game_rows(cursor, board_id)
+            self._bump_revision(cursor, board_id)
+            cursor.close()
+            self.invalidate_game_parameters(board_id)
+        logger.info(f"Archived game {board_id}: {len(board_data)} boards in {len(archive)} bytes")
+        self.reclaim_space()
+        return len(archive)
+
+    @_on_database_thread
+    def restore_game(self, board_id: int):
+        """Puts the rows of a game archived by archive_game back, with every province stored on every board."""
+        with self.transaction():
+            cursor = self._connection.cursor()
+            row = cursor.execute("SELECT province_names, archive FROM archived_games WHERE board_id=?", (board_id,)).fetchone()
+            if row is None:
+                cursor.close()
+                raise ValueError(f"Game {board_id} isn't archived")
+            if cursor.execute("SELECT 1 FROM boards WHERE board_id=? LIMIT 1", (board_id,)).fetchone():
+                cursor.close()
+                raise ValueError(f"Game {board_id} can't be restored over the game that now has its id")
+            board_data, rows, game_parameters = _decode_snapshot(board_id, row[1], tuple(row[0].split("\n")))
+
+            cursor.executemany(
+                f"INSERT INTO boards ({_BOARDS_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                # The archive has every board's provinces resolved against its parents
+                [(*board_row[:6], 0, *board_row[7:]) for board_row in board_data],
+            )
+            cursor.executemany(
+                "INSERT INTO board_parameters (board_id, parameter_key, parameter_value) VALUES (?, ?, ?)",
+                [(board_id, *parameter) for parameter in game_parameters.parameters],
+            )
+            cursor.executemany(
+                "INSERT INTO players (board_id, player_name, color, liege, points) VALUES (?, ?, ?, ?, ?)",
+                [(board_id, player_name, *info) for player_name, info in game_parameters.players.items()],
+            )
+            cursor.executemany(
+                "INSERT INTO provinces_encoded (board_id, phase, province_id, owner_id, core_id, half_core_id) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (board_id, phase, *(self._name_id(cursor, name) for name in province_row))
+                    for (_, phase), province_rows in rows.provinces.items()
+                    for province_row in province_rows
+                ],
+            )
+            cursor.executemany(
+                "INSERT INTO units_encoded (board_id, phase, location_id, is_dislodged, owner_id, is_army, order_type, "
+                "order_destination, order_source, failed_order) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (board_id, phase, self._name_id(cursor, location), is_dislodged, self._name_id(cursor, owner), *other_columns)
+                    for (_, phase), unit_rows in rows.units.items()
+                    for location, is_dislodged, owner, *other_columns in unit_rows
+                ],
+            )
+            cursor.executemany(
+                "INSERT INTO retreat_options_encoded (board_id, phase, origin_id, retreat_loc_id) VALUES (?, ?, ?, ?)",
+                [
+                    (board_id, phase, self._name_id(cursor, origin), self._name_id(cursor, retreat_loc))
+                    for (_, phase, origin), options in rows.retreat_options.items()
+                    for (retreat_loc,) in options
+                ],
+            )
+            cursor.executemany(
+                "INSERT INTO builds_encoded (board_id, phase, player_id, location_id, is_build, is_army) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (board_id, phase, self._name_id(cursor, player_name), self._name_id(cursor, location), is_build, is_army)
+                    for (_, phase), build_rows in rows.builds.items()
+                    for player_name, location, is_build, is_army in build_rows
+                ],
+            )
+            cursor.executemany(
+                "INSERT INTO vassal_orders (board_id, phase, player, target_player, order_type) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (board_id, phase, *vassal_row)
+                    for (_, phase), vassal_rows in rows.vassal_orders.items()
+                    for vassal_row in vassal_rows
+                ],
+            )
+            cursor.execute("DELETE FROM archived_games WHERE board_id=?", (board_id,))
+            self._bump_revision(cursor, board_id)
+            cursor.close()
+            self.invalidate_game_parameters(board_id)
+        logger.info(f"Restored game {board_id} from its archive: {len(board_data)} boards")
+
+    @_read_on_database_thread
+    def is_archived(self, board_id: int) -> bool:
+        with self._read_cursor() as cursor:
+            return cursor.execute("SELECT 1 FROM archived_games WHERE board_id=?", (board_id,)).fetchone() is not None
+
+    @_read_on_database_thread
+    def get_idle_game_ids(self, idle_seconds: float) -> set[int]:
+        """The games with boards whose rows haven't changed for idle_seconds."""
+        with self._read_cursor() as cursor:
+            return {
+                board_id
+                for (board_id,) in cursor.execute(
+                    "SELECT board_id FROM game_activity WHERE changed_at < CAST(strftime('%s', 'now') AS INTEGER) - ? "
+                    "AND board_id IN (SELECT board_id FROM boards)",
+                    (idle_seconds,),
+                )
+            }
+
+    @_on_database_thread
+    def reclaim_space(self):
+        """Gives the pages freed by deleted rows back to the filesystem."""
+        if self._transaction_depth:
+            return
         self._connection.commit()
+        # Does nothing on databases created before auto_vacuum was set, until 17-IncrementalVacuum.sql switches them.
+        # executescript runs the pragma to the end; execute() would only free one page
+        self._connection.executescript("PRAGMA incremental_vacuum;")
+
+    def backup(self, directory: str, keep: int, pages_per_step: int) -> pathlib.Path:
+        """Copies the database into a gzipped file in directory, and deletes all but the newest `keep` backups (0 keeps them all).
+
+        Runs on the calling thread, through a connection of its own, so the bot goes on reading and writing
+        meanwhile; backups started while one is running wait for it. Returns the path of the new backup.
+        """
+        if self._db_file is None:
+            raise ValueError("An in-memory database can't be backed up")
+        folder = pathlib.Path(directory)
+        folder.mkdir(parents=True, exist_ok=True)
+        stem = pathlib.Path(self._db_file).stem
+        path = folder / f"{stem}-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.sqlite.gz"
+        copy_path = folder / f"{path.name}.partial.sqlite"
+        compressed_path = folder / f"{path.name}.partial"
+
+        with self._backup_lock:
+            try:
+                start = time.perf_counter()
+                source = sqlite3.connect(f"{pathlib.Path(self._db_file).absolute().as_uri()}?mode=ro", uri=True)
+                target = sqlite3.connect(copy_path)
+                try:
+                    # A backup made in steps starts over whenever another connection commits in between, so a busy
+                    # bot could keep it from ever finishing. Copying from one read transaction avoids that, and
+                    # with WAL it doesn't hold up writes; the backup is the database as of when it began
+                    source.execute("BEGIN")
+                    source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+                    page_size = source.execute("PRAGMA page_size").fetchone()[0]
+                    # backup()'s own sleep is only for when the database is locked
+                    source.backup(target, pages=pages_per_step, progress=lambda *_: time.sleep(BACKUP_STEP_PAUSE_SECONDS))
+                    pages = target.execute("PRAGMA page_count").fetchone()[0]
+                finally:
+                    target.close()
+                    source.close()
+                copied = time.perf_counter()
+
+                with open(copy_path, "rb") as copy_file, gzip.open(compressed_path, "wb", compresslevel=6) as compressed:
+                    shutil.copyfileobj(copy_file, compressed, 2**20)
+                compressed_path.replace(path)
+                compressed = time.perf_counter()
+            finally:
+                copy_path.unlink(missing_ok=True)
+                compressed_path.unlink(missing_ok=True)
+
+            size = pages * page_size / 2**20
+            logger.info(
+                f"Backed up {size:.1f} MiB ({pages} pages) in {copied - start:.2f}s "
+                f"({size / max(copied - start, 1e-9):.1f} MiB/s), compressed to {path.stat().st_size / 2**20:.1f} MiB "
+                f"in {compressed - copied:.2f}s: {path}"
+            )
 
+            backups = sorted(folder.glob(f"{stem}-*.sqlite.gz"))
+            for old in backups[:-keep] if keep > 0 else []:
+                old.unlink()
+                logger.info(f"Deleted old backup {old}")
+        return path
+
+    def query_report(self, explain: int = 5) -> str:
+        """Totals for each statement run since query_stats was last reset, the most total time first,
+        followed by the query plans of the first `explain` of them."""
+        if self.query_stats is None:
+            return "Query stats are off; see query_stats in config_defaults.toml"
+        statements = self.query_stats.statements()
+        total = sum(stats.seconds for stats in statements)
+        runs = sum(stats.calls for stats in statements)
+        lines = [f"{len(statements)} statements run {runs} times, {total * 1000:.1f} ms in total", ""]
+        for stats in statements:
+            lines.append(
+                f"{stats.seconds * 1000:9.1f} ms {stats.calls:7d} runs {stats.seconds / stats.calls * 1000:8.2f} ms avg "
+                f"{stats.slowest * 1000:8.1f} ms max {stats.rows:9d} rows  {stats.site}"
+            )
+            lines.append(f"    {stats.statement}")
+        for stats in statements[:explain]:
+            lines += ["", f"Query plan of {stats.site}:", f"    {stats.statement}"]
+            lines += [f"    {line}" for line in self.explain_query_plan(stats.sql, stats.args)]
+        return "\n".join(lines)
+
+    @_read_on_database_thread
+    def explain_query_plan(self, sql: str, args: Optional[tuple] = None) -> list[str]:
+        """SQLite's plan for running sql, one line per step and indented like the tree it describes.
+
+        Without args every placeholder is bound to NULL, which can change the plan for some comparisons.
+        """
+        if args is None:
+            args = (None,) * sql.count("?")
+        with self._read_cursor() as cursor:
+            try:
+                plan = cursor.execute(f"EXPLAIN QUERY PLAN {sql}", args).fetchall()
+            except sqlite3.Error as ex:
+                return [f"(no plan: {ex})"]
+        depths = {0: -1}
+        lines = []
+        for step_id, parent_id, _, detail in plan:
+            depths[step_id] = depths.get(parent_id, -1) + 1
+            lines.append(f"{'  ' * depths[step_id]}{detail}")
+        return lines
+
+    @_on_database_thread
     def execute_arbitrary_sql(self, sql: str, args: tuple):
         # TODO - everywhere using this should just be made into a method probably? idk
         cursor = self._connection.cursor()
-        cursor.execute(sql, args)
+        with self._bumping_revisions(cursor):
+            cursor.execute(sql, args)
         cursor.close()
-        self._connection.commit()
+        self._commit()
 
+    @_on_database_thread
     def executemany_arbitrary_sql(self, sql: str, args: list[tuple]):
         cursor = self._connection.cursor()
-        cursor.executemany(sql, args)
+        with self._bumping_revisions(cursor):
+            cursor.executemany(sql, args)
         cursor.close()
-        self._connection.commit()
+        self._commit()
 
     def __del__(self):
         self._connection.commit()
         self._connection.close()
 
 
+# The storage backends open_database accepts
+BACKENDS = ("sqlite", "memory")
+
+
+def open_database(backend: str = DB_BACKEND, **kwargs) -> _DatabaseConnection:
+    """Opens the bot's database with the given backend.
+
+    Both backends are the same _DatabaseConnection; this only picks where SQLite keeps the data, and isn't an
+    interface other storage can be plugged into. "sqlite" stores it in the file given by `[database] file` (or
+    db_file). "memory" opens SQLite on ":memory:", which is kept until it's closed and leaves no files behind, for
+    tests, benchmarks and offline tools; every read then goes through the one connection. Other keyword arguments
+    are passed to _DatabaseConnection.
+    """
+    if backend == "sqlite":
+        return _DatabaseConnection(**kwargs)
+    if backend == "memory":
+        return _DatabaseConnection(":memory:", **kwargs)
+    raise ValueError(f"Unknown database backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+
+
 _db_class: _DatabaseConnection | None = None
 
 
 def get_connection() -> _DatabaseConnection:
+    """The database shared by the bot, opened on first use with the `[database] backend` from the config."""
     global _db_class
     if _db_class:
         return _db_class
-    _db_class = _DatabaseConnection()
+    _db_class = open_database()
     return _db_class
+
+
+def set_connection(database: Optional[_DatabaseConnection]):
+    """Makes get_connection() return database from now on, or open a new one if None.
+
+    Has to be called before anything uses the shared database, e.g. before Manager() is first created.
+    """
+    global _db_class
+    _db_class = database
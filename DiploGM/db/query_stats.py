@@ -0,0 +1,214 @@
+"""Timing of the SQL that _DatabaseConnection runs, to find the statements that are slow or missing an index."""
+
+import logging
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Lists of placeholders, as in "IN (?,?,?)", so that statements differing only in how many values they bind add up
+_PLACEHOLDER_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalise_sql(sql: str) -> str:
+    return _PLACEHOLDER_LIST.sub("IN (?, ...)", _WHITESPACE.sub(" ", sql).strip())
+
+
+class StatementStats:
+    """Totals for one statement run from one place.
+
+    `seconds` covers executing the statement and fetching its rows, but not what the caller does between fetches.
+    `rows` counts the rows fetched, or for writes the rows changed. `sql` and `args` are from the latest run, which
+    is what EXPLAIN QUERY PLAN is run on.
+    """
+
+    def __init__(self, site: str, statement: str):
+        self.site = site
+        self.statement = statement
+        self.sql = statement
+        self.args: Any = ()
+        self.calls = 0
+        self.seconds = 0.0
+        self.slowest = 0.0
+        self.rows = 0
+
+
+class QueryStats:
+    """The statements run through the InstrumentedConnections sharing this, keyed by normalised SQL and call site.
+
+    Any single run taking over `slow_seconds` is also logged as a warning; 0 turns that off.
+    """
+
+    def __init__(self, slow_seconds: float = 0.0):
+        self.slow_seconds = slow_seconds
+        self._lock = threading.Lock()
+        self._statements: dict[tuple[str, str], StatementStats] = {}
+
+    def record(self, site: str, sql: str, args: Any, seconds: float, rows: int):
+        if sql.lstrip()[:7].upper() == "EXPLAIN":
+            return
+        statement = normalise_sql(sql)
+        with self._lock:
+            stats = self._statements.get((site, statement))
+            if stats is None:
+                stats = self._statements[(site, statement)] = StatementStats(
+                    site, statement
+                )
+            stats.sql = sql
+            stats.args = args
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.slowest = max(stats.slowest, seconds)
+            stats.rows += rows
+        if self.slow_seconds and seconds > self.slow_seconds:
+            logger.warning(
+                f"Slow query ({seconds * 1000:.1f} ms, {rows} rows) at {site}: {statement}"
+            )
+
+    def statements(self) -> list[StatementStats]:
+        """Every statement recorded, the most total time first."""
+        with self._lock:
+            return sorted(
+                self._statements.values(), key=lambda stats: stats.seconds, reverse=True
+            )
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+
+
+def _call_site(depth: int) -> str:
+    frame = sys._getframe(depth + 1)
+    return f"{frame.f_code.co_qualname}:{frame.f_lineno}"
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """A cursor that adds the time and rows of each statement it runs to its connection's QueryStats.
+
+    A query is recorded once its rows run out, the cursor runs another statement, or it's closed or dropped.
+    """
+
+    def __init__(self, connection: "InstrumentedConnection"):
+        super().__init__(connection)
+        self._stats = connection.query_stats
+        self._site = ""
+        self._sql: Optional[str] = None
+        self._args: Any = ()
+        self._seconds = 0.0
+        self._rows = 0
+
+    def execute(
+        self, sql: str, parameters: Any = (), /, _site: Optional[str] = None
+    ) -> "InstrumentedCursor":
+        self._finish()
+        self._site = _site or _call_site(1)
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        self._started(sql, parameters, start)
+        return self
+
+    def executemany(
+        self, sql: str, seq_of_parameters: Iterable[Any], /, _site: Optional[str] = None
+    ) -> "InstrumentedCursor":
+        self._finish()
+        self._site = _site or _call_site(1)
+        if isinstance(seq_of_parameters, (list, tuple)):
+            # Keep one set of parameters to explain the statement with
+            args = seq_of_parameters[0] if seq_of_parameters else ()
+        else:
+            args = None
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._started(sql, args, start)
+        return self
+
+    def _started(self, sql: str, args: Any, start: float):
+        self._sql = sql
+        self._args = args
+        self._seconds = time.perf_counter() - start
+        self._rows = 0
+        if self.description is None:
+            # Nothing to fetch
+            self._rows = max(self.rowcount, 0)
+            self._finish()
+
+    def __next__(self) -> Any:
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._seconds += time.perf_counter() - start
+            self._finish()
+            raise
+        self._seconds += time.perf_counter() - start
+        self._rows += 1
+        return row
+
+    def fetchone(self) -> Any:
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._seconds += time.perf_counter() - start
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size: int = 1) -> list[Any]:
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._seconds += time.perf_counter() - start
+        self._rows += len(rows)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self) -> list[Any]:
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._seconds += time.perf_counter() - start
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _finish(self):
+        if self._sql is None:
+            return
+        sql, self._sql = self._sql, None
+        self._stats.record(self._site, sql, self._args, self._seconds, self._rows)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """A connection whose cursors, including those of execute() and executemany(), record into query_stats.
+
+    Made with sqlite3.connect(..., factory=InstrumentedConnection); query_stats should then be set to the
+    QueryStats to share, or the connection keeps its own.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.query_stats = QueryStats()
+
+    def cursor(self, factory: Any = InstrumentedCursor) -> Any:
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = (), /) -> InstrumentedCursor:
+        return self.cursor().execute(sql, parameters, _site=_call_site(1))
+
+    def executemany(
+        self, sql: str, seq_of_parameters: Iterable[Any], /
+    ) -> InstrumentedCursor:
+        return self.cursor().executemany(sql, seq_of_parameters, _site=_call_site(1))
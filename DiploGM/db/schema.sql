@@ -5,6 +5,11 @@ CREATE TABLE IF NOT EXISTS boards (
     fish int,
     name text,
     parent_phase text,
+    timeline int,
+    year int,
+    phase_ordinal int,
+    -- Number of boards since the last one with every province stored; see province_keyframe_interval in config_defaults.toml
+    delta_depth int,
     PRIMARY KEY (board_id, phase),
     FOREIGN KEY (board_id, parent_phase) REFERENCES boards (board_id, player_name));
 CREATE TABLE IF NOT EXISTS players (
@@ -17,55 +22,202 @@ CREATE TABLE IF NOT EXISTS players (
     PRIMARY KEY (board_id, player_name),
     FOREIGN KEY (board_id, liege) REFERENCES players (board_id, player_name),
     FOREIGN KEY (board_id) REFERENCES boards (board_id));
-CREATE TABLE IF NOT EXISTS provinces (
+-- Province and player names are stored once in `names` and referred to by name_id.
+-- provinces, retreat_options, units and builds are views over the *_encoded tables which translate
+-- the ids back to names, with triggers so they can be written to as if they were the original tables.
+CREATE TABLE IF NOT EXISTS names (
+    name_id INTEGER PRIMARY KEY,
+    name text NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS provinces_encoded (
     board_id int,
     phase text,
-    province_name text,
-    owner text,
-    core text,
-    half_core text,
-    PRIMARY KEY (board_id, phase, province_name),
-    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase),
-    FOREIGN KEY (board_id, owner) REFERENCES players (board_id, player_name),
-    FOREIGN KEY (board_id, core) REFERENCES players (board_id, player_name),
-    FOREIGN KEY (board_id, half_core) REFERENCES players (board_id, player_name));
-CREATE TABLE IF NOT EXISTS retreat_options (
+    province_id int,
+    owner_id int,
+    core_id int,
+    half_core_id int,
+    PRIMARY KEY (board_id, phase, province_id),
+    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS retreat_options_encoded (
     board_id int,
     phase text,
-    origin text,
-    retreat_loc text,
-    PRIMARY KEY (board_id, phase, origin, retreat_loc),
-    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase),
-    FOREIGN KEY (board_id, phase, origin) REFERENCES provinces (board_id, phase, province_name),
-    FOREIGN KEY (board_id, phase, retreat_loc) REFERENCES provinces (board_id, phase, province_name));
-CREATE TABLE IF NOT EXISTS units (
+    origin_id int,
+    retreat_loc_id int,
+    PRIMARY KEY (board_id, phase, origin_id, retreat_loc_id),
+    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS units_encoded (
     board_id int,
     phase text,
-    location text,
+    location_id int,
     is_dislodged boolean,
-    owner text,
+    owner_id int,
     is_army boolean,
     order_type text,
     order_destination text,
     order_source text,
     failed_order boolean,
-    PRIMARY KEY (board_id, phase, location, is_dislodged),
-    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase),
-    FOREIGN KEY (board_id, phase, location) REFERENCES provinces (board_id, phase, province_name),
-    FOREIGN KEY (board_id, owner) REFERENCES players (board_id, player_name),
-    FOREIGN KEY (board_id, phase, location) REFERENCES retreat_options (board_id, phase, origin));
-CREATE TABLE IF NOT EXISTS builds(
+    PRIMARY KEY (board_id, phase, location_id, is_dislodged),
+    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS builds_encoded (
     board_id int,
     phase text,
-    player text,
-    location text,
+    player_id int,
+    location_id int,
     is_build boolean,
     is_army boolean,
-    PRIMARY KEY (board_id, phase, player, location),
-    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase),
-    FOREIGN KEY (board_id, player) REFERENCES players (board_id, player_name),
-    FOREIGN KEY (board_id, phase, location) REFERENCES provinces (board_id, phase, province_name)
-);
+    PRIMARY KEY (board_id, phase, player_id, location_id),
+    FOREIGN KEY (board_id, phase) REFERENCES boards (board_id, phase)
+) WITHOUT ROWID;
+
+CREATE VIEW IF NOT EXISTS provinces AS
+SELECT board_id, phase,
+    (SELECT name FROM names WHERE name_id = province_id) AS province_name,
+    (SELECT name FROM names WHERE name_id = owner_id) AS owner,
+    (SELECT name FROM names WHERE name_id = core_id) AS core,
+    (SELECT name FROM names WHERE name_id = half_core_id) AS half_core
+FROM provinces_encoded;
+CREATE TRIGGER IF NOT EXISTS provinces_insert INSTEAD OF INSERT ON provinces BEGIN
+    INSERT OR IGNORE INTO names (name) VALUES (NEW.province_name), (NEW.owner), (NEW.core), (NEW.half_core);
+    INSERT INTO provinces_encoded (board_id, phase, province_id, owner_id, core_id, half_core_id) VALUES (
+        NEW.board_id,
+        NEW.phase,
+        (SELECT name_id FROM names WHERE name = NEW.province_name),
+        (SELECT name_id FROM names WHERE name = NEW.owner),
+        (SELECT name_id FROM names WHERE name = NEW.core),
+        (SELECT name_id FROM names WHERE name = NEW.half_core));
+END;
+CREATE TRIGGER IF NOT EXISTS provinces_update INSTEAD OF UPDATE ON provinces BEGIN
+    INSERT OR IGNORE INTO names (name) VALUES (NEW.province_name), (NEW.owner), (NEW.core), (NEW.half_core);
+    UPDATE provinces_encoded SET
+        board_id = NEW.board_id,
+        phase = NEW.phase,
+        province_id = (SELECT name_id FROM names WHERE name = NEW.province_name),
+        owner_id = (SELECT name_id FROM names WHERE name = NEW.owner),
+        core_id = (SELECT name_id FROM names WHERE name = NEW.core),
+        half_core_id = (SELECT name_id FROM names WHERE name = NEW.half_core)
+    WHERE board_id = OLD.board_id AND phase = OLD.phase
+        AND province_id = (SELECT name_id FROM names WHERE name = OLD.province_name);
+END;
+CREATE TRIGGER IF NOT EXISTS provinces_delete INSTEAD OF DELETE ON provinces BEGIN
+    DELETE FROM provinces_encoded
+    WHERE board_id = OLD.board_id AND phase = OLD.phase
+        AND province_id = (SELECT name_id FROM names WHERE name = OLD.province_name);
+END;
+
+CREATE VIEW IF NOT EXISTS retreat_options AS
+SELECT board_id, phase,
+    (SELECT name FROM names WHERE name_id = origin_id) AS origin,
+    (SELECT name FROM names WHERE name_id = retreat_loc_id) AS retreat_loc
+FROM retreat_options_encoded;
+CREATE TRIGGER IF NOT EXISTS retreat_options_insert INSTEAD OF INSERT ON retreat_options BEGIN
+    INSERT OR IGNORE INTO names (name) VALUES (NEW.origin), (NEW.retreat_loc);
+    INSERT INTO retreat_options_encoded (board_id, phase, origin_id, retreat_loc_id) VALUES (
+        NEW.board_id,
+        NEW.phase,
+        (SELECT name_id FROM names WHERE name = NEW.origin),
+        (SELECT name_id FROM names WHERE name = NEW.retreat_loc));
+END;
+CREATE TRIGGER IF NOT EXISTS retreat_options_update INSTEAD OF UPDATE ON retreat_options BEGIN
+    INSERT OR IGNORE INTO names (name) VALUES (NEW.origin), (NEW.retreat_loc);
+    UPDATE retreat_options_encoded SET
+        board_id = NEW.board_id,
+        phase = NEW.phase,
+        origin_id = (SELECT name_id FROM names WHERE name = NEW.origin),
+        retreat_loc_id = (SELECT name_id FROM names WHERE name = NEW.retreat_loc)
+    WHERE board_id = OLD.board_id AND phase = OLD.phase
+        AND origin_id = (SELECT name_id FROM names WHERE name = OLD.origin)
+        AND retreat_loc_id = (SELECT name_id FROM names WHERE name = OLD.retreat_loc);
+END;
+CREATE TRIGGER IF NOT EXISTS retreat_options_delete INSTEAD OF DELETE ON retreat_options BEGIN
+    DELETE FROM retreat_options_encoded
+    WHERE board_id = OLD.board_id AND phase = OLD.phase
+        AND origin_id = (SELECT name_id FROM names WHERE name = OLD.origin)
+        AND retreat_loc_id = (SELECT name_id FROM names WHERE name = OLD.retreat_loc);
+END;
+
+CREATE VIEW IF NOT EXISTS units AS
+SELECT board_id, phase,
+    (SELECT name FROM names WHERE name_id = location_id) AS location,
+    is_dislodged,
+    (SELECT name FROM names WHERE name_id = owner_id) AS owner,
+    is_army, order_type, order_destination, order_source, failed_order
+FROM units_encoded;
+-- Views can't be UPSERTed, so inserting a unit that already exists updates its owner and type instead
+CREATE TRIGGER IF NOT EXISTS units_insert INSTEAD OF INSERT ON units BEGIN
+    INSERT OR IGNORE INTO names (name) VALUES (NEW.location), (NEW.owner);
+    INSERT INTO units_encoded (board_id, phase, location_id, is_dislodged, owner_id, is_army,
+                               order_type, order_destination, order_source, failed_order) VALUES (
+        NEW.board_id,
+        NEW.phase,
+        (SELECT name_id FROM names WHERE name = NEW.location),
+        NEW.is_dislodged,
+        (SELECT name_id FROM names WHERE name = NEW.owner),
+        NEW.is_army,
+        NEW.order_type,
+        NEW.order_destination,
+        NEW.order_source,
+        NEW.failed_order)
+    ON CONFLICT (board_id, phase, location_id, is_dislodged) DO UPDATE SET owner_id = excluded.owner_id, is_army = excluded.is_army;
+END;
+CREATE TRIGGER IF NOT EXISTS units_update INSTEAD OF UPDATE ON units BEGIN
+    INSERT OR IGNORE INTO names (name) VALUES (NEW.location), (NEW.owner);
+    UPDATE units_encoded SET
+        board_id = NEW.board_id,
+        phase = NEW.phase,
+        location_id = (SELECT name_id FROM names WHERE name = NEW.location),
+        is_dislodged = NEW.is_dislodged,
+        owner_id = (SELECT name_id FROM names WHERE name = NEW.owner),
+        is_army = NEW.is_army,
+        order_type = NEW.order_type,
+        order_destination = NEW.order_destination,
+        order_source = NEW.order_source,
+        failed_order = NEW.failed_order
+    WHERE board_id = OLD.board_id AND phase = OLD.phase AND is_dislodged = OLD.is_dislodged
+        AND location_id = (SELECT name_id FROM names WHERE name = OLD.location);
+END;
+CREATE TRIGGER IF NOT EXISTS units_delete INSTEAD OF DELETE ON units BEGIN
+    DELETE FROM units_encoded
+    WHERE board_id = OLD.board_id AND phase = OLD.phase AND is_dislodged = OLD.is_dislodged
+        AND location_id = (SELECT name_id FROM names WHERE name = OLD.location);
+END;
+
+CREATE VIEW IF NOT EXISTS builds AS
+SELECT board_id, phase,
+    (SELECT name FROM names WHERE name_id = player_id) AS player,
+    (SELECT name FROM names WHERE name_id = location_id) AS location,
+    is_build, is_army
+FROM builds_encoded;
+CREATE TRIGGER IF NOT EXISTS builds_insert INSTEAD OF INSERT ON builds BEGIN
+    INSERT OR IGNORE INTO names (name) VALUES (NEW.player), (NEW.location);
+    INSERT INTO builds_encoded (board_id, phase, player_id, location_id, is_build, is_army) VALUES (
+        NEW.board_id,
+        NEW.phase,
+        (SELECT name_id FROM names WHERE name = NEW.player),
+        (SELECT name_id FROM names WHERE name = NEW.location),
+        NEW.is_build,
+        NEW.is_army);
+END;
+CREATE TRIGGER IF NOT EXISTS builds_update INSTEAD OF UPDATE ON builds BEGIN
+    INSERT OR IGNORE INTO names (name) VALUES (NEW.player), (NEW.location);
+    UPDATE builds_encoded SET
+        board_id = NEW.board_id,
+        phase = NEW.phase,
+        player_id = (SELECT name_id FROM names WHERE name = NEW.player),
+        location_id = (SELECT name_id FROM names WHERE name = NEW.location),
+        is_build = NEW.is_build,
+        is_army = NEW.is_army
+    WHERE board_id = OLD.board_id AND phase = OLD.phase
+        AND player_id = (SELECT name_id FROM names WHERE name = OLD.player)
+        AND location_id = (SELECT name_id FROM names WHERE name = OLD.location);
+END;
+CREATE TRIGGER IF NOT EXISTS builds_delete INSTEAD OF DELETE ON builds BEGIN
+    DELETE FROM builds_encoded
+    WHERE board_id = OLD.board_id AND phase = OLD.phase
+        AND player_id = (SELECT name_id FROM names WHERE name = OLD.player)
+        AND location_id = (SELECT name_id FROM names WHERE name = OLD.location);
+END;
 
 CREATE TABLE IF NOT EXISTS vassal_orders (
     board_id int,
@@ -90,4 +242,56 @@ CREATE TABLE IF NOT EXISTS board_parameters (
     parameter_key TEXT NOT NULL,
     parameter_value TEXT NOT NULL,
     PRIMARY KEY (board_id, parameter_key)
-)
+);
+
+-- Bumped once by every write to any of a game's rows (_DatabaseConnection._bump_revision, or per row for
+-- execute_arbitrary_sql), so a game_snapshots row can tell whether it still matches the tables.
+-- Rows are never deleted, so a revision is never reused.
+CREATE TABLE IF NOT EXISTS game_revisions (
+    board_id INTEGER PRIMARY KEY,
+    revision INTEGER NOT NULL DEFAULT 1);
+
+-- A game's rows as of game_revisions.revision, packed into one blob so it can be loaded without reading the tables;
+-- see DiploGM/db/database.py. fingerprint identifies the snapshot format and the version of the variant's files.
+CREATE TABLE IF NOT EXISTS game_snapshots (
+    board_id INTEGER PRIMARY KEY,
+    revision INTEGER NOT NULL,
+    data_file TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    snapshot BLOB NOT NULL);
+
+-- When each game's rows last changed, kept along with game_revisions; Manager.archive_idle_games goes by this.
+CREATE TABLE IF NOT EXISTS game_activity (
+    board_id INTEGER PRIMARY KEY,
+    changed_at INTEGER NOT NULL);
+CREATE TRIGGER IF NOT EXISTS game_revisions_insert_activity AFTER INSERT ON game_revisions BEGIN
+    INSERT INTO game_activity (board_id, changed_at) VALUES (NEW.board_id, CAST(strftime('%s', 'now') AS INTEGER))
+        ON CONFLICT (board_id) DO UPDATE SET changed_at = excluded.changed_at;
+END;
+CREATE TRIGGER IF NOT EXISTS game_revisions_update_activity AFTER UPDATE ON game_revisions BEGIN
+    INSERT INTO game_activity (board_id, changed_at) VALUES (NEW.board_id, CAST(strftime('%s', 'now') AS INTEGER))
+        ON CONFLICT (board_id) DO UPDATE SET changed_at = excluded.changed_at;
+END;
+-- Games saved before game_activity existed count as changed when the bot first starts with it
+INSERT OR IGNORE INTO game_activity (board_id, changed_at) SELECT DISTINCT board_id, CAST(strftime('%s', 'now') AS INTEGER) FROM boards;
+
+-- Games taken out of the tables above by _DatabaseConnection.archive_game, each packed like a game_snapshots blob.
+-- Provinces are stored in province_names order (newline separated) rather than the variant's, so an archive
+-- can still be restored after the variant's files change.
+CREATE TABLE IF NOT EXISTS archived_games (
+    board_id INTEGER PRIMARY KEY,
+    archived_at INTEGER NOT NULL,
+    data_file TEXT NOT NULL,
+    province_names TEXT NOT NULL,
+    archive BLOB NOT NULL);
+
+-- Each change to a board's orders made by one .order submission, oldest first; see save_submitted_orders and replay_orders.
+-- changes is a JSON list of [location, is_dislodged, order_type, order_destination, order_source, failed_order].
+CREATE TABLE IF NOT EXISTS order_journal (
+    entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    board_id INTEGER NOT NULL,
+    phase TEXT NOT NULL,
+    submitted_at INTEGER NOT NULL,
+    submitted_by TEXT,
+    changes TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS order_journal_by_board ON order_journal (board_id, phase, entry_id);
@@ -0,0 +1,150 @@
+import contextlib
+import logging
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Iterable, Iterator, MutableMapping
+from typing import Callable
+
+from DiploGM.models.game import Game
+
+logger = logging.getLogger(__name__)
+
+# Measured on classic games loaded from the database (see benchmarks/board_memory.py); used to turn the budget into provinces
+ESTIMATED_BYTES_PER_PROVINCE = 800
+
+
+def estimated_size(game: Game) -> int:
+    """Roughly how many bytes a loaded game takes, going by the provinces of the boards it has built."""
+    return (
+        sum(len(board.provinces) for board in game.loaded_boards())
+        * ESTIMATED_BYTES_PER_PROVINCE
+    )
+
+
+class GameCache(MutableMapping[int, Game]):
+    """The games Manager knows about, loaded on first access and evicted least recently used first.
+
+    Iterating, `in` and len() cover every known game without loading any of them. Once the estimated size of the
+    loaded games goes over `budget` bytes, the least recently used ones are dropped until it fits again; the game
+    just used and pinned games are never dropped, so the budget can be exceeded while they alone are over it.
+    Dropping a game loses nothing that has been saved, but anything only kept in memory (like `Board.orders_enabled`)
+    goes with it, so such games should stay pinned (as Manager.lock_orders does).
+    """
+
+    def __init__(
+        self, load: Callable[[int], Game], board_ids: Iterable[int], budget: int
+    ):
+        self._load = load
+        self._ids = set(board_ids)
+        self._games: OrderedDict[int, Game] = OrderedDict()
+        self._pins: Counter[int] = Counter()
+        self.budget = budget
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def __getitem__(self, board_id: int) -> Game:
+        if board_id in self._games:
+            self.hits += 1
+            self._games.move_to_end(board_id)
+            return self._games[board_id]
+        if board_id not in self._ids:
+            raise KeyError(board_id)
+        self.misses += 1
+        start = time.perf_counter()
+        game = self._load(board_id)
+        elapsed = time.perf_counter() - start
+        self.load_seconds += elapsed
+        logger.info(f"Loaded game {board_id} in {elapsed:.3f}s")
+        self._games[board_id] = game
+        self._evict(keep=board_id)
+        return game
+
+    def __setitem__(self, board_id: int, game: Game):
+        self._ids.add(board_id)
+        self._games[board_id] = game
+        self._games.move_to_end(board_id)
+        self._evict(keep=board_id)
+
+    def __delitem__(self, board_id: int):
+        self._ids.remove(board_id)
+        self._games.pop(board_id, None)
+        del self._pins[board_id]
+
+    def __contains__(self, board_id: object) -> bool:
+        return board_id in self._ids
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(set(self._ids))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def unload(self, board_id: int):
+        """Drops the game from memory if it's loaded; it's loaded again the next time it's used."""
+        self._games.pop(board_id, None)
+
+    def is_loaded(self, board_id: int) -> bool:
+        return board_id in self._games
+
+    def loaded(self) -> list[int]:
+        """The ids of the games in memory, least recently used first."""
+        return list(self._games)
+
+    def pin(self, board_id: int):
+        """Keeps the game in memory until a matching unpin(); pins nest."""
+        self._pins[board_id] += 1
+
+    def unpin(self, board_id: int):
+        if self._pins[board_id] <= 1:
+            del self._pins[board_id]
+            self._evict()
+        else:
+            self._pins[board_id] -= 1
+
+    @contextlib.contextmanager
+    def pinned(self, board_id: int) -> Iterator[None]:
+        self.pin(board_id)
+        try:
+            yield
+        finally:
+            self.unpin(board_id)
+
+    def is_pinned(self, board_id: int) -> bool:
+        return self._pins[board_id] > 0
+
+    def stats(self) -> dict[str, int | float]:
+        requests = self.hits + self.misses
+        return {
+            "known games": len(self._ids),
+            "loaded games": len(self._games),
+            "pinned games": sum(
+                1 for board_id in self._pins if board_id in self._games
+            ),
+            "estimated size (MiB)": round(
+                sum(map(estimated_size, self._games.values())) / 2**20, 1
+            ),
+            "budget (MiB)": round(self.budget / 2**20, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit rate": round(self.hits / requests, 3) if requests else 0.0,
+            "evictions": self.evictions,
+            "load time (s)": round(self.load_seconds, 3),
+        }
+
+    def _evict(self, keep: int | None = None):
+        # Games grow as they're adjudicated, so sizes are worked out afresh each time
+        sizes = {
+            board_id: estimated_size(game) for board_id, game in self._games.items()
+        }
+        total = sum(sizes.values())
+        for board_id in list(self._games):
+            if total <= self.budget:
+                break
+            if board_id == keep or self._pins[board_id] > 0:
+                continue
+            del self._games[board_id]
+            total -= sizes[board_id]
+            self.evictions += 1
+            logger.info(f"Evicted game {board_id} from memory")
@@ -1,6 +1,8 @@
 import logging
 import time
 import os
+import pathlib
+from collections import deque
 from typing import Optional
 
 from discord import Member, User
@@ -13,7 +15,17 @@ from DiploGM.map_parser.vector.vector import get_parser
 from DiploGM.models.turn import Turn
 from DiploGM.models.board import Board
 from DiploGM.models.game import Game
+from DiploGM.config import (
+    DB_BACKUP_DIRECTORY,
+    DB_BACKUP_PAGES_PER_STEP,
+    DB_BACKUPS_KEPT,
+    DB_GAME_SNAPSHOTS,
+    DB_LAZY_BOARDS,
+    GAME_CACHE_MEGABYTES,
+)
 from DiploGM.db import database
+from DiploGM.db.async_database import on_database_thread
+from DiploGM.game_cache import GameCache
 from DiploGM.models.player import Player
 from DiploGM.models.order import RetreatDisband,RetreatMove
 from DiploGM.models.spec_request import SpecRequest
@@ -23,24 +35,128 @@ logger = logging.getLogger(__name__)
 
 SEVERENCE_A_ID = 1440703393369821248
 SEVERENCE_B_ID = 1440703645971644648
+# How many adjudications per game Manager.rollback keeps the boards of; before those it guesses from the game
+MAX_ROLLBACK_CHECKPOINTS = 16
 
 class Manager(metaclass=SingletonMeta):
     """Manager acts as an intermediary between Bot (the Discord API), Board (the board state), the database."""
 
     def __init__(self, board_ids: Optional[list[int]]=None):
         self._database = database.get_connection()
-        self._boards: dict[int, Game] = self._database.get_games(board_ids)
+        # Games are only loaded when first used; see GameCache
+        self._boards = GameCache(self._load_game, self._database.get_game_ids(board_ids), GAME_CACHE_MEGABYTES * 2**20)
+        # Games whose orders a GM has locked; the lock is only kept in memory, so these stay pinned
+        self._orders_locked: set[int] = set()
+        # board_id -> the turns of the boards made by each of the game's latest adjudications, newest last
+        self._checkpoints: dict[int, deque[list[Turn]]] = {}
         self._spec_requests: dict[int, list[SpecRequest]] = (
             self._database.get_spec_requests()
         )
         # TODO: have multiple for each variant?
         # do it like this so that the parser can cache data between board initializations
 
+    def _load_game(self, server_id: int) -> Game:
+        if self._database.is_archived(server_id):
+            # Archived games come back the first time they're used
+            self._database.restore_game(server_id)
+        game = self._database.get_games([server_id], use_snapshots=DB_GAME_SNAPSHOTS, lazy=DB_LAZY_BOARDS)[server_id]
+        self._apply_orders_lock(server_id, game)
+        return game
+
+    async def load_game(self, server_id: int):
+        """Makes sure the server's game, if it has one, is in memory, loading it on the database thread if not.
+
+        get_game loads a game the same way, but blocking until it's done, so async code should call this first.
+        """
+        if server_id == SEVERENCE_B_ID:
+            server_id = SEVERENCE_A_ID
+        if server_id in self._boards and not self._boards.is_loaded(server_id):
+            await on_database_thread(self.get_game, server_id)
+
     def list_servers(self) -> set[int]:
         return set(self._boards.keys())
 
+    def pin_game(self, server_id: int):
+        """Keeps the game loaded, whatever the memory budget, until unpin_game is called as many times."""
+        self._boards.pin(server_id)
+
+    def unpin_game(self, server_id: int):
+        self._boards.unpin(server_id)
+
+    def lock_orders(self, server_id: int) -> Game:
+        """Disables orders, including on the boards later adjudications make, until unlock_orders.
+
+        The game is pinned meanwhile, since being evicted and loaded again would open its orders.
+        """
+        game = self.get_game(server_id)
+        if server_id not in self._orders_locked:
+            self._orders_locked.add(server_id)
+            self._boards.pin(server_id)
+        self._apply_orders_lock(server_id, game)
+        return game
+
+    def unlock_orders(self, server_id: int) -> Game:
+        game = self.get_game(server_id)
+        if server_id in self._orders_locked:
+            self._orders_locked.remove(server_id)
+            self._boards.unpin(server_id)
+        for board in game.loaded_boards():
+            board.orders_enabled = True
+        return game
+
+    def orders_locked(self, server_id: int) -> bool:
+        return server_id in self._orders_locked
+
+    def _apply_orders_lock(self, server_id: int, game: Game):
+        if server_id in self._orders_locked:
+            for board in game.loaded_boards():
+                board.orders_enabled = False
+
+    def game_cache_stats(self) -> dict[str, int | float]:
+        return self._boards.stats()
+
+    def backup_database(self) -> pathlib.Path:
+        """Backs the database up while the bot keeps running; slow, so best called off the event loop."""
+        return self._database.backup(DB_BACKUP_DIRECTORY, DB_BACKUPS_KEPT, DB_BACKUP_PAGES_PER_STEP)
+
+    def archive_game(self, server_id: int) -> str:
+        if server_id not in self._boards:
+            return "There is no game in this server."
+        if self._database.is_archived(server_id):
+            return "This game is already archived."
+        if self._boards.is_pinned(server_id):
+            return "This game is in use, try again later."
+        size = self._archive(server_id)
+        return f"Game archived in {size / 1024:.0f} KiB; it will be restored the next time it's used."
+
+    def restore_game(self, server_id: int) -> str:
+        if not self._database.is_archived(server_id):
+            return "This game isn't archived."
+        self._database.restore_game(server_id)
+        return "Game restored."
+
+    def archive_idle_games(self, idle_days: float) -> list[int]:
+        """Archives the games that haven't changed for idle_days, except pinned ones, and returns their ids."""
+        archived = []
+        for server_id in sorted(self._database.get_idle_game_ids(idle_days * 24 * 60 * 60)):
+            if self._boards.is_pinned(server_id):
+                continue
+            try:
+                self._archive(server_id)
+            except Exception as ex:
+                logger.warning(f"Could not archive game {server_id}", exc_info=ex)
+                continue
+            archived.append(server_id)
+        return archived
+
+    def _archive(self, server_id: int) -> int:
+        # The loaded game would go on saving to rows that are no longer there
+        self._boards.unload(server_id)
+        self._checkpoints.pop(server_id, None)
+        return self._database.archive_game(server_id)
+
     def create_game(self, server_id: int, gametype: str = "impdip", empty: bool = False) -> str:
-        if self._boards.get(server_id):
+        if server_id in self._boards:
             return "A game already exists in this server."
         if not os.path.isdir(f"variants/{gametype}"):
             return f"Game {gametype} does not exist."
@@ -88,15 +204,21 @@ class Manager(metaclass=SingletonMeta):
         if server_id == SEVERENCE_B_ID:
             server_id = SEVERENCE_A_ID
         if reload:
-            self._boards[server_id] = self._database.get_game(server_id)
+            game = self._database.get_game(server_id)
+            self._apply_orders_lock(server_id, game)
+            self._boards[server_id] = game
         return self._boards[server_id]
         #if not board:
         #    raise RuntimeError("There is no existing game this this server.")
         #return board
 
     def total_delete(self, server_id: int):
-        self._database.total_delete(self._boards[server_id])
+        # Without loading the game, which would restore it first if it's archived
+        self._database.delete_game(server_id)
+        # Its pins go with it
+        self._orders_locked.discard(server_id)
         del self._boards[server_id]
+        self._checkpoints.pop(server_id, None)
 
     def draw_map(
         self,
@@ -162,101 +284,139 @@ class Manager(metaclass=SingletonMeta):
         logger.info(f"manager.draw_map_for_board took {elapsed}s")
         return svg, file_name
 
-    def adjudicate(self, server_id: int, test: bool = False) -> Board:
-        start = time.time()
+    def adjudicate(self, server_id: int, test: bool = False) -> Game:
+        # Pinned, so that nothing loaded while it runs can push the game being adjudicated out of memory
+        with self._boards.pinned(server_id):
+            game = self._adjudicate(server_id, test)
+            # The boards just made start with orders open
+            self._apply_orders_lock(server_id, self.get_game(server_id))
+            return game
 
-        game = self.get_game(server_id, reload=True)
-        # I believe not reloading it would interfere with the mutable nature of games.
-        # TODO: make the adjudicator not mutate games (or at least create new ones, then mutate them
+    def _adjudicate(self, server_id: int, test: bool = False) -> Game:
+        start = time.time()
 
+        live_game = self.get_game(server_id)
+        # Adjudicators mutate the boards they run on, so they get copies of those boards; the boards they produce
+        # are added to the live game afterwards, without reloading it
+        turns = live_game.all_turns()
+        last_turns = [tl[-1] for tl in turns]
+        if any(t.is_retreats() for t in last_turns):
+            copied = [t for t in last_turns if t.is_retreats()]
+        else:
+            copied = [t for t in last_turns if t.is_builds()]
+            if not all(t.is_builds() for t in last_turns):
+                # Moves are adjudicated across every moves board at once
+                copied += [t for tl in turns for t in tl if t.is_moves()]
+        game = self._database.copy_game(live_game, copied)
 
         turns = game.all_turns()
         last_boards = [(tl[-1], game.get_board(tl[-1]))  for tl in turns]
         retreats = [(t, b) for t,b in last_boards if t.is_retreats()]
         #retreats = {t: } any(x.is_retreats for x in last_turns)
-        if retreats:
-            for (t,b) in retreats:
-                new_board = RetreatsAdjudicator(b).run()
-                new_board.parent = t
-                new_board.turn = t.get_next_turn()
-                self._database.save_board(server_id, new_board)
-            logger.info("Retreat adjudicators ran successfully")
-        else:
-            newSprings = []
-            any_moves = False
-            for (t,b) in last_boards:
-                if t.is_builds():
-                    new_board = BuildsAdjudicator(b).run()
-                    new_board.parent = t
-                    newSprings.append( (t.get_next_turn(), new_board) )
-                    # new_B = BuildsAdjudicator(b).run()
-                    # for u in new_B.get_units():
-                    #     print(u,u.province.longname)
-                    # print(new_B)
-                    # newSprings.append( (t.get_next_turn(), new_B) )
+        created: list[Turn] = []
+        saved: list[Board] = []
+
+        def save(new_board: Board):
+            self._database.save_board(server_id, new_board)
+            saved.append(new_board)
+            created.append(new_board.turn)
+
+        # Every board and order saved by this adjudication is committed together, or not at all
+        try:
+            with self._database.transaction():
+                if retreats:
+                    for (t,b) in retreats:
+                        new_board = RetreatsAdjudicator(b).run()
+                        new_board.parent = t
+                        new_board.turn = t.get_next_turn()
+                        save(new_board)
+                    logger.info("Retreat adjudicators ran successfully")
                 else:
-                    any_moves = True
-            logger.info("Build adjudicators finished "+str(len(newSprings)))
-            if any_moves:
-                # This mutates lots of things without updating Turns; new_game is game
-                # We later collect them using new_game.get_board()
-                new_game = MovesAdjudicator(game).run()
-                logger.info("Moves Adjudicator ran successfully")
-                new_boards = []
-                for b in game.get_moves_boards():
-                    t = b.turn
-                    nt = t.get_next_turn()
-                    compare_board = game.get_board(nt)
-                    new_board = new_game.get_board(t)
-                    new_board.parent = t
-                    if compare_board.isFake:
-                        new_board.turn = nt
-                        self._database.save_board(server_id, new_board)
-                    else:
-                        obs = []
-                        for tl in range(nt.timeline,1+len(turns)): # TODO: Check retreats that might affect retreating units
-                            alt_board = game.get_board(Turn(timeline=tl, year=nt.year, phase=nt.phase))
-                            if not alt_board.isFake and alt_board.parent == new_board.parent:
-                                obs.append(alt_board)
-                                if boards_equal(new_board,alt_board):
-                                    break
+                    newSprings = []
+                    any_moves = False
+                    for (t,b) in last_boards:
+                        if t.is_builds():
+                            new_board = BuildsAdjudicator(b).run()
+                            new_board.parent = t
+                            newSprings.append( (t.get_next_turn(), new_board) )
+                            # new_B = BuildsAdjudicator(b).run()
+                            # for u in new_B.get_units():
+                            #     print(u,u.province.longname)
+                            # print(new_B)
+                            # newSprings.append( (t.get_next_turn(), new_B) )
                         else:
-                            # check all child boards. If it's retreats, copy existing orders over
-                            dislogements = {}
-                            for province in new_board.provinces:
-                                if province.dislodged_unit:
-                                    dislogements[province.name.lower()] = [province.dislodged_unit,None]
-                            for b2 in obs:
-                                for (p,u) in dislogements.items():
-                                    ou = b2.name_to_province[p].dislodged_unit
-                                    if not ou:
-                                        continue
-                                    other_order = ou.order
-                                    if isinstance(other_order,RetreatMove):
-                                        u[1] = other_order.destination.name + (other_order.destination_coast or "")
-                                    elif isinstance(other_order,RetreatDisband):
-                                        u[0].order = RetreatDisband()
-                            new_board.turn = nt
-                            new_boards.append(((nt.year,nt.phase.value,nt.timeline), new_board, dislogements))
-
-                new_boards.sort()
-                last_timeline = len(turns)
-                for (tinfo,new_board,dislogements) in new_boards:
-                    last_timeline +=1
-                    new_board.turn.timeline = last_timeline
-                    if len(dislogements):
-                        b = new_game.get_board(new_board.turn)
-                    for (p,u) in dislogements.items():
-                        if u[1] is not None:
-                            u[0].order = RetreatMove(*b.get_province_and_coast(u[1]))
-                    self._database.save_board(server_id, new_board)
-            for t,new_board in newSprings:
-                new_board.turn = t
-                self._database.save_board(server_id, new_board)
-            #newBoards
+                            any_moves = True
+                    logger.info("Build adjudicators finished "+str(len(newSprings)))
+                    if any_moves:
+                        # This mutates lots of things without updating Turns; new_game is game
+                        # We later collect them using new_game.get_board()
+                        moves_adjudicator = MovesAdjudicator(game)
+                        moves_adjudicator.resolve()
+                        # Resolving fills in NMRs and failures, which a reload would show on the live moves boards
+                        self._database.copy_orders(live_game, moves_adjudicator.boards)
+                        moves_adjudicator._update_board()
+                        new_game = game
+                        logger.info("Moves Adjudicator ran successfully")
+                        new_boards = []
+                        for b in moves_adjudicator.boards:
+                            t = b.turn
+                            nt = t.get_next_turn()
+                            compare_board = game.get_board(nt)
+                            new_board = new_game.get_board(t)
+                            new_board.parent = t
+                            if compare_board.isFake:
+                                new_board.turn = nt
+                                save(new_board)
+                            else:
+                                obs = []
+                                for tl in range(nt.timeline,1+len(turns)): # TODO: Check retreats that might affect retreating units
+                                    alt_board = game.get_board(Turn(timeline=tl, year=nt.year, phase=nt.phase))
+                                    if not alt_board.isFake and alt_board.parent == new_board.parent:
+                                        obs.append(alt_board)
+                                        if boards_equal(new_board,alt_board):
+                                            break
+                                else:
+                                    # check all child boards. If it's retreats, copy existing orders over
+                                    dislogements = {}
+                                    for province in new_board.provinces:
+                                        if province.dislodged_unit:
+                                            dislogements[province.name.lower()] = [province.dislodged_unit,None]
+                                    for b2 in obs:
+                                        for (p,u) in dislogements.items():
+                                            ou = b2.name_to_province[p].dislodged_unit
+                                            if not ou:
+                                                continue
+                                            other_order = ou.order
+                                            if isinstance(other_order,RetreatMove):
+                                                u[1] = other_order.destination.name + (other_order.destination_coast or "")
+                                            elif isinstance(other_order,RetreatDisband):
+                                                u[0].order = RetreatDisband()
+                                    new_board.turn = nt
+                                    new_boards.append(((nt.year,nt.phase.value,nt.timeline), new_board, dislogements))
+
+                        new_boards.sort()
+                        last_timeline = len(turns)
+                        for (tinfo,new_board,dislogements) in new_boards:
+                            last_timeline +=1
+                            new_board.turn = Turn(new_board.turn.year, new_board.turn.phase, timeline=last_timeline)
+                            if len(dislogements):
+                                b = new_game.get_board(new_board.turn)
+                            for (p,u) in dislogements.items():
+                                if u[1] is not None:
+                                    u[0].order = RetreatMove(*b.get_province_and_coast(u[1]))
+                            save(new_board)
+                    for t,new_board in newSprings:
+                        new_board.turn = t
+                        save(new_board)
+                    #newBoards
+        except Exception:
+            # The live game may already have orders from this adjudication, which were just rolled back
+            self.get_game(server_id, reload=True)
+            raise
         logger.info("All Adjudicators finished and saved")
-
-        new_game = self.get_game(server_id, reload=True) # Update the game so that mutated stuff doesn't cause problems
+        self._database.insert_boards(live_game, saved)
+        if created:
+            self._checkpoints.setdefault(game.board_id, deque(maxlen=MAX_ROLLBACK_CHECKPOINTS)).append(created)
 
         """
         board = self.get_board(server_id)
@@ -277,7 +437,7 @@ class Manager(metaclass=SingletonMeta):
 """
         elapsed = time.time() - start
         logger.info(f"manager.adjudicate.{server_id}.{elapsed}s")
-        return new_game
+        return live_game
 
     def draw_fow_current_map(
         self,
@@ -363,23 +523,36 @@ class Manager(metaclass=SingletonMeta):
     def rollback(self, server_id: int) -> str: #tuple[str, bytes, str]:
         logger.info(f"Rolling back in server {server_id}")
         game = self.get_game(server_id)
-        print("begin rollback", len(game.all_turns()))
         timelines = game.all_turns()
         if len(timelines[0])<2:
             raise ValueError("Cannot roll back, there haven't been any adjudicated turns")
 
-        if game.is_retreats():
-            for tl in timelines:
-                self._database.delete_board(game.get_board(tl[-1]))
-        else:
-            for tl in timelines:
-                if len(tl)>1 and tl[-2].is_retreats():
-                    self._database.delete_board(game.get_board(tl[-1]))
-
-        g = self.get_game(server_id,reload=True)
-        print("end_rollback",len(g.all_turns()))
-
-        message = f"Rolled back to {timelines[0][-2].get_indexed_name()}"
+        checkpoints = self._checkpoints.get(game.board_id)
+        turns = None
+        if checkpoints:
+            try:
+                game.check_removable(checkpoints[-1])
+                turns = checkpoints[-1]
+            except ValueError:
+                logger.warning(f"Boards from the last adjudication in server {server_id} no longer match the game")
+                checkpoints.clear()
+        if turns is None:
+            # No checkpoint, e.g. after a restart: the newest board of each timeline that the last adjudication would have made
+            if game.is_retreats():
+                turns = [tl[-1] for tl in timelines]
+            else:
+                turns = [tl[-1] for tl in timelines if len(tl)>1 and tl[-2].is_retreats()]
+            game.check_removable(turns)
+
+        # The database goes first, so that the game is left as it was if that fails
+        with self._database.transaction():
+            for turn in turns:
+                self._database.delete_board(game.get_board(turn))
+        game.remove_boards(turns)
+        if checkpoints:
+            checkpoints.pop()
+
+        message = f"Rolled back to {game.all_turns()[0][-1].get_indexed_name()}"
         # TODO: add rendered map file , file, file_name
         return message
     def print_orders(self,server_id:int) -> str:
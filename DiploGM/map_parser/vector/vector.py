@@ -1,4 +1,5 @@
 import copy
+import hashlib
 import itertools
 import json
 import logging
@@ -15,6 +16,7 @@ from DiploGM.models.turn import PhaseName, Turn
 from DiploGM.models.board import Board
 from DiploGM.models.player import Player
 from DiploGM.models.province import Province, ProvinceType
+from DiploGM.models.topology import VariantTopology
 from DiploGM.models.unit import Unit, UnitType
 
 # TODO: (BETA) all attribute getting should be in utils which we import and call utils.my_unit()
@@ -36,11 +38,16 @@ class Parser:
 
 
 
-        with open(f"variants/{data}/config.json", "r") as f:
-            self.data = json.load(f)
+        with open(f"variants/{data}/config.json", "rb") as f:
+            config = f.read()
+        self.data = json.loads(config)
 
         self.data["file"] = f"variants/{data}/{self.data['file']}"
 
+        with open(self.data["file"], "rb") as f:
+            svg = f.read()
+        # Changes whenever the variant's files do, e.g. so that saved game snapshots can tell they're out of date
+        self.fingerprint = hashlib.sha256(config + svg).hexdigest()
         svg_root = etree.parse(self.data["file"])
 
         self.layers = self.data[SVG_CONFIG_KEY]
@@ -75,8 +82,17 @@ class Parser:
 
         self.cache_provinces: set[Province] | None = None
         self.cache_adjacencies: set[tuple[str, str]] | None = None
+        self.topology: VariantTopology | None = None
 
     def parse(self) -> Board:
+        return self.get_topology().create_board()
+
+    def get_topology(self) -> VariantTopology:
+        if self.topology is None:
+            self.topology = VariantTopology(self._parse_svg())
+        return self.topology
+
+    def _parse_svg(self) -> Board:
         logger.debug("map_parser.vector.parse.start")
         start = time.time()
 
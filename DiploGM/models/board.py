@@ -16,6 +16,8 @@ if TYPE_CHECKING:
     from DiploGM.models.turn import Turn
     from DiploGM.models.player import Player
     from DiploGM.models.province import Province, ProvinceType
+    from DiploGM.models.topology import VariantTopology
+    from DiploGM.models.game import Game
 
 
 logger = logging.getLogger(__name__)
@@ -45,6 +47,12 @@ class Board:
         self.name: str | None = None
         self.fow = fow
         self.parent = parent
+        # Set when the board was built from a parsed variant; shared with every other board of that variant
+        self.topology: VariantTopology | None = None
+        # With a topology, the board's provinces by their id
+        self.province_by_id: list[Province] = []
+        # The game whose other boards this one's provinces are 5D-adjacent to (see CrossBoardAdjacency)
+        self.game: Game | None = None
 
         # store as lower case for user input purposes
         self.name_to_player: Dict[str, Player] = {player.name.lower(): player for player in self.players}
@@ -53,10 +61,15 @@ class Board:
         self.simple_player_name_to_player: Dict[str, Player] = {simple_player_name(player.name): player for player in self.players}
         self.name_to_province: Dict[str, Province] = {}
         self.name_to_coast: Dict[str, tuple[Province, str | None]] = {}
+        # exact names, as written by Province.get_name(coast)
+        self.name_to_location: Dict[str, tuple[Province, str | None]] = {}
         for location in self.provinces:
+            location.board = self
             self.name_to_province[location.name.lower()] = location
+            self.name_to_location[location.name] = (location, None)
             for coast in location.get_multiple_coasts():
                 self.name_to_coast[location.get_name(coast)] = (location, coast)
+                self.name_to_location[location.get_name(coast)] = (location, coast)
 
         for player in self.players:
             player.board = self
@@ -162,6 +175,12 @@ class Board:
         province, _ = self.get_province_and_coast(name)
         return province
 
+    # Looks up a location saved by name (e.g. in the database) without the fuzzy matching done for user input
+    def get_location(self, name: str) -> tuple[Province, str | None]:
+        if name in self.name_to_location:
+            return self.name_to_location[name]
+        return self.get_province_and_coast(name)
+
     def get_province_and_coast(self, name: str) -> tuple[Province, str | None]:
         # FIXME: This should not be raising exceptions many places already assume it returns None on failure.
         # TODO: (BETA) we build this everywhere, let's just have one live on the Board on init
@@ -216,7 +235,7 @@ class Board:
         for province in self.provinces:
             for unit in player.units:
                 if unit.unit_type == UnitType.ARMY:
-                    if province in unit.province.adjacent and province.type != ProvinceType.SEA:
+                    if unit.province.is_adjacent(province) and province.type != ProvinceType.SEA:
                         visible.add(province.name)
                 if unit.unit_type == UnitType.FLEET:
                     if unit.province.is_coastally_adjacent((province, None), unit.coast):
@@ -391,15 +410,27 @@ class Board:
 
 
 class FakeBoard:
-    """A fake board has fake provinces which should be in the right places, but do not have adjacences and are not guarenteed to be comparable by identity"""
+    """A fake board has fake provinces which should be in the right places, but do not have adjacences.
+
+    Each name is only looked up in the variant once, and each province only made once, so a fake board always gives
+    back the same province for it; Game.get_board keeps its fake boards, so that holds across lookups too.
+    """
     def __init__(self,variant,turn):
         self.variant = variant
         self.turn = turn
         self.isFake = True
+        self._provinces: Dict[str, Province] = {}
+        # By the name as looked up
+        self._locations: Dict[str, tuple[Province, str | None]] = {}
     def get_province_and_coast(self, name: str) -> tuple[Province, str | None]:
-        (p,coast) = self.variant.get_province_and_coast(name)
-        #if p is None: return None
-
+        location = self._locations.get(name)
+        if location is None:
+            (p,coast) = self.variant.get_province_and_coast(name)
+            location = self._locations[name] = (self._get_fake_province(p), coast)
+        return location
+    def _get_fake_province(self, p: Province) -> Province:
+        if p.name in self._provinces:
+            return self._provinces[p.name]
         np = Province(
             name = p.name,
             coordinates = p.geometry,
@@ -414,8 +445,11 @@ class FakeBoard:
             local_unit = None,  # TODO: probably doesn't make sense to init with a unit
         )
         np.isFake=True
+        # The variant's id, so that the fake province has the key of the real one it stands in for
+        np.id = p.id
         np.set_turn(self.turn)
-        return (np,coast)
+        self._provinces[p.name] = np
+        return np
     def get_province(self, name: str) -> Province:
         province, _ = self.get_province_and_coast(name)
         return province
@@ -1,26 +1,21 @@
-from typing import Dict, Optional, TYPE_CHECKING
-import re
+from typing import Any, Dict, Optional, TYPE_CHECKING
 from DiploGM.models.board import Board, FakeBoard
 from DiploGM.models.turn import Turn, PhaseName
 from DiploGM.models.unit import Unit
-from itertools import chain
 
 
 if TYPE_CHECKING:
     from DiploGM.models.turn import Turn
 
 from DiploGM.models.province import Province
+from collections import OrderedDict, deque
 from collections.abc import Iterator
 
 
 
-"""def loose_chain(a,b):
-    if LOOSE_ADJACENCIES:
-        return chain(a,b)
-    else:
-        return a
-"""
-number_re = re.compile("[0-9]+")
+# How many fake boards a Game keeps for turns it has no board for, dropping the least recently used
+FAKE_BOARDS_KEPT = 64
+
 def prev_move_board(turn: Turn) -> Turn:
     if turn.phase == PhaseName.SPRING_MOVES:
         return Turn(phase=PhaseName.FALL_MOVES, year=turn.year-1, timeline=turn.timeline, start_year=turn.start_year)
@@ -33,50 +28,153 @@ def next_move_board(turn: Turn) -> Turn:
     if turn.phase == PhaseName.FALL_MOVES:
         return Turn(phase=PhaseName.SPRING_MOVES, year=turn.year+1, timeline=turn.timeline, start_year=turn.start_year)
 
+def linked_move_turns(turn: Turn) -> list[Turn]:
+    """The turns whose boards a moves board has 5D adjacencies to, if they exist (see CrossBoardAdjacency)."""
+    return [prev_move_board(turn),
+            next_move_board(turn),
+            Turn(phase=turn.phase, year=turn.year, timeline=turn.timeline+1, start_year=turn.start_year),
+            Turn(phase=turn.phase, year=turn.year, timeline=turn.timeline-1, start_year=turn.start_year)
+            ]
+
 def get_turn(s: str, start_year: int):
-    assert s.startswith("T")
-    n = number_re.match(s[1:]).group()
-    s=s[1+len(n):]
-    tl = int(n)
-    phase=None
-
-    #Reverse because some start with the same character. sorting by decreasing length would also work and would be more stable
-    for k in reversed(PhaseName.__members__.values()):
-        pn = k.to_string(short=True,move_type=0.5)
-        if s.startswith(pn):
-            phase=k
-            s=s[len(pn):]
-    n = number_re.match(s).group()
-    s=s[len(n):]
-    year = int(n)
-    return (Turn(year=year, phase=phase, timeline=tl, start_year=start_year),s)
+    return Turn.from_code(s)
 
 def get_retreat_turn(s: str, start_year: int):
-    assert s.startswith("T")
-    n = number_re.match(s[1:]).group()
-    s=s[1+len(n):]
-    tl = int(n)
-    phase=None
-
-    #PhaseName._member_names_.zip()
-    for k in [PhaseName.SPRING_RETREATS,PhaseName.FALL_RETREATS]:
-        if s[:2].lower() == k.to_string(short=True,move_type=0.5):
-            phase=k
-            s=s[2:]
-            break
-    else:
-        raise Exception("Could not read phase from "+repr(s))
-    n = number_re.match(s).group()
-    s=s[len(n):]
-    year = int(n)
-    return (Turn(year=year, phase=phase, timeline=tl, start_year=start_year),s)
+    return Turn.from_code(s, retreats_only=True)
+
+
+def active_turns(timelines: list[list[Turn]]) -> set[Turn]:
+    """The boards that entering orders and adjudicating retreats or builds normally touch, as keys of Game._boards.
+
+    In each timeline, that is the latest moves board and every board after it, and the moves boards 5D-adjacent to those.
+    """
+    active = set()
+    for timeline in timelines:
+        moves = [i for i, t in enumerate(timeline) if t.is_moves()]
+        for t in timeline[moves[-1] if moves else 0:]:
+            active.add(t)
+            if t.is_moves():
+                active.update(linked_move_turns(t))
+    return active
+
+
+def _order_turns(board: Board) -> set[Turn]:
+    # The turns of the boards that the orders of board's units point at
+    turns = set()
+    for unit in board.units:
+        for province in (getattr(unit.order, "destination", None), getattr(unit.order, "source", None)):
+            if province is not None:
+                turns.add(province.turn)
+    return turns
+
+
+class BoardPlaceholder():
+    """Stands in for a board of a Game until Game.get_board is first asked for it.
+
+    `source.build(placeholder, game)` then makes the board without its units, and `source.finish(board, game)` adds
+    them once the board is part of the game, since their orders can point at other boards, which may be placeholders
+    pointing back at this one. `source.order_turns(placeholder)` gives the turns those orders point at without
+    building anything.
+    """
+    def __init__(self, turn: Turn, board_id: int, data: dict, source: Any, args: tuple[Any, ...]):
+        self.turn = turn
+        self.board_id = board_id
+        self.data = data
+        self.source = source
+        # Whatever else source needs to build the board
+        self.args = args
+
+
+class CrossBoardAdjacency():
+    """The 5D adjacencies between the boards of a Game, worked out from their turns whenever they're asked for.
+
+    A province of a moves board is adjacent to the province of the same name on each built board at
+    linked_move_turns of its turn and, with `loose`, to the ones next to that. Nothing is stored on the provinces,
+    so building or removing boards needs no bookkeeping beyond clear_cache(). Only the boards linked to the most
+    recently asked `cache_size` boards are kept.
+    """
+    def __init__(self, game: "Game", loose: bool = True, cache_size: int = 64):
+        self.game = game
+        self.loose = loose
+        self.cache_size = cache_size
+        self._linked: OrderedDict[Board, list[Board]] = OrderedDict()
+
+    def clear_cache(self):
+        self._linked.clear()
+
+    def linked_boards(self, board: Board) -> list[Board]:
+        """The built boards that board's provinces are 5D-adjacent to; none for boards of other games."""
+        if board.game is not self.game or board.turn.phase not in (PhaseName.SPRING_MOVES, PhaseName.FALL_MOVES):
+            return []
+        linked = self._linked.get(board)
+        if linked is not None:
+            self._linked.move_to_end(board)
+            return linked
+        # Placeholders get theirs once they're built
+        linked = [other for t in linked_move_turns(board.turn) if (other := self.game._loaded_board(t)) is not None]
+        if self.cache_size:
+            self._linked[board] = linked
+            if len(self._linked) > self.cache_size:
+                self._linked.popitem(last=False)
+        return linked
+
+    def adjacent(self, province: Province) -> list[Province]:
+        """The provinces of other boards next to province."""
+        adjacent = []
+        for other in self.linked_boards(province.board):
+            if province.topology is not None and other.topology is province.topology:
+                provinces = other.province_by_id
+                adjacent.append(provinces[province.id])
+                if self.loose:
+                    adjacent.extend(provinces[i] for i in province.topology.neighbours(province.id))
+            else:
+                name = province.name.lower()
+                adjacent.append(other.name_to_province[name])
+                if self.loose:
+                    adjacent.extend(other.name_to_province[p.name.lower()] for p in self.game.variant.name_to_province[name].adjacent)
+        return adjacent
+
+    def is_adjacent(self, province: Province, other: Province) -> bool:
+        if other.board is None or other.board not in self.linked_boards(province.board):
+            return False
+        if other.name == province.name:
+            return True
+        if not self.loose:
+            return False
+        if province.topology is not None and other.topology is province.topology:
+            return province.topology.is_adjacent(province.id, other.id)
+        return other.name.lower() in {p.name.lower() for p in self.game.variant.name_to_province[province.name.lower()].adjacent}
+
+    def fleet_adjacent(self, province: Province, coast: str | None = None) -> list[tuple[Province, str | None]]:
+        """The (province, coast) pairs of other boards a fleet at coast of province is next to."""
+        adjacent = []
+        for other in self.linked_boards(province.board):
+            if province.topology is not None and other.topology is province.topology:
+                topology = province.topology
+                provinces = other.province_by_id
+                adjacent.append((provinces[province.id], coast))
+                if self.loose:
+                    adjacent.extend(
+                        (provinces[topology.location_provinces[j]], topology.locations[j][1])
+                        for j in topology.fleet_neighbours(topology.location_ids[(province.name, coast)])
+                    )
+            else:
+                name = province.name.lower()
+                adjacent.append((other.name_to_province[name], coast))
+                if self.loose:
+                    fleet_adjacent = self.game.variant.name_to_province[name].fleet_adjacent
+                    adjacent.extend(
+                        (other.name_to_province[p.name.lower()], p_coast)
+                        for p, p_coast in (fleet_adjacent[coast] if isinstance(fleet_adjacent, dict) else fleet_adjacent)
+                    )
+        return adjacent
 
 
 class Game():
-    def __init__(self, variant: Board, boards : list[tuple[Turn,Board]]):
+    def __init__(self, variant: Board, boards : list[tuple[Turn,Board | BoardPlaceholder]]):
         variant.units.clear() # a single 2D board for finding adjacencies
         self.variant = variant
-        self._boards : dict[(int, PhaseName, int)] = {(t.timeline,t.phase,t.year) : b for (t,b) in boards}
+        self._boards : dict[Turn, Board | BoardPlaceholder] = {t : b for (t,b) in boards}
         mx = max(t[0].timeline for t in boards)
         allTurns = [[] for x in range(mx)]
         #boards.sort(key=lambda tb: (tb[0].year,tb[0] )
@@ -84,51 +182,76 @@ class Game():
             assert t == b.turn
             allTurns[t.timeline-1].append(t)
         for r in allTurns:
-            r.sort(key=lambda t: (t.year,t.phase.value))
+            r.sort()
         self._all_turns = allTurns
+        # Boards built from placeholders that are still waiting for their units; see _build_boards
+        self._unfinished: deque[tuple[BoardPlaceholder, Board]] = deque()
+        self._finishing = False
+        self.adjacency = CrossBoardAdjacency(self)
+        self._fake_boards: OrderedDict[Turn, FakeBoard] = OrderedDict()
+        for (t,b) in boards:
+            self._adopt(b)
 
-        default_board = self.get_board(allTurns[0][0])
+        # Might be a placeholder, which has these too
+        default_board = self._boards[allTurns[0][0]]
         self.data = default_board.data # be nice for manager.create_game; TODO: this may sometimes need to change
         self.board_id = default_board.board_id
         self.start_year = default_board.turn.start_year
 
-    def add_adjacencies(self,LOOSE_ADJACENCIES: bool=True):
-        # vp = self.variant.name_to_province["nao3"]
-        # print (vp.adjacent)
-        if LOOSE_ADJACENCIES:
-            loose_chain = chain
-        else:
-            def loose_chain(a,b):
-                return a
-        #add 5D adjacencies
-        for board in self._boards.values():
+    def _adopt(self, board: Board | BoardPlaceholder):
+        # A board shared with another game (see Database.copy_game) keeps being adjacent to that game's boards
+        if isinstance(board, Board) and board.game is None:
+            board.game = self
+
+    def add_boards(self, boards: list[Board]):
+        """Adds new boards, each after the latest board of its timeline or starting the next timeline."""
+        timelines = len(self._all_turns)
+        latest = {i+1: timeline[-1] for i, timeline in enumerate(self._all_turns) if timeline}
+        boards = sorted(boards, key=lambda b: b.turn)
+        for board in boards:
             t = board.turn
-            if t.phase == PhaseName.SPRING_MOVES or t.phase == PhaseName.FALL_MOVES:
-                for t in [prev_move_board(t),
-                            next_move_board(t),
-                            Turn(phase=t.phase, year=t.year, timeline=t.timeline+1, start_year=t.start_year),
-                            Turn(phase=t.phase, year=t.year, timeline=t.timeline-1, start_year=t.start_year)
-                            ]:
-                    if (t.timeline,t.phase,t.year) not in self._boards:
-                        continue
-                    other_board = self.get_board(t)
-                    for p in board.provinces:
-                        n = p.name.lower()
-                        vp = self.variant.name_to_province[n]
-                        for ap in loose_chain([vp],vp.adjacent):
-                            p.adjacent.add(other_board.name_to_province[ap.name.lower()])
-                        vpfa = vp.fleet_adjacent
-                        if isinstance(vpfa,dict):
-                            #vpfa = {None:vpfa}
-                            for coast,adjs in vpfa.items():
-                                pfac = p.fleet_adjacent[coast]
-                                for (ap, acoast) in loose_chain([(vp,coast)], adjs):
-                                    pfac.add((other_board.name_to_province[ap.name.lower()] ,acoast))
-                        else:
-                            for (ap, acoast) in loose_chain([(vp,None)], vpfa):
-                                p.fleet_adjacent.add((other_board.name_to_province[ap.name.lower()] ,acoast))
-                        # Province.adjacent: set[Province]
-                        # Province.fleet_adjacent: set[tuple[Province, str | None]] | dict[str, set[tuple[Province, str | None]]]
+            if t.timeline > timelines + 1:
+                raise ValueError(f"{t.get_indexed_name()} would leave a timeline without boards")
+            if t.timeline in latest and (latest[t.timeline].year, latest[t.timeline].phase.value) >= (t.year, t.phase.value):
+                raise ValueError(f"{t.get_indexed_name()} is not after the latest board of its timeline")
+            latest[t.timeline] = t
+            timelines = max(timelines, t.timeline)
+
+        for board in boards:
+            t = board.turn
+            while len(self._all_turns) < t.timeline:
+                self._all_turns.append([])
+            self._boards[t] = board
+            self._all_turns[t.timeline-1].append(t)
+            self._adopt(board)
+        self.adjacency.clear_cache()
+
+    def check_removable(self, turns: list[Turn]):
+        """Raises ValueError unless remove_boards(turns) would leave a valid game.
+
+        Each turn must be the latest of its timeline; timelines left without any boards must be the last ones.
+        """
+        removed = {t for t in turns}
+        if len(removed) != len(turns) or not removed.issubset(self._boards):
+            raise ValueError("Can only remove boards of the game, once each")
+        for t in turns:
+            if self._all_turns[t.timeline-1][-1] != t:
+                raise ValueError(f"{t.get_indexed_name()} is not the latest board of its timeline")
+        remaining = [len(timeline) - sum(t.timeline == i+1 for t in turns) for i, timeline in enumerate(self._all_turns)]
+        first_empty = remaining.index(0) if 0 in remaining else len(remaining)
+        if first_empty == 0 or any(remaining[first_empty:]):
+            raise ValueError("Removing these boards would leave the first timeline, or one before others, empty")
+
+    def remove_boards(self, turns: list[Turn]):
+        """Drops the boards at `turns` (see check_removable), which other boards are then no longer adjacent to."""
+        self.check_removable(turns)
+        for t in turns:
+            self._boards.pop(t)
+            self._all_turns[t.timeline-1].pop()
+        self.adjacency.clear_cache()
+        while not self._all_turns[-1]:
+            self._all_turns.pop()
+
     def get_turn_province_and_coast(self, prov:str, retreats:bool=False):
         t,p = get_turn(prov,self.start_year)
         if retreats and t.is_moves():
@@ -145,14 +268,74 @@ class Game():
         return p
     def get_board(self, t:Turn) -> Board | FakeBoard:
         # TODO: think about returning boards full of fake provinces when t has no associated board
-        tdata = (t.timeline,t.phase,t.year)
-        if tdata in self._boards:
-            #return self._boards[tdata]#!!!!!!
-            return self._boards[tdata]
+        board = self._boards.get(t)
+        if board is not None:
+            if isinstance(board, BoardPlaceholder):
+                board = self._build_board(board)
+            return board
+        fake_board = self._fake_boards.get(t)
+        if fake_board is None:
+            fake_board = self._fake_boards[t] = FakeBoard(self.variant,t)
+            if len(self._fake_boards) > FAKE_BOARDS_KEPT:
+                self._fake_boards.popitem(last=False)
         else:
-            # return self.get_board(self.all_turns()[0][0])
-            return FakeBoard(self.variant,t) # TODO: Modify so that provinces include turn information
-        #return self._boards[t.timeline,t.phase,t.year]
+            self._fake_boards.move_to_end(t)
+        return fake_board
+    def build_boards(self, turns: list[Turn]):
+        """Builds the boards at `turns` that are still placeholders."""
+        placeholders = [board for t in turns if isinstance(board := self._boards[t], BoardPlaceholder)]
+        if placeholders:
+            self._build_boards(placeholders)
+
+    def _build_board(self, placeholder: BoardPlaceholder) -> Board:
+        return self._build_boards([placeholder])[0]
+
+    def _build_boards(self, placeholders: list[BoardPlaceholder]) -> list[Board]:
+        # Finishing a board can ask for other placeholders, e.g. the destination of a 5D move. Those are only built and
+        # left for the outermost call to finish, since each could lead to more and this would otherwise recurse.
+        boards = []
+        for placeholder in placeholders:
+            t = placeholder.turn
+            board = placeholder.source.build(placeholder, self)
+            self._boards[t] = board
+            self._adopt(board)
+            self._unfinished.append((placeholder, board))
+            boards.append(board)
+        self.adjacency.clear_cache()
+        if self._finishing:
+            return boards
+        self._finishing = True
+        try:
+            while self._unfinished:
+                placeholder, board = self._unfinished.popleft()
+                placeholder.source.finish(board, self)
+        finally:
+            self._finishing = False
+        return boards
+
+    def _loaded_board(self, t: Turn) -> Board | None:
+        board = self._boards.get(t)
+        return None if isinstance(board, BoardPlaceholder) else board
+
+    def get_board_or_placeholder(self, t: Turn) -> Board | BoardPlaceholder:
+        """Like get_board for a turn of the game, but without building a board that's still a placeholder."""
+        return self._boards[t]
+
+    def loaded_boards(self) -> Iterator[Board]:
+        """The boards that aren't placeholders, in turn order."""
+        for timeline in self._all_turns:
+            for t in timeline:
+                board = self._loaded_board(t)
+                if board is not None:
+                    yield board
+
+    def placeholders(self) -> Iterator[BoardPlaceholder]:
+        for timeline in self._all_turns:
+            for t in timeline:
+                board = self._boards[t]
+                if isinstance(board, BoardPlaceholder):
+                    yield board
+
     def all_turns(self) -> list[list[Turn]]:
         return self._all_turns
 
@@ -168,6 +351,35 @@ class Game():
             for turn in timeline:
                 if turn.is_moves():
                     yield self.get_board(turn)
+    def build_interacting_moves_boards(self) -> list[Board]:
+        """The moves boards that adjudicating the last moves board of each timeline involves, building them as needed.
+
+        Orders are only given on the last boards; the boards involved are those and every moves board whose units'
+        orders point at one of them, or that one of their orders points at, and so on. The other moves boards, built or
+        not, would only come out as they did before, so placeholders among them are left unbuilt.
+        """
+        boards = {timeline[-1]: self.get_board(timeline[-1]) for timeline in self._all_turns if timeline[-1].is_moves()}
+        while True:
+            involved = set()
+            for board in boards.values():
+                involved.update(_order_turns(board))
+            for timeline in self._all_turns:
+                for t in timeline:
+                    if not t.is_moves() or t in boards or t in involved:
+                        continue
+                    board = self._boards[t]
+                    if isinstance(board, BoardPlaceholder):
+                        order_turns = board.source.order_turns(board)
+                    else:
+                        order_turns = _order_turns(board)
+                    if not order_turns.isdisjoint(boards):
+                        involved.add(t)
+            added = [t for t in involved if t.is_moves() and t in self._boards and t not in boards]
+            if not added:
+                return list(boards.values())
+            self.build_boards(added)
+            boards.update((t, self._boards[t]) for t in added)
+
     def get_moves_provinces(self) -> Iterator[Province]:
         for board in self.get_moves_boards():
             for p in board.provinces:
@@ -11,6 +11,7 @@ if TYPE_CHECKING:
 
 class Order:
     """Order is a player's game state API."""
+    __slots__ = ()
 
     def __init__(self):
         pass
@@ -19,6 +20,8 @@ class Order:
 # moves, holds, etc.
 class UnitOrder(Order):
     """Unit orders are orders that units execute themselves."""
+    __slots__ = ("hasFailed", "destination", "destination_coast", "source")
+
     display_priority: int = 0
     
     def __init__(self):
@@ -38,12 +41,15 @@ class UnitOrder(Order):
 
 class ComplexOrder(UnitOrder):
     """Complex orders are orders that operate on other orders (supports and convoys)."""
+    __slots__ = ()
 
     def __init__(self, source: Province):
         super().__init__()
         self.source: Province = source
 
 class NMR(UnitOrder):
+    __slots__ = ()
+
     display_priority: int = 20
 
     def __init__(self):
@@ -53,6 +59,8 @@ class NMR(UnitOrder):
         return "NMRs"
 
 class Hold(UnitOrder):
+    __slots__ = ()
+
     display_priority: int = 20
 
     def __init__(self):
@@ -63,6 +71,8 @@ class Hold(UnitOrder):
 
 
 class Core(UnitOrder):
+    __slots__ = ()
+
     display_priority: int = 20
     
     def __init__(self):
@@ -73,6 +83,8 @@ class Core(UnitOrder):
 
 
 class Move(UnitOrder):
+    __slots__ = ()
+
     display_priority: int = 30
     
     def __init__(self, destination: Province, destination_coast: str | None = None):
@@ -90,6 +102,8 @@ class Move(UnitOrder):
         return self.destination.order_str() + (f" {self.destination_coast}" if self.destination_coast else "")
 
 class ConvoyMove(UnitOrder):
+    __slots__ = ()
+
     display_priority: int = 30
     
     def __init__(self, destination: Province, destination_coast: str | None = None):
@@ -108,6 +122,8 @@ class ConvoyMove(UnitOrder):
 
 
 class ConvoyTransport(ComplexOrder):
+    __slots__ = ()
+
     def __init__(self, source: Province, destination: Province, destination_coast: str | None = None):
         super().__init__(source)
         self.destination: Province = destination
@@ -123,6 +139,8 @@ class ConvoyTransport(ComplexOrder):
 
 
 class Support(ComplexOrder):
+    __slots__ = ()
+
     display_priority: int = 10
     
     def __init__(self, source: Province, destination: Province, destination_coast: str | None = None):
@@ -150,6 +168,8 @@ class Support(ComplexOrder):
 
 
 class RetreatMove(UnitOrder):
+    __slots__ = ()
+
     def __init__(self, destination: Province, destination_coast: str | None = None):
         super().__init__()
         self.destination: Province = destination
@@ -165,6 +185,8 @@ class RetreatMove(UnitOrder):
         return self.destination.order_str() + (f" {self.destination_coast}" if self.destination_coast else "")
 
 class RetreatDisband(UnitOrder):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
@@ -174,6 +196,7 @@ class RetreatDisband(UnitOrder):
 
 class PlayerOrder(Order):
     """Player orders are orders that belong to a player rather than a unit e.g. builds."""
+    __slots__ = ("province", "coast")
 
     def __init__(self, province: Province):
         super().__init__()
@@ -189,6 +212,7 @@ class PlayerOrder(Order):
 
 class Build(PlayerOrder):
     """Builds are player orders because the unit does not yet exist."""
+    __slots__ = ("unit_type",)
 
     def __init__(self, province: Province, unit_type: UnitType, coast: str | None = None):
         super().__init__(province)
@@ -201,6 +225,7 @@ class Build(PlayerOrder):
 
 class Disband(PlayerOrder):
     """Disbands are player order because builds are."""
+    __slots__ = ()
 
     def __init__(self, province: Province):
         super().__init__(province)
@@ -209,6 +234,8 @@ class Disband(PlayerOrder):
         return f"Disband {self.province}"
 
 class Waive(Order):
+    __slots__ = ("quantity",)
+
     def __init__(self, quantity: int):
         super().__init__()
         self.quantity: int = quantity
@@ -218,6 +245,7 @@ class Waive(Order):
 
 class RelationshipOrder(Order):
     """Vassal, Dual Monarchy, etc"""
+    __slots__ = ("player", "coast")
 
     nameId: str | None = None
 
@@ -234,36 +262,42 @@ class RelationshipOrder(Order):
 
 class Vassal(RelationshipOrder):
     """Specifies player to vassalize."""
+    __slots__ = ()
 
     def __str__(self):
         return f"Vassalize {self.player}"
 
 class Liege(RelationshipOrder):
     """Specifies player to swear allegiance to."""
+    __slots__ = ()
 
     def __str__(self):
         return f"Liege {self.player}"
 
 class DualMonarchy(RelationshipOrder):
     """Specifies player to swear allegiance to."""
+    __slots__ = ()
 
     def __str__(self):
         return f"Dual Monarchy with {self.player}"
 
 class Disown(RelationshipOrder):
     """Specifies player to drop as a vassal."""
+    __slots__ = ()
 
     def __str__(self):
         return f"Disown {self.player}"
 
 class Defect(RelationshipOrder):
     """Defect. Player is always your liege"""
+    __slots__ = ()
 
     def __str__(self):
         return "Defect"
 
 class RebellionMarker(RelationshipOrder):
     """Psudorder to mark rebellion from player due to class"""
+    __slots__ = ()
 
     def __str__(self):
         return f"(Rebelling from {self.player})"
@@ -28,6 +28,11 @@ class PlayerClass(Enum):
 
 
 class Player:
+    __slots__ = (
+        "name", "color_dict", "default_color", "render_color", "centers", "units", "build_orders", "waived_orders",
+        "vassal_orders", "points", "liege", "vassals", "board",
+    )
+
     def __init__(
         self,
         name: str,
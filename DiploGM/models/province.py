@@ -3,16 +3,23 @@ from __future__ import annotations
 from DiploGM.models.turn import Turn
 from abc import abstractmethod
 from enum import Enum
-from typing import TYPE_CHECKING
+from operator import attrgetter
+from typing import TYPE_CHECKING, Any
 import logging
 
 from shapely import Polygon, MultiPolygon
 
 logger = logging.getLogger(__name__)
 
+# Province.key packs the board's Turn.key above the province's id, which VariantTopology numbers from 0
+PROVINCE_ID_BITS = 16
+
 if TYPE_CHECKING:
     from DiploGM.models import player
     from DiploGM.models import unit
+    from DiploGM.models.board import Board
+    from DiploGM.models.game import CrossBoardAdjacency
+    from DiploGM.models.topology import VariantTopology
     from DiploGM.models.unit import UnitType
 
 class ProvinceType(Enum):
@@ -22,61 +29,206 @@ class ProvinceType(Enum):
     IMPASSIBLE = 4
 
 
-class Province():
+class VariantProvince():
+    """What a province has in common on every board of a variant: its shape, where units are drawn, and so on.
+
+    Each Province reads these through its `variant`. Provinces of boards made by VariantTopology.create_board all share
+    the topology's, so none of this may be changed once boards have been made from it; setting these attributes on
+    such a Province raises AttributeError.
+    """
+    __slots__ = (
+        "geometry", "primary_unit_coordinates", "retreat_unit_coordinates", "type", "has_supply_center",
+        "impassible_adjacent", "nonadjacent_coasts", "all_locs", "all_rets", "id", "topology",
+    )
+
     def __init__(
         self,
-        name: str,
         coordinates: Polygon | MultiPolygon,
         primary_unit_coordinates: dict[UnitType | str, tuple[float, float]],
         retreat_unit_coordinates: dict[UnitType | str, tuple[float, float]],
         province_type: ProvinceType,
         has_supply_center: bool,
-        adjacent: set[Province],
-        fleet_adjacent: set[tuple[Province, str | None]] | dict[str, set[tuple[Province, str | None]]],
-        core: player.Player | None,
-        owner: player.Player | None,
-        local_unit: unit.Unit | None,  # TODO: probably doesn't make sense to init with a unit
     ):
-        self.isFake=False
-        self.name: str = name
         self.geometry: Polygon | MultiPolygon = coordinates
         self.primary_unit_coordinates: dict[UnitType | str, tuple[float, float]] = primary_unit_coordinates
         self.retreat_unit_coordinates: dict[UnitType | str, tuple[float, float]] = retreat_unit_coordinates
         self.type: ProvinceType = province_type
         self.has_supply_center: bool = has_supply_center
-        self.adjacent: set[Province] = adjacent
-        self.fleet_adjacent: set[tuple[Province, str | None]] | dict[str, set[tuple[Province, str | None]]] = fleet_adjacent
-        self.impassible_adjacent: set[Province] = set()
-        self.corer: player.Player | None = None
-        self.core: player.Player | None = core
-        self.half_core: player.Player | None = None
-        self.owner: player.Player | None = owner
-        self.unit: unit.Unit | None = local_unit
-        self.dislodged_unit: unit.Unit | None = None
+        self.impassible_adjacent: set[Province] | frozenset[Province] = set()
         self.nonadjacent_coasts: set[str] = set()
+        # Set for provinces of boards made by VariantTopology.create_board: their index in the variant, which compiles
+        # their adjacency
+        self.id: int | None = None
+        self.topology: VariantTopology | None = None
 
         # primary/retreat unit coordinates are of the form {unit_type/coast: (x, y)}
         # all_locs/all_rets are of the form {unit_type/coast: set((x, y), (x2, y2), ...)}
         # This assumes that only fleet units have to deal with multiple coasts
         # TODO: Bundle primary and retreat coordinates into a single structure
-        self.all_locs = {}
-        self.all_rets = {}
+        self.all_locs: dict[Any, set[tuple[float, float]]] = {}
+        self.all_rets: dict[Any, set[tuple[float, float]]] = {}
         if primary_unit_coordinates:
             self.all_locs = {key: {value} for key, value in self.primary_unit_coordinates.items()}
         if retreat_unit_coordinates:
             self.all_rets = {key: {value} for key, value in self.retreat_unit_coordinates.items()}
 
+
+def _variant_attribute(name: str) -> property:
+    def set_attribute(province: Province, value: Any):
+        if province.variant.topology is not None:
+            raise AttributeError(f"{province.name}'s {name} is shared by every board of the variant and can't be changed")
+        setattr(province.variant, name, value)
+    return property(attrgetter(f"variant.{name}"), set_attribute)
+
+
+class Province():
+    __slots__ = (
+        "isFake", "name", "variant", "board", "_adjacent", "_fleet_adjacent", "corer", "core", "half_core", "owner",
+        "unit", "dislodged_unit", "turn", "key",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        coordinates: Polygon | MultiPolygon,
+        primary_unit_coordinates: dict[UnitType | str, tuple[float, float]],
+        retreat_unit_coordinates: dict[UnitType | str, tuple[float, float]],
+        province_type: ProvinceType,
+        has_supply_center: bool,
+        adjacent: set[Province] | None,
+        fleet_adjacent: set[tuple[Province, str | None]] | dict[str, set[tuple[Province, str | None]]] | None,
+        core: player.Player | None,
+        owner: player.Player | None,
+        local_unit: unit.Unit | None,  # TODO: probably doesn't make sense to init with a unit
+    ):
+        variant = VariantProvince(coordinates, primary_unit_coordinates, retreat_unit_coordinates, province_type, has_supply_center)
+        self._init(name, variant, adjacent, fleet_adjacent, core, owner, local_unit)
+
+    @classmethod
+    def from_variant(cls, name: str, variant: VariantProvince, core: player.Player | None, owner: player.Player | None) -> Province:
+        """A province sharing variant, whose adjacency is built from variant.topology when it's first used."""
+        province = cls.__new__(cls)
+        province._init(name, variant, None, None, core, owner, None)
+        return province
+
+    def _init(
+        self,
+        name: str,
+        variant: VariantProvince,
+        adjacent: set[Province] | None,
+        fleet_adjacent: set[tuple[Province, str | None]] | dict[str, set[tuple[Province, str | None]]] | None,
+        core: player.Player | None,
+        owner: player.Player | None,
+        local_unit: unit.Unit | None,
+    ):
+        self.isFake=False
+        self.name: str = name
+        self.variant: VariantProvince = variant
+        self.board: Board | None = None
+        # With a topology, adjacent and fleet_adjacent may be None until they're first used
+        self._adjacent: set[Province] | None = adjacent
+        self._fleet_adjacent: set[tuple[Province, str | None]] | dict[str, set[tuple[Province, str | None]]] | None = fleet_adjacent
+        self.corer: player.Player | None = None
+        self.core: player.Player | None = core
+        self.half_core: player.Player | None = None
+        self.owner: player.Player | None = owner
+        self.unit: unit.Unit | None = local_unit
+        self.dislodged_unit: unit.Unit | None = None
+
+    geometry = _variant_attribute("geometry")
+    primary_unit_coordinates = _variant_attribute("primary_unit_coordinates")
+    retreat_unit_coordinates = _variant_attribute("retreat_unit_coordinates")
+    type = _variant_attribute("type")
+    has_supply_center = _variant_attribute("has_supply_center")
+    impassible_adjacent = _variant_attribute("impassible_adjacent")
+    nonadjacent_coasts = _variant_attribute("nonadjacent_coasts")
+    all_locs = _variant_attribute("all_locs")
+    all_rets = _variant_attribute("all_rets")
+    id = _variant_attribute("id")
+    topology = _variant_attribute("topology")
+
     def __str__(self):
         return self.name
+
+    # Includes the provinces of other boards this one is 5D-adjacent to, which are worked out each time (see
+    # CrossBoardAdjacency), so changing the set returned only changes the province's own adjacency if it has none
+    @property
+    def adjacent(self) -> set[Province]:
+        adjacent = self._own_adjacent()
+        adjacency = self._cross_board_adjacency()
+        if adjacency is not None and (others := adjacency.adjacent(self)):
+            return adjacent.union(others)
+        return adjacent
+
+    @adjacent.setter
+    def adjacent(self, adjacent: set[Province]):
+        self._adjacent = adjacent
+
+    @property
+    def fleet_adjacent(self) -> set[tuple[Province, str | None]] | dict[str, set[tuple[Province, str | None]]]:
+        fleet_adjacent = self._own_fleet_adjacent()
+        adjacency = self._cross_board_adjacency()
+        if adjacency is None or not adjacency.linked_boards(self.board):
+            return fleet_adjacent
+        if isinstance(fleet_adjacent, dict):
+            return {coast: adjacent.union(adjacency.fleet_adjacent(self, coast)) for coast, adjacent in fleet_adjacent.items()}
+        return fleet_adjacent.union(adjacency.fleet_adjacent(self))
+
+    @fleet_adjacent.setter
+    def fleet_adjacent(self, fleet_adjacent: set[tuple[Province, str | None]] | dict[str, set[tuple[Province, str | None]]]):
+        self._fleet_adjacent = fleet_adjacent
+
+    def _own_adjacent(self) -> set[Province]:
+        # Without 5D adjacencies
+        if self._adjacent is None:
+            assert self.topology is not None
+            self._adjacent = self.topology.adjacent_set(self)
+        return self._adjacent
+
+    def _own_fleet_adjacent(self) -> set[tuple[Province, str | None]] | dict[str, set[tuple[Province, str | None]]]:
+        if self._fleet_adjacent is None:
+            assert self.topology is not None
+            self._fleet_adjacent = self.topology.fleet_adjacent_set(self)
+        return self._fleet_adjacent
+
+    def _cross_board_adjacency(self) -> CrossBoardAdjacency | None:
+        if self.board is None or self.board.game is None:
+            return None
+        return self.board.game.adjacency
+
+    def is_adjacent(self, other: Province) -> bool:
+        """Whether other is in adjacent, without building it."""
+        if self.on_same_board(other):
+            assert self.topology is not None
+            return self.topology.is_adjacent(self.id, other.id)
+        adjacency = self._cross_board_adjacency()
+        if adjacency is not None and adjacency.is_adjacent(self, other):
+            return True
+        if self.topology is not None and other.board is not None:
+            return False
+        return other in self._own_adjacent()
+
+    def on_same_board(self, other: Province) -> bool:
+        """Whether both are on the same board made by VariantTopology.create_board, so their ids can be compared.
+
+        Adjacency between two such provinces is exactly what the topology compiled: 5D adjacencies only link
+        provinces of different boards.
+        """
+        return self.topology is not None and self.board is not None and other.board is self.board
+
     def order_str(self):
-        return f"T{self.turn.timeline}{self.turn.phase.to_string(short=True, move_type=0)}{str(self.turn.year)} {self.name}"
+        return f"{self.turn.code} {self.name}"
+
+    @property
+    def longname(self) -> str:
+        return self.order_str()
     def __repr__(self):
         if not hasattr(self, "turn"):
             return f"Province ? {self.name}"
         return f"Province {self.order_str()}"
     
     def get_name(self, coast: str | None = None):
-        if coast in self.fleet_adjacent:
+        if coast in self.get_multiple_coasts():
             return f"{self.name} {coast}"
         return self.name
     
@@ -88,8 +240,11 @@ class Province():
         return (0, 0)
 
     def set_turn(self,turn: Turn):
+        if self.id is None:
+            raise ValueError(f"{self.name} has no id to key it by; only provinces of boards made by VariantTopology have one")
         self.turn : Turn = turn
-        self.longname: str = self.order_str()
+        # Tells apart the provinces of every board of a game, like order_str() but cheaper to hash
+        self.key: int = (turn.key << PROVINCE_ID_BITS) | self.id
 
     def get_retreat_unit_coordinates(self, unit_type: UnitType, coast = None) -> tuple[float, float]:
         if coast in self.retreat_unit_coordinates:
@@ -119,29 +274,60 @@ class Province():
     
     # Gets a set of all coasts if multiple exist, otherwise returns an empty set (== False)
     def get_multiple_coasts(self) -> set:
-        if self.fleet_adjacent and isinstance(self.fleet_adjacent, dict):
-            return set(self.fleet_adjacent.keys())
+        if self._fleet_adjacent is None and self.topology is not None:
+            return set(self.topology.coasts[self.id])
+        fleet_adjacent = self._own_fleet_adjacent()
+        if fleet_adjacent and isinstance(fleet_adjacent, dict):
+            return set(fleet_adjacent.keys())
         return set()
     
     # Gets all provinces adjacent via fleet, optionally from a given coast
     # If there are multiple coasts, coast must be specified
     def get_coastal_adjacent(self, coast: str | None = None) -> set[tuple[Province, str | None]]:
+        self._check_coast(coast)
+        adjacent = self._own_fleet_adjacent()
+        if coast:
+            adjacent = adjacent[coast]
+        adjacency = self._cross_board_adjacency()
+        if adjacency is not None and (others := adjacency.fleet_adjacent(self, coast or None)):
+            return adjacent.union(others)
+        return adjacent
+
+    def _check_coast(self, coast: str | None):
+        if self._fleet_adjacent is None and self.topology is not None:
+            coasts = self.get_multiple_coasts()
+            multiple = bool(coasts)
+        else:
+            coasts = self._own_fleet_adjacent()
+            multiple = isinstance(coasts, dict)
         if coast:
-            if not isinstance(self.fleet_adjacent, dict):
+            if not multiple:
                 raise ValueError(f"Province {self.name} does not have multiple coasts.")
-            if coast not in self.fleet_adjacent:
+            if coast not in coasts:
                 raise ValueError(f"Province {self.name} does not have a coast {coast}.")
-            return self.fleet_adjacent[coast]
-        if isinstance(self.fleet_adjacent, dict):
+        elif multiple:
             raise ValueError(f"Province {self.name} has multiple coasts.")
-        return self.fleet_adjacent
-    
+
+    # The id of the province at coast among the topology's fleet locations
+    def location_id(self, coast: str | None = None) -> int:
+        assert self.topology is not None
+        self._check_coast(coast)
+        return self.topology.location_ids[(self.name, coast or None)]
+
     # Checks if other province (and optionally coast) is adjacent via fleet
     def is_coastally_adjacent(self, other: Province | tuple[Province, str | None], coast: str | None = None) -> bool:
         if isinstance(other, tuple) and other[1] == None:
             dest = other[0]
         else:
             dest = other
+        dest_province = dest[0] if isinstance(dest, tuple) else dest
+        if self.on_same_board(dest_province):
+            assert self.topology is not None
+            location = self.location_id(coast)
+            if isinstance(dest, tuple):
+                other_location = self.topology.location_ids.get((dest[0].name, dest[1]))
+                return other_location is not None and self.topology.is_fleet_adjacent(location, other_location)
+            return self.topology.is_fleet_adjacent_to_province(location, dest.id)
         adjacencies = self.get_coastal_adjacent(coast)
         
         for province in adjacencies:
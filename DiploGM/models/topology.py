@@ -0,0 +1,371 @@
+from __future__ import annotations
+
+import copy
+from array import array
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+from DiploGM.models.player import Player
+from DiploGM.models.province import PROVINCE_ID_BITS, Province, VariantProvince
+from DiploGM.models.turn import Turn
+from DiploGM.models.unit import Unit, UnitType
+
+if TYPE_CHECKING:
+    from DiploGM.models.board import Board
+    from DiploGM.models.turn import PhaseName
+
+FleetAdjacency = frozenset[tuple[str, str | None]]
+# A province and one of its coasts, or None for the province as a whole
+Location = tuple[str, str | None]
+
+
+def _csr(rows: Iterable[Iterable[int]]) -> tuple[array, array]:
+    # Compressed sparse rows: row i is targets[offsets[i]:offsets[i + 1]], in increasing order
+    offsets = array("I", [0])
+    targets = array("I")
+    for row in rows:
+        targets.extend(sorted(row))
+        offsets.append(len(targets))
+    return offsets, targets
+
+
+def _bit_matrix(rows: int, columns: int, cells: Iterable[tuple[int, int]]) -> bytearray:
+    bits = bytearray((rows * columns + 7) // 8)
+    for row, column in cells:
+        cell = row * columns + column
+        bits[cell >> 3] |= 1 << (cell & 7)
+    return bits
+
+
+class VariantTopology:
+    """Everything about a variant that is the same on every board of every game using it.
+
+    Parsing the SVG is slow, so a Parser builds one of these from its first parse and every board
+    after that is stamped out by create_board(). Province shapes, types, supply centers and unit
+    coordinates are shared between all those boards, in one VariantProvince each, and must be treated as read-only;
+    adjacency is stored by name, and 5D adjacency between boards is left to CrossBoardAdjacency.
+
+    Adjacency is also compiled to integers, which boards share: the provinces of a board made here have an `id`,
+    their index in province_names and in the board's province_by_id, and fleet locations have ids into `locations`.
+    Army and fleet adjacency are kept as CSR arrays (see neighbours()) with bit matrices for O(1) lookups.
+    A province's own adjacent and fleet_adjacent sets are only built from these when first used.
+    """
+
+    def __init__(self, template: Board):
+        self.datafile: str = template.datafile
+        self.fow: bool = template.fow
+        self.year_offset: int = template.year_offset
+        self.initial_turn: tuple[int, PhaseName, int] = (
+            template.turn.year,
+            template.turn.phase,
+            template.turn.timeline,
+        )
+        # Copied for each board, since games edit their own parameters
+        self.data: dict = template.data
+
+        self.provinces: dict[str, Province] = {
+            province.name: province for province in template.provinces
+        }
+        self.province_names: tuple[str, ...] = tuple(sorted(self.provinces))
+        # lower case name -> province name, and "name coast" -> (province name, coast)
+        self.name_to_province: dict[str, str] = {
+            name.lower(): name for name in self.province_names
+        }
+        self.name_to_coast: dict[str, tuple[str, str | None]] = {}
+
+        self.adjacency: dict[str, frozenset[str]] = {}
+        self.fleet_adjacency: dict[str, FleetAdjacency | dict[str, FleetAdjacency]] = {}
+        self.impassible_adjacency: dict[str, frozenset[Province]] = {}
+        # Provinces which are adjacent to something on the board without being on it themselves
+        self._detached: dict[str, Province] = {}
+        for province in template.provinces:
+            self.adjacency[province.name] = frozenset(
+                self._name_of(other) for other in province.adjacent
+            )
+            if isinstance(province.fleet_adjacent, dict):
+                self.fleet_adjacency[province.name] = {
+                    coast: frozenset(
+                        (self._name_of(other), other_coast)
+                        for other, other_coast in adjacent
+                    )
+                    for coast, adjacent in province.fleet_adjacent.items()
+                }
+            else:
+                self.fleet_adjacency[province.name] = frozenset(
+                    (self._name_of(other), other_coast)
+                    for other, other_coast in province.fleet_adjacent
+                )
+            # Impassible provinces never hold any state, so the parsed ones are shared as is
+            self.impassible_adjacency[province.name] = frozenset(
+                province.impassible_adjacent
+            )
+            for coast in province.get_multiple_coasts():
+                self.name_to_coast[province.get_name(coast)] = (province.name, coast)
+
+        self._compile()
+
+        # What every board's province shares; everything but the ids and impassible provinces is the template's own
+        self.variant_provinces: dict[str, VariantProvince] = {}
+        for name, province in self.provinces.items():
+            variant = self.variant_provinces[name] = copy.copy(province.variant)
+            variant.impassible_adjacent = self.impassible_adjacency[name]
+            variant.id = self.province_ids[name]
+            variant.topology = self
+
+        self.players: tuple[tuple[str, str | dict[str, str]], ...] = tuple(
+            (player.name, player.color_dict or player.default_color)
+            for player in template.players
+        )
+        self.centers: dict[str, frozenset[str]] = {
+            player.name: frozenset(province.name for province in player.centers)
+            for player in template.players
+        }
+        self.owners: dict[str, str | None] = {}
+        self.cores: dict[str, str | None] = {}
+        self.units: dict[str, tuple[UnitType, str, str | None]] = {}
+        for province in template.provinces:
+            self.owners[province.name] = province.owner and province.owner.name
+            self.cores[province.name] = province.core and province.core.name
+            if province.unit:
+                self.units[province.name] = (
+                    province.unit.unit_type,
+                    province.unit.player.name,
+                    province.unit.coast,
+                )
+
+    def _compile(self):
+        if len(self.province_names) > 1 << PROVINCE_ID_BITS:
+            raise ValueError(
+                f"{self.datafile} has {len(self.province_names)} provinces, but Province.key only has room for "
+                f"{1 << PROVINCE_ID_BITS}"
+            )
+        self.province_ids: dict[str, int] = {
+            name: i for i, name in enumerate(self.province_names)
+        }
+        self.coasts: tuple[tuple[str, ...], ...] = tuple(
+            (
+                tuple(sorted(adjacency))
+                if isinstance(adjacency := self.fleet_adjacency[name], dict)
+                else ()
+            )
+            for name in self.province_names
+        )
+
+        def fleet_targets(location: Location) -> FleetAdjacency:
+            name, coast = location
+            adjacency = self.fleet_adjacency[name]
+            if isinstance(adjacency, dict):
+                return adjacency[coast] if coast is not None else frozenset()
+            return adjacency if coast is None else frozenset()
+
+        # Every province as a whole and with each of its coasts, and any other pairs fleets can move to
+        locations: set[Location] = {(name, None) for name in self.province_names}
+        locations.update(
+            (name, coast)
+            for name, coasts in zip(self.province_names, self.coasts)
+            for coast in coasts
+        )
+        for location in list(locations):
+            locations.update(
+                target
+                for target in fleet_targets(location)
+                if target[0] in self.province_ids
+            )
+        self.locations: tuple[Location, ...] = tuple(
+            sorted(locations, key=lambda location: (location[0], location[1] or ""))
+        )
+        self.location_ids: dict[Location, int] = {
+            location: j for j, location in enumerate(self.locations)
+        }
+        # The province of each location
+        self.location_provinces = array(
+            "I", (self.province_ids[name] for name, _ in self.locations)
+        )
+
+        # Neighbours that aren't on the board can't have ids; the few there are get added when the sets are built
+        self._detached_adjacency: dict[int, tuple[str, ...]] = {}
+        self._detached_fleet_adjacency: dict[int, tuple[Location, ...]] = {}
+        army_rows = []
+        for i, name in enumerate(self.province_names):
+            army_rows.append(
+                [
+                    self.province_ids[other]
+                    for other in self.adjacency[name]
+                    if other in self.province_ids
+                ]
+            )
+            if detached := tuple(
+                other
+                for other in self.adjacency[name]
+                if other not in self.province_ids
+            ):
+                self._detached_adjacency[i] = detached
+        fleet_rows = []
+        for j, location in enumerate(self.locations):
+            targets = fleet_targets(location)
+            fleet_rows.append(
+                [
+                    self.location_ids[target]
+                    for target in targets
+                    if target in self.location_ids
+                ]
+            )
+            if detached_locations := tuple(
+                target for target in targets if target not in self.location_ids
+            ):
+                self._detached_fleet_adjacency[j] = detached_locations
+
+        self.adjacency_offsets, self.adjacency_targets = _csr(army_rows)
+        self.fleet_offsets, self.fleet_targets = _csr(fleet_rows)
+        provinces, locations_count = len(self.province_names), len(self.locations)
+        self._army_bits = _bit_matrix(
+            provinces,
+            provinces,
+            ((i, k) for i, row in enumerate(army_rows) for k in row),
+        )
+        self._fleet_bits = _bit_matrix(
+            locations_count,
+            locations_count,
+            ((j, k) for j, row in enumerate(fleet_rows) for k in row),
+        )
+        # From a location to a province, at any of its coasts
+        self._fleet_province_bits = _bit_matrix(
+            locations_count,
+            provinces,
+            (
+                (j, self.location_provinces[k])
+                for j, row in enumerate(fleet_rows)
+                for k in row
+            ),
+        )
+
+    def compiled_size(self) -> int:
+        """Bytes taken by the integer adjacency arrays and matrices, which all boards of the variant share."""
+        arrays = (
+            self.adjacency_offsets,
+            self.adjacency_targets,
+            self.fleet_offsets,
+            self.fleet_targets,
+            self.location_provinces,
+        )
+        matrices = (self._army_bits, self._fleet_bits, self._fleet_province_bits)
+        return sum(len(values) * values.itemsize for values in arrays) + sum(
+            len(bits) for bits in matrices
+        )
+
+    def neighbours(self, province_id: int) -> array:
+        """The ids of the provinces an army can move to from province_id on the same board."""
+        return self.adjacency_targets[
+            self.adjacency_offsets[province_id] : self.adjacency_offsets[
+                province_id + 1
+            ]
+        ]
+
+    def fleet_neighbours(self, location_id: int) -> array:
+        """The ids of the locations a fleet can move to from location_id on the same board."""
+        return self.fleet_targets[
+            self.fleet_offsets[location_id] : self.fleet_offsets[location_id + 1]
+        ]
+
+    def is_adjacent(self, province_id: int, other_id: int) -> bool:
+        cell = province_id * len(self.province_names) + other_id
+        return bool(self._army_bits[cell >> 3] >> (cell & 7) & 1)
+
+    def is_fleet_adjacent(self, location_id: int, other_id: int) -> bool:
+        cell = location_id * len(self.locations) + other_id
+        return bool(self._fleet_bits[cell >> 3] >> (cell & 7) & 1)
+
+    def is_fleet_adjacent_to_province(self, location_id: int, province_id: int) -> bool:
+        """Whether a fleet at location_id can move to any coast of province_id."""
+        cell = location_id * len(self.province_names) + province_id
+        return bool(self._fleet_province_bits[cell >> 3] >> (cell & 7) & 1)
+
+    def adjacent_set(self, province: Province) -> set[Province]:
+        """Builds the adjacent set of a province of a board made by create_board."""
+        assert province.board is not None and province.id is not None
+        provinces = province.board.province_by_id
+        adjacent = {provinces[other] for other in self.neighbours(province.id)}
+        adjacent.update(
+            self._detached[name]
+            for name in self._detached_adjacency.get(province.id, ())
+        )
+        return adjacent
+
+    def fleet_adjacent_set(
+        self, province: Province
+    ) -> set[tuple[Province, str | None]] | dict[str, set[tuple[Province, str | None]]]:
+        """Builds the fleet_adjacent set, or dict of sets by coast, of a province of a board made by create_board."""
+        assert province.board is not None and province.id is not None
+        provinces = province.board.province_by_id
+
+        def resolve(location_id: int) -> set[tuple[Province, str | None]]:
+            adjacent = {
+                (provinces[self.location_provinces[other]], self.locations[other][1])
+                for other in self.fleet_neighbours(location_id)
+            }
+            adjacent.update(
+                (self._detached[name], coast)
+                for name, coast in self._detached_fleet_adjacency.get(location_id, ())
+            )
+            return adjacent
+
+        coasts = self.coasts[province.id]
+        if coasts:
+            return {
+                coast: resolve(self.location_ids[(province.name, coast)])
+                for coast in coasts
+            }
+        return resolve(self.location_ids[(province.name, None)])
+
+    def _name_of(self, province: Province) -> str:
+        if province.name not in self.provinces:
+            self._detached[province.name] = province
+        return province.name
+
+    def create_board(self, data: dict | None = None) -> Board:
+        """Returns a new board in the variant's starting position.
+
+        `data` is used as the board's parameters as is; by default the board gets its own copy of the variant's.
+        """
+        from DiploGM.models.board import Board
+
+        players = {
+            name: Player(name, color, set(), set()) for name, color in self.players
+        }
+        provinces = {
+            name: self._create_province(name, players) for name in self.province_names
+        }
+
+        units = set()
+        for name, (unit_type, player_name, coast) in self.units.items():
+            player = players[player_name]
+            unit = Unit(unit_type, player, provinces[name], coast, None)
+            provinces[name].unit = unit
+            player.units.add(unit)
+            units.add(unit)
+        for player_name, centers in self.centers.items():
+            players[player_name].centers.update(provinces[name] for name in centers)
+
+        year, phase, timeline = self.initial_turn
+        board = Board(
+            set(players.values()),
+            set(provinces.values()),
+            units,
+            Turn(year, phase, self.year_offset, timeline),
+            copy.deepcopy(self.data) if data is None else data,
+            self.datafile,
+            self.fow,
+            self.year_offset,
+        )
+        board.topology = self
+        board.province_by_id = [provinces[name] for name in self.province_names]
+        return board
+
+    def _create_province(self, name: str, players: dict[str, Player]) -> Province:
+        owner, core = self.owners[name], self.cores[name]
+        return Province.from_variant(
+            name,
+            self.variant_provinces[name],
+            core and players[core],
+            owner and players[owner],
+        )
@@ -1,4 +1,6 @@
 from __future__ import annotations
+import functools
+import re
 from enum import Enum
 
 class PhaseName(Enum):
@@ -39,18 +41,94 @@ class PhaseName(Enum):
     def __str__(self) -> str:
         return self.to_string(short=False, move_type=True)
 
+# A turn's key is its timeline in the high bits and its index (year * 5 + phase) in the low 32, offset so that years
+# before 0 still sort first; keys of the same timeline then order the way its turns are played
+_INDEX_BITS = 32
+_INDEX_OFFSET = 1 << (_INDEX_BITS - 1)
+
+# The "T3S1902" notation of Province.order_str(): timeline, phase and year. It writes both spring phases as "S" and
+# both fall phases as "F", but reads "Sr" and "Fr" as retreats
+_CODE = re.compile(r"T([0-9]+)(Sr|S|Fr|F|W)(-?[0-9]+)")
+_RETREAT_CODE = re.compile(r"T([0-9]+)(sr|fr)(-?[0-9]+)", re.IGNORECASE)
+_CODE_PHASES = {
+    "S": PhaseName.SPRING_MOVES,
+    "Sr": PhaseName.SPRING_RETREATS,
+    "F": PhaseName.FALL_MOVES,
+    "Fr": PhaseName.FALL_RETREATS,
+    "W": PhaseName.WINTER_BUILDS,
+}
+# The "1902 Spring Moves Timeline 3" names that get_indexed_name() writes and the database stores
+_INDEXED_NAME = re.compile(
+    "(-?[0-9]+) (" + "|".join(re.escape(str(phase)) for phase in PhaseName) + ") Timeline ([0-9]+)"
+)
+_INDEXED_NAME_PHASES = {str(phase): phase for phase in PhaseName}
+
+
+@functools.total_ordering
 class Turn:
-    def __init__(self, year: int = 1642
+    """A timeline, year and phase.
+
+    Turns are interned and can't be changed: Turn(...) gives back the same instance for the same timeline, year and
+    phase, so they can be compared and hashed by `key`, the integer they are packed into, and used as dict keys.
+    start_year is accepted for compatibility, but not kept.
+    """
+    __slots__ = ("year", "phase", "timeline", "key", "code")
+
+    start_year = None
+    _interned: dict[int, Turn] = {}
+
+    def __new__(cls, year: int = 1642
                  ,phase: PhaseName = PhaseName.SPRING_MOVES
                  ,start_year: int = 1642
                  ,timeline:int = 1,
                  ):
-        self.year: int = year
-        self.phase: PhaseName = phase if phase in PhaseName else PhaseName.SPRING_MOVES
-        self.timeline: int = timeline
-        self.start_year: int = None #start_year
-        ## TODO: update everything except __init__
-        
+        phase = phase if isinstance(phase, PhaseName) else PhaseName.SPRING_MOVES
+        key = (timeline << _INDEX_BITS) + year * 5 + phase.value + _INDEX_OFFSET
+        turn = cls._interned.get(key)
+        if turn is None:
+            turn = super().__new__(cls)
+            object.__setattr__(turn, "year", year)
+            object.__setattr__(turn, "phase", phase)
+            object.__setattr__(turn, "timeline", timeline)
+            object.__setattr__(turn, "key", key)
+            # What Province.order_str() puts before the province name
+            object.__setattr__(turn, "code", f"T{timeline}{phase.to_string(short=True, move_type=0)}{year}")
+            cls._interned[key] = turn
+        return turn
+
+    @classmethod
+    def from_key(cls, key: int) -> Turn:
+        year, phase = divmod((key & ((1 << _INDEX_BITS) - 1)) - _INDEX_OFFSET, 5)
+        return cls(year, PhaseName(phase), timeline=key >> _INDEX_BITS)
+
+    @classmethod
+    def from_code(cls, s: str, retreats_only: bool = False) -> tuple[Turn, str]:
+        """The turn at the start of s in the "T3S1902" notation of Province.order_str(), and the rest of s.
+
+        With retreats_only, the phase must be "Sr" or "Fr", in any case. Raises ValueError if s doesn't start with a turn.
+        """
+        match = (_RETREAT_CODE if retreats_only else _CODE).match(s)
+        if match is None:
+            raise ValueError(f"Could not read a turn from {s!r}")
+        timeline, phase, year = match.groups()
+        phase = _CODE_PHASES[phase.title() if retreats_only else phase]
+        return cls(int(year), phase, timeline=int(timeline)), s[match.end():]
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Turns can't be changed; make another Turn instead of setting {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Turns can't be changed; make another Turn instead of deleting {name}")
+
+    def __copy__(self) -> Turn:
+        return self
+
+    def __deepcopy__(self, memo) -> Turn:
+        return self
+
+    def __reduce__(self):
+        return (Turn, (self.year, self.phase, None, self.timeline))
+
     def __str__(self) -> str:
         return self.to_string(short=False, move_type=True)
     
@@ -101,27 +179,24 @@ class Turn:
     def __eq__(self,other) -> bool:
         if not isinstance(other,Turn):
             return NotImplemented
-        #if other.start_year != self.start_year:
-        #    raise Exception("Comparing Turns with different start years")
-        return other.timeline == self.timeline and other.year == self.year and other.phase == self.phase
+        return self.key == other.key
+
+    def __lt__(self, other: Turn) -> bool:
+        if not isinstance(other,Turn):
+            return NotImplemented
+        return self.key < other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
 
     @staticmethod
+    @functools.lru_cache(maxsize=4096)
     def turn_from_string(turn_str: str) -> Turn | None:
-        split_index = turn_str.index(" ")
-        year = int(turn_str[:split_index])
-        phase_name = turn_str[split_index:].strip()
-        for ph in PhaseName.__members__.values():
-            n = ph.to_string(short=False, move_type=True)
-            if phase_name.startswith(n):
-                phase = ph
-                timeline_str = phase_name[len(n):].strip()
-                break
-        else:
-            return None
-        timeline_strs = timeline_str.split()
-        if len(timeline_strs)!=2 or timeline_strs[0]!="Timeline":
+        match = _INDEXED_NAME.fullmatch(turn_str.strip())
+        if match is None:
             return None
-        return Turn(year=year,phase=phase,timeline=int(timeline_strs[1]))
+        year, phase, timeline = match.groups()
+        return Turn(year=int(year),phase=_INDEXED_NAME_PHASES[phase],timeline=int(timeline))
 """
 All instances of  Turn constructor 'Turn(' outside tests have been checked
 """
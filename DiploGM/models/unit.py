@@ -16,6 +16,8 @@ class UnitType(Enum):
 
 
 class Unit:
+    __slots__ = ("unit_type", "player", "province", "coast", "retreat_options", "order")
+
     def __init__(
         self,
         unit_type: UnitType,
@@ -41,6 +43,18 @@ class Unit:
     def add_retreat_options(self):
         if self.retreat_options is None:
             self.retreat_options = set()
+        topology = self.province.topology
+        if topology is not None and self.province.board is not None:
+            # Only the board's own provinces are options, which is exactly its compiled adjacency
+            provinces = self.province.board.province_by_id
+            if self.unit_type == UnitType.ARMY:
+                for province_id in topology.neighbours(self.province.id):
+                    if provinces[province_id].type != ProvinceType.SEA:
+                        self.retreat_options.add((provinces[province_id], None))
+            else:
+                for location_id in topology.fleet_neighbours(self.province.location_id(self.coast)):
+                    self.retreat_options.add((provinces[topology.location_provinces[location_id]], topology.locations[location_id][1]))
+            return
         if self.unit_type == UnitType.ARMY:
             for province in self.province.adjacent:
                 if province.turn == self.province.turn:
@@ -14,6 +14,8 @@ def parse_board_params(message: str, board: Board) -> tuple[str, str, bytes | No
             _parse_command(command, board)
         except Exception as error:
             invalid.append((command, error))
+    # The commands may have changed the board_parameters and players rows
+    get_connection().invalidate_game_parameters(board.board_id)
 
     embed_colour = None
     if invalid:
@@ -19,11 +19,15 @@ manager = Manager()
 def parse_edit_state(message: str, board: Board) -> tuple[str, str, bytes | None, str | None, str | None]:
     invalid: list[tuple[str, Exception]] = []
     commands = str.splitlines(message)
+    # The commands update the board's rows in place
+    get_connection().detach_board(board)
     for command in commands:
         try:
             _parse_command(command, board)
         except Exception as error:
             invalid.append((command, error))
+    # The commands may have changed the board_parameters and players rows
+    get_connection().invalidate_game_parameters(board.board_id)
 
     embed_colour = None
     if invalid:
@@ -60,8 +64,8 @@ def _set_phase(keywords: list[str], board: Board) -> None:
         raise ValueError(f"{' '.join(keywords)} is not a valid phase name")
     board.turn = new_turn
     get_connection().execute_arbitrary_sql(
-        "UPDATE boards SET phase=? WHERE board_id=? and phase=?",
-        (board.turn.get_indexed_name(), board.board_id, old_turn),
+        "UPDATE boards SET phase=?, timeline=?, year=?, phase_ordinal=? WHERE board_id=? and phase=?",
+        (board.turn.get_indexed_name(), board.turn.timeline, board.turn.year, board.turn.phase.value, board.board_id, old_turn),
     )
     get_connection().execute_arbitrary_sql(
         "UPDATE provinces SET phase=? WHERE board_id=? and phase=?",
@@ -166,9 +170,8 @@ def _create_unit(keywords: list[str], board: Board) -> None:
 
     unit = board.create_unit(unit_type, player, province, coast, None)
     get_connection().execute_arbitrary_sql(
-        "INSERT INTO units (board_id, phase, location, is_dislodged, owner, is_army) "
-        "VALUES (?, ?, ?, ?, ?, ?) "
-        "ON CONFLICT (board_id, phase, location, is_dislodged) DO UPDATE SET owner=?, is_army=?",
+        # units is a view, which updates the owner and type if the unit already exists
+        "INSERT INTO units (board_id, phase, location, is_dislodged, owner, is_army) VALUES (?, ?, ?, ?, ?, ?)",
         (
             board.board_id,
             board.turn.get_indexed_name(),
@@ -176,8 +179,6 @@ def _create_unit(keywords: list[str], board: Board) -> None:
             False,
             player.name,
             unit_type == UnitType.ARMY,
-            player.name,
-            unit_type == UnitType.ARMY,
         ),
     )
 
@@ -204,9 +205,8 @@ def _create_dislodged_unit(keywords: list[str], board: Board) -> None:
             )
         unit = board.create_unit(unit_type, player, province, coast, retreat_options)
         get_connection().execute_arbitrary_sql(
-            "INSERT INTO units (board_id, phase, location, is_dislodged, owner, is_army) "
-            "VALUES (?, ?, ?, ?, ?, ?) "
-            "ON CONFLICT (board_id, phase, location, is_dislodged) DO UPDATE SET owner=?, is_army=?",
+            # units is a view, which updates the owner and type if the unit already exists
+            "INSERT INTO units (board_id, phase, location, is_dislodged, owner, is_army) VALUES (?, ?, ?, ?, ?, ?)",
             (
                 board.board_id,
                 board.turn.get_indexed_name(),
@@ -214,8 +214,6 @@ def _create_dislodged_unit(keywords: list[str], board: Board) -> None:
                 True,
                 player.name,
                 unit_type == UnitType.ARMY,
-                player.name,
-                unit_type == UnitType.ARMY,
             ),
         )
         get_connection().executemany_arbitrary_sql(
@@ -11,7 +11,8 @@ from DiploGM.models.turn import Turn, PhaseName
 from DiploGM.models import order
 from DiploGM.models.board import Board
 from DiploGM.models.game import Game
-from DiploGM.db.database import get_connection
+from DiploGM.db.async_database import write_behind
+from DiploGM.db.database import build_order_rows, get_connection, order_rows
 from DiploGM.models.player import Player
 from DiploGM.models.province import Province
 from DiploGM.models.unit import Unit, UnitType
@@ -436,13 +437,21 @@ def parse_order(message: str, player_restriction: Player | None, game: Game) ->
     database = get_connection()
     timelines = game.all_turns()
     # Save orders for all units on final boards
+    unit_orders = {}
     for turns in timelines:
         turn = turns[-1]
         board = game.get_board(turn)
         if turn.is_moves() or turn.is_retreats():
-            database.save_order_for_units(board, movement)
+            if rows := order_rows(board, movement):
+                unit_orders[turn.get_indexed_name()] = rows
         elif turn.is_builds():
-            database.save_build_orders_for_players(board,player_restriction)
+            write_behind(
+                database.save_build_orders, board.board_id, turn.get_indexed_name(), *build_order_rows(board, player_restriction)
+            )
+    if unit_orders:
+        write_behind(
+            database.save_submitted_orders, game.board_id, unit_orders, player_restriction.name if player_restriction else None
+        )
 
     paginator = Paginator(prefix="```ansi\n", suffix="```", max_size=4096)
     
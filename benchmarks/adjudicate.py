@@ -0,0 +1,54 @@
+"""Count the commits and time taken by Manager.adjudicate on a multi-timeline game.
+
+Usage: python -m benchmarks.adjudicate [--variant classic] [--timelines 8] [--phases 5]
+"""
+
+import argparse
+import logging
+import time
+
+from benchmarks.utils import (
+    BENCHMARK_BOARD_ID,
+    build_multi_timeline_game,
+    temporary_database,
+)
+from DiploGM.db import database as database_module
+from DiploGM.manager import Manager
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variant", default="classic")
+    parser.add_argument("--timelines", type=int, default=8)
+    parser.add_argument(
+        "--phases", type=int, default=5, help="number of adjudications to run"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    with temporary_database() as database:
+        build_multi_timeline_game(database, args.variant, args.timelines, 1)
+        database._connection.commit()
+        # The manager and the adjudicator both use the module's connection
+        database_module.set_connection(database)
+        manager = Manager([BENCHMARK_BOARD_ID])
+
+        statements: list[str] = []
+        database._connection.set_trace_callback(statements.append)
+        print(f"{args.variant}: {args.timelines} timelines")
+        for _ in range(args.phases):
+            turn = manager.get_game(BENCHMARK_BOARD_ID).all_turns()[0][-1]
+            statements.clear()
+            start = time.perf_counter()
+            manager.adjudicate(BENCHMARK_BOARD_ID)
+            elapsed = time.perf_counter() - start
+            commits = sum(statement == "COMMIT" for statement in statements)
+            print(
+                f"  {turn.get_indexed_name():<32} {commits:4d} commits {elapsed * 1000:8.1f} ms"
+            )
+        database._connection.set_trace_callback(None)
+        database_module.set_connection(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Measure the memory boards take, fresh from a variant and in a loaded multi-timeline game.
+
+Usage: python -m benchmarks.board_memory [--variants classic impdip] [--boards 100] [--timelines 4] [--turns 10]
+"""
+
+import argparse
+import logging
+import sys
+
+from benchmarks.utils import (
+    BENCHMARK_BOARD_ID,
+    allocated,
+    build_multi_timeline_game,
+    temporary_database,
+)
+from DiploGM.map_parser.vector.vector import get_parser
+from DiploGM.models.board import Board
+
+
+def adjacency_size(board: Board) -> int:
+    """Bytes taken by the adjacency sets the board's provinces have built, and the tuples in them."""
+    size = 0
+    for province in board.provinces:
+        if province._adjacent is not None:
+            size += sys.getsizeof(province._adjacent)
+        if province._fleet_adjacent is None:
+            continue
+        fleet_adjacents = (
+            province._fleet_adjacent.values()
+            if isinstance(province._fleet_adjacent, dict)
+            else [province._fleet_adjacent]
+        )
+        for fleet_adjacent in fleet_adjacents:
+            size += sys.getsizeof(fleet_adjacent) + sum(
+                sys.getsizeof(pair) for pair in fleet_adjacent
+            )
+    return size
+
+
+def measure(variant: str, args: argparse.Namespace):
+    try:
+        topology = get_parser(variant).get_topology()
+    except FileNotFoundError as e:
+        print(f"{variant}: skipped, {e.strerror.lower()}: {e.filename}")
+        return
+    fresh, boards = allocated(
+        lambda: [topology.create_board() for _ in range(args.boards)]
+    )
+    fresh_adjacency = sum(map(adjacency_size, boards))
+    del boards
+
+    with temporary_database(read_connections=0) as database:
+        count = build_multi_timeline_game(database, variant, args.timelines, args.turns)
+        loaded, game = allocated(database.get_game, BENCHMARK_BOARD_ID)
+        loaded_adjacency = sum(map(adjacency_size, game.loaded_boards()))
+
+    print(f"{variant}: {len(topology.province_names)} provinces")
+    print(
+        f"  compiled topology:          {topology.compiled_size() / 1024:8.1f} KiB, shared by every board of the variant"
+    )
+    print(
+        f"  fresh board:                {fresh // args.boards:8d} bytes, adjacency sets {fresh_adjacency // args.boards:6d} bytes"
+    )
+    print(
+        f"  board of a loaded game:     {loaded // count:8d} bytes, adjacency sets {loaded_adjacency // count:6d} bytes "
+        f"({count} boards over {args.timelines} timelines, 5D adjacency included)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variants", nargs="+", default=["classic", "impdip"])
+    parser.add_argument("--boards", type=int, default=100)
+    parser.add_argument("--timelines", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=10)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    for variant in args.variants:
+        measure(variant, args)
+
+
+if __name__ == "__main__":
+    main()
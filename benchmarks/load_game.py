@@ -0,0 +1,96 @@
+"""Time loading a large multi-timeline game from the database.
+
+Usage: python -m benchmarks.load_game [--variant classic] [--timelines 8] [--turns 25] [--keyframe-interval 1]
+"""
+
+import argparse
+import logging
+import os
+
+from benchmarks.utils import (
+    BENCHMARK_BOARD_ID,
+    build_multi_timeline_game,
+    temporary_database,
+    timed,
+)
+from DiploGM.map_parser.vector import vector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variant", default="classic")
+    parser.add_argument("--timelines", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--keyframe-interval",
+        type=int,
+        default=1,
+        help="see province_keyframe_interval in config_defaults.toml",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    # Without read-only connections, loads go through the writer connection, where set_trace_callback can count them
+    with temporary_database(
+        province_keyframe_interval=args.keyframe_interval, read_connections=0
+    ) as database:
+        boards = build_multi_timeline_game(
+            database, args.variant, args.timelines, args.turns
+        )
+        database._connection.commit()
+        database._connection.execute("VACUUM")
+        size = os.path.getsize(
+            database._connection.execute("PRAGMA database_list").fetchone()[2]
+        )
+
+        vector.parsers.clear()
+        cold, _ = timed(database.get_game, BENCHMARK_BOARD_ID, repeat=1)
+        warm, game = timed(database.get_game, BENCHMARK_BOARD_ID, repeat=args.repeat)
+
+        statements = []
+        database._connection.set_trace_callback(statements.append)
+        database.get_game(BENCHMARK_BOARD_ID)
+        database._connection.set_trace_callback(None)
+
+        # The first load saves the snapshot that the rest restore from
+        database.get_games([BENCHMARK_BOARD_ID], use_snapshots=True)
+        snapshot_size = len(
+            database._connection.execute(
+                "SELECT snapshot FROM game_snapshots"
+            ).fetchone()[0]
+        )
+        from_snapshot, _ = timed(
+            database.get_games,
+            [BENCHMARK_BOARD_ID],
+            use_snapshots=True,
+            repeat=args.repeat,
+        )
+        lazy, lazy_games = timed(
+            database.get_games,
+            [BENCHMARK_BOARD_ID],
+            use_snapshots=True,
+            lazy=True,
+            repeat=args.repeat,
+        )
+        built = sum(1 for _ in lazy_games[BENCHMARK_BOARD_ID].loaded_boards())
+
+    assert sum(len(timeline) for timeline in game.all_turns()) == boards
+    print(
+        f"{args.variant}: {boards} boards over {args.timelines} timelines, province keyframe every {args.keyframe_interval}"
+    )
+    print(f"  database size:                 {size / 1024:8.0f} KiB")
+    print(f"  cold load (parser not cached): {cold * 1000:8.1f} ms")
+    print(
+        f"  warm load:                     {warm * 1000:8.1f} ms ({warm / boards * 1000:.2f} ms/board)"
+    )
+    print(f"  SQL statements per load:       {len(statements):8d}")
+    print(f"  snapshot size:                 {snapshot_size / 1024:8.0f} KiB")
+    print(f"  warm load from snapshot:       {from_snapshot * 1000:8.1f} ms")
+    print(
+        f"  lazy load from snapshot:       {lazy * 1000:8.1f} ms ({built} of {boards} boards built)"
+    )
+
+
+if __name__ == "__main__":
+    main()
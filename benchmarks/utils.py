@@ -0,0 +1,86 @@
+"""Helpers shared by the benchmarks.
+
+Benchmarks are run from the repository root, e.g. `python -m benchmarks.load_game`.
+They never touch bot_db.sqlite; every run builds its own throwaway database.
+"""
+
+import contextlib
+import os
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Iterator
+
+# DiploGM.utils has to be imported before the models, otherwise models.player hits a circular import
+import DiploGM.utils  # noqa: F401
+from DiploGM.db.database import _DatabaseConnection
+from DiploGM.map_parser.vector.vector import get_parser
+from DiploGM.models.turn import Turn
+from DiploGM.models.unit import UnitType
+
+BENCHMARK_BOARD_ID = 1
+
+
+@contextlib.contextmanager
+def temporary_database(**kwargs) -> Iterator[_DatabaseConnection]:
+    with tempfile.TemporaryDirectory() as directory:
+        yield _DatabaseConnection(os.path.join(directory, "benchmark.sqlite"), **kwargs)
+
+
+def build_multi_timeline_game(
+    database: _DatabaseConnection,
+    variant: str,
+    timelines: int,
+    turns: int,
+    board_id: int = BENCHMARK_BOARD_ID,
+) -> int:
+    """Saves `timelines` timelines of `turns` boards each and returns the number of boards written."""
+    board = get_parser(variant).parse()
+    board.board_id = board_id
+    # In retreat phases every starting unit is dislodged, to exercise loading retreat options
+    retreats_board = get_parser(variant).parse()
+    retreats_board.board_id = board_id
+    for unit in retreats_board.units:
+        unit.province.unit = None
+        unit.province.dislodged_unit = unit
+        if unit.unit_type == UnitType.ARMY:
+            unit.retreat_options = {
+                (province, None) for province in unit.province.adjacent
+            }
+        else:
+            unit.retreat_options = set(unit.province.get_coastal_adjacent(unit.coast))
+
+    first_turn = board.turn
+    for timeline in range(1, timelines + 1):
+        turn = Turn(first_turn.year, first_turn.phase, timeline=timeline)
+        parent = None
+        for _ in range(turns):
+            saved = retreats_board if turn.is_retreats() else board
+            saved.turn = turn
+            saved.parent = parent
+            database.save_board(board_id, saved)
+            parent = turn
+            turn = turn.get_next_turn()
+    return timelines * turns
+
+
+def timed(function, *args, repeat: int = 3, **kwargs) -> tuple[float, object]:
+    """Returns the best wall time of `repeat` calls and the result of the last one."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def allocated(function, *args, **kwargs) -> tuple[int, object]:
+    """Returns how many bytes the result of calling function still holds on to, and the result."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = function(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[0] - before, result
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,6 @@
+# Importing the models before DiploGM.utils runs into a circular import
+import DiploGM.utils  # noqa: F401
+from DiploGM.db import database
+
+# Tests share the Manager's database; keeping it in memory leaves bot_db.sqlite alone and is faster
+database.set_connection(database.open_database("memory"))
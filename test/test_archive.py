@@ -0,0 +1,60 @@
+import unittest
+
+from test.utils import GameBuilder, game_state
+
+
+class TestArchive(unittest.TestCase):
+    def test_archived_game_comes_back_when_used(self):
+        g = GameBuilder(empty=False)
+        manager = g.bb._manager
+        for _ in range(3):
+            g.adjudicate()
+        board_id = g.game.board_id
+        before = game_state(manager._database.get_game(board_id))
+
+        with manager._boards.pinned(board_id):
+            self.assertEqual(
+                manager.archive_game(board_id), "This game is in use, try again later."
+            )
+        self.assertTrue(manager.archive_game(board_id).startswith("Game archived"))
+        self.assertEqual(
+            manager.archive_game(board_id), "This game is already archived."
+        )
+        self.assertNotIn(board_id, manager._boards.loaded())
+        self.assertIn(board_id, manager._boards)
+        self.assertEqual(manager._database.get_games([board_id]), {})
+
+        game = manager.get_game(board_id)
+        self.assertFalse(manager._database.is_archived(board_id))
+        self.assertEqual(game_state(game), before)
+        g.game = game
+        g.adjudicate()
+
+    def test_idle_games_are_archived(self):
+        g = GameBuilder(empty=False)
+        manager = g.bb._manager
+        board_id = g.game.board_id
+        self.assertNotIn(board_id, manager.archive_idle_games(1))
+
+        manager._database.execute_arbitrary_sql(
+            "UPDATE game_activity SET changed_at = changed_at - ? WHERE board_id=?",
+            (2 * 24 * 60 * 60, board_id),
+        )
+        with manager._boards.pinned(board_id):
+            self.assertNotIn(board_id, manager.archive_idle_games(1))
+        self.assertIn(board_id, manager.archive_idle_games(1))
+        self.assertTrue(manager._database.is_archived(board_id))
+
+        self.assertEqual(manager.restore_game(board_id), "Game restored.")
+        self.assertEqual(manager.restore_game(board_id), "This game isn't archived.")
+        # Restoring counts as a change
+        self.assertNotIn(board_id, manager.archive_idle_games(1))
+
+        manager.archive_game(board_id)
+        manager.total_delete(board_id)
+        self.assertNotIn(board_id, manager._boards)
+        self.assertFalse(manager._database.is_archived(board_id))
+
+
+if __name__ == "__main__":
+    unittest.main()
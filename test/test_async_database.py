@@ -0,0 +1,149 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+# Importing the models before DiploGM.utils runs into a circular import
+import DiploGM.utils  # noqa: F401
+from DiploGM.db import async_database
+from DiploGM.db.async_database import AsyncDatabase, on_database_thread
+from DiploGM.db.database import _DatabaseConnection
+from DiploGM.map_parser.vector.vector import get_parser
+
+
+class TestAsyncDatabase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        self.path = os.path.join(self._directory.name, "test.sqlite")
+        self.connection = _DatabaseConnection(self.path)
+        self.database = AsyncDatabase(self.connection)
+
+    async def asyncTearDown(self):
+        await self.database.close()
+
+    async def test_reads_see_queued_writes(self):
+        board = get_parser("classic").parse()
+        board.board_id = 1
+        self.database.write(self.connection.save_board, 1, board)
+        game = await self.database.read(self.connection.get_game, 1)
+        self.assertEqual(len(game.get_board(board.turn).units), 22)
+
+        # Synchronous writes from other threads go through the same queue
+        threads = []
+        self.connection._connection.set_trace_callback(
+            lambda _: threads.append(threading.current_thread())
+        )
+        self.connection.execute_arbitrary_sql(
+            "UPDATE boards SET fish=? WHERE board_id=?", (3, 1)
+        )
+        self.assertTrue(threads)
+        self.assertEqual(set(threads), {self.database._thread})
+        # while reads use the read-only connections
+        writes = len(threads)
+        self.assertEqual(self.connection.get_game_ids(), {1})
+        self.assertEqual(len(threads), writes)
+
+    async def test_reads_during_a_transaction(self):
+        board = get_parser("classic").parse()
+        board.board_id = 1
+        with self.connection.transaction():
+            self.connection.save_board(1, board)
+            # Not committed yet, so other connections can't see it
+            self.assertEqual(await self.database.read(self.connection.get_games), {})
+        self.assertEqual(set(await self.database.read(self.connection.get_games)), {1})
+
+    async def test_transaction_from_another_thread(self):
+        board = get_parser("classic").parse()
+        board.board_id = 1
+        with self.assertRaises(RuntimeError):
+            with self.connection.transaction():
+                self.connection.save_board(1, board)
+                raise RuntimeError()
+        self.assertEqual(await self.database.read(self.connection.get_games), {})
+
+        with self.connection.transaction():
+            self.connection.save_board(1, board)
+        self.assertEqual(set(await self.database.read(self.connection.get_games)), {1})
+
+    async def test_close_flushes_writes(self):
+        board = get_parser("classic").parse()
+        board.board_id = 1
+        self.database.write(self.connection.save_board, 1, board)
+        await self.database.close()
+        self.assertIsNone(self.connection._database_thread)
+
+        # After closing, calls run on the caller's thread again
+        other = _DatabaseConnection(self.path)
+        self.assertEqual(set(other.get_games()), {1})
+        self.database.write(
+            self.connection.execute_arbitrary_sql, "DELETE FROM boards", ()
+        )
+        self.assertEqual(other.get_games(), {})
+
+    async def test_failed_writes_are_logged(self):
+        with self.assertLogs("DiploGM.db.async_database", "ERROR"):
+            self.database.write(
+                self.connection.execute_arbitrary_sql, "SELECT * FROM missing_table", ()
+            )
+            await self.database.flush()
+        with self.assertRaises(Exception):
+            await self.database.read(
+                self.connection.execute_arbitrary_sql, "SELECT * FROM missing_table", ()
+            )
+
+    async def test_reads_without_read_connections(self):
+        # Nothing else can open an in-memory database, so its reads have to share the writer connection
+        connection = _DatabaseConnection(":memory:")
+        database = AsyncDatabase(connection)
+        self.addAsyncCleanup(database.close)
+        board = get_parser("classic").parse()
+        board.board_id = 1
+        release = threading.Event()
+        database.write(release.wait, 5)
+        database.write(connection.save_board, 1, board)
+
+        threads = []
+        connection._connection.set_trace_callback(
+            lambda _: threads.append(threading.current_thread())
+        )
+        read = asyncio.ensure_future(database.read(connection.get_games))
+        await asyncio.sleep(0.05)
+        # Waiting behind the queued writes rather than reading alongside them
+        self.assertFalse(read.done())
+        release.set()
+        self.assertEqual(set(await read), {1})
+        self.assertEqual(await database.read(connection.get_game_ids), {1})
+        self.assertEqual(set(threads), {database._thread})
+
+    async def test_on_database_thread(self):
+        # Without a running database thread, the work runs straight away
+        self.assertIs(
+            await on_database_thread(threading.current_thread),
+            threading.current_thread(),
+        )
+
+        self.addCleanup(setattr, async_database, "_async_db", async_database._async_db)
+        async_database._async_db = self.database
+        board = get_parser("classic").parse()
+        board.board_id = 1
+        started, release = threading.Event(), threading.Event()
+
+        def save():
+            started.set()
+            release.wait(5)
+            self.connection.save_board(1, board)
+            return threading.current_thread()
+
+        work = asyncio.ensure_future(on_database_thread(save))
+        await asyncio.to_thread(started.wait, 5)
+        # The event loop keeps running while the database thread works
+        self.assertFalse(work.done())
+        release.set()
+        self.assertIs(await work, self.database._thread)
+        self.assertEqual(set(await self.database.read(self.connection.get_games)), {1})
+
+
+if __name__ == "__main__":
+    unittest.main()
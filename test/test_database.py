@@ -0,0 +1,687 @@
+import gzip
+import os
+import pickle
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+import zlib
+
+# Importing the models before DiploGM.utils runs into a circular import
+import DiploGM.utils  # noqa: F401
+from DiploGM.adjudicator.adjudicator import boards_equal
+from DiploGM.db.database import (
+    _DatabaseConnection,
+    _decode_snapshot,
+    open_database,
+    order_rows,
+)
+from DiploGM.map_parser.vector.vector import get_parser
+from DiploGM.models.order import Hold, Move
+from DiploGM.models.turn import PhaseName, Turn
+from DiploGM.models.unit import UnitType
+
+
+class TestDatabase(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        self.database = _DatabaseConnection(
+            os.path.join(self._directory.name, "test.sqlite")
+        )
+
+    def save(self, board_id, board, turn: Turn, parent: Turn | None = None):
+        board.board_id = board_id
+        board.turn = turn
+        board.parent = parent
+        self.database.save_board(board_id, board)
+
+    def test_get_games_keeps_boards_apart(self):
+        parser = get_parser("classic")
+        first = parser.parse()
+        turn = first.turn
+        self.save(1, first, turn)
+
+        second = parser.parse()
+        kiel = second.get_province("Kiel")
+        kiel.owner = second.get_player("France")
+        second.delete_all_units()
+        self.save(1, second, turn.get_next_turn(), parent=turn)
+
+        other_game = parser.parse()
+        other_game.delete_all_units()
+        self.save(2, other_game, turn)
+        self.database.execute_arbitrary_sql(
+            "INSERT INTO board_parameters (board_id, parameter_key, parameter_value) VALUES (?, ?, ?)",
+            (2, "victory_count", "5"),
+        )
+
+        games = self.database.get_games([1, 2])
+        self.assertEqual(set(games), {1, 2})
+
+        game = games[1]
+        start = game.get_board(turn)
+        later = game.get_board(turn.get_next_turn())
+        self.assertEqual(start.get_province("Kiel").owner.name, "Germany")
+        self.assertEqual(later.get_province("Kiel").owner.name, "France")
+        self.assertEqual(len(start.units), 22)
+        self.assertEqual(len(later.units), 0)
+        self.assertEqual(start.get_province("Kiel").unit.player.name, "Germany")
+        self.assertNotEqual(start.data["victory_count"], "5")
+
+        other = games[2].get_board(turn)
+        self.assertEqual(len(other.units), 0)
+        self.assertEqual(other.data["victory_count"], "5")
+
+        self.assertEqual(set(self.database.get_games([2])), {2})
+
+    def test_retreat_options(self):
+        board = get_parser("classic").parse()
+        board.delete_all_units()
+        portugal = board.get_province("Portugal")
+        spain_nc = board.get_province_and_coast("Spain nc")
+        mid_atlantic = board.get_province_and_coast("MAO")
+        board.create_unit(
+            UnitType.FLEET,
+            board.get_player("France"),
+            portugal,
+            None,
+            {spain_nc, mid_atlantic},
+        )
+        retreats = board.turn.get_next_turn()
+        self.save(1, board, retreats)
+
+        loaded = self.database.get_game(1).get_board(retreats)
+        unit = loaded.get_province("Portugal").dislodged_unit
+        self.assertIsNotNone(unit)
+        self.assertIsNone(loaded.get_province("Portugal").unit)
+        self.assertEqual(
+            {(province.name, coast) for province, coast in unit.retreat_options},
+            {("Spain", "nc"), (mid_atlantic[0].name, None)},
+        )
+        for province, _ in unit.retreat_options:
+            self.assertIs(province, loaded.get_province(province.name))
+
+    def test_turn_columns(self):
+        board = get_parser("classic").parse()
+        first = board.turn
+        for timeline, length in [(1, 7), (2, 3)]:
+            turn = Turn(first.year, first.phase, timeline=timeline)
+            for _ in range(length):
+                self.save(1, board, turn)
+                turn = turn.get_next_turn()
+
+        rows = self.database._connection.execute(
+            "SELECT timeline, year, phase_ordinal FROM boards WHERE board_id=? ORDER BY timeline, year, phase_ordinal",
+            (1,),
+        ).fetchall()
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[-4], (1, first.year + 1, PhaseName.SPRING_RETREATS.value))
+        self.assertEqual(rows[-1], (2, first.year, PhaseName.FALL_MOVES.value))
+        self.assertEqual(
+            [
+                turn
+                for timeline in self.database.get_game(1).all_turns()
+                for turn in timeline
+            ],
+            [
+                Turn(year, PhaseName(phase_ordinal), timeline=timeline)
+                for timeline, year, phase_ordinal in rows
+            ],
+        )
+
+    def test_load_boards_without_turn_columns(self):
+        board = get_parser("classic").parse()
+        turn = board.turn
+        self.save(1, board, turn)
+        self.save(1, board, turn.get_next_turn(), parent=turn)
+        self.database.execute_arbitrary_sql(
+            "UPDATE boards SET timeline=NULL, year=NULL, phase_ordinal=NULL", ()
+        )
+
+        game = self.database.get_game(1)
+        self.assertEqual(game.get_board(turn.get_next_turn()).parent, turn)
+
+    def test_names_are_encoded(self):
+        board = get_parser("classic").parse()
+        turn = board.turn
+        self.save(1, board, turn)
+        self.save(1, board, turn.get_next_turn(), parent=turn)
+
+        connection = self.database._connection
+        names = connection.execute("SELECT COUNT(*) FROM names").fetchone()[0]
+        # Each name is stored once, however many boards use it
+        self.assertGreaterEqual(names, len(board.provinces) + len(board.players))
+        self.assertLessEqual(
+            names, len(board.provinces) + len(board.name_to_coast) + len(board.players)
+        )
+        self.assertEqual(
+            connection.execute(
+                "SELECT COUNT(*) FROM provinces WHERE province_name='Kiel'"
+            ).fetchone()[0],
+            2,
+        )
+
+        # Queries written against the original tables go through the views
+        self.database.execute_arbitrary_sql(
+            "UPDATE provinces SET owner=? WHERE board_id=? and phase=? and province_name=?",
+            ("France", 1, turn.get_indexed_name(), "Kiel"),
+        )
+        self.database.execute_arbitrary_sql(
+            "DELETE FROM units WHERE board_id=? and phase=? and location=? and is_dislodged=?",
+            (1, turn.get_indexed_name(), "Kiel", False),
+        )
+        self.database.execute_arbitrary_sql(
+            "INSERT INTO units (board_id, phase, location, is_dislodged, owner, is_army) VALUES (?, ?, ?, ?, ?, ?)",
+            (1, turn.get_indexed_name(), "Spain sc", False, "Italy", False),
+        )
+        self.database.execute_arbitrary_sql(
+            "INSERT INTO units (board_id, phase, location, is_dislodged, owner, is_army) VALUES (?, ?, ?, ?, ?, ?)",
+            (1, turn.get_indexed_name(), "Spain sc", False, "France", False),
+        )
+
+        loaded = self.database.get_game(1).get_board(turn)
+        kiel = loaded.get_province("Kiel")
+        self.assertEqual(kiel.owner.name, "France")
+        self.assertIsNone(kiel.unit)
+        spain = loaded.get_province("Spain")
+        self.assertEqual((spain.unit.player.name, spain.unit.coast), ("France", "sc"))
+        self.assertEqual(
+            self.database.get_game(1)
+            .get_board(turn.get_next_turn())
+            .get_province("Kiel")
+            .owner.name,
+            "Germany",
+        )
+
+    def test_province_deltas(self):
+        self.database = _DatabaseConnection(
+            os.path.join(self._directory.name, "deltas.sqlite"),
+            province_keyframe_interval=3,
+        )
+        parser = get_parser("classic")
+        turns = [parser.parse().turn]
+        for _ in range(4):
+            turns.append(turns[-1].get_next_turn())
+        owners = ["Germany", "France", "France", "England", "Russia"]
+        for index, (turn, owner) in enumerate(zip(turns, owners)):
+            board = parser.parse()
+            board.get_province("Kiel").owner = board.get_player(owner)
+            self.save(1, board, turn, parent=turns[index - 1] if index else None)
+
+        connection = self.database._connection
+        stored = [
+            connection.execute(
+                "SELECT delta_depth, (SELECT COUNT(*) FROM provinces_encoded p WHERE p.board_id=b.board_id AND p.phase=b.phase) "
+                "FROM boards b WHERE phase=?",
+                (turn.get_indexed_name(),),
+            ).fetchone()
+            for turn in turns
+        ]
+        provinces = len(board.provinces)
+        self.assertEqual(
+            stored, [(0, provinces), (1, 1), (2, 0), (0, provinces), (1, 1)]
+        )
+
+        game = self.database.get_game(1)
+        for turn, owner in zip(turns, owners):
+            loaded = game.get_board(turn)
+            self.assertEqual(loaded.get_province("Kiel").owner.name, owner)
+            self.assertEqual(loaded.get_province("Paris").owner.name, "France")
+            self.assertEqual(
+                len(loaded.get_player("Germany").centers),
+                3 if owner == "Germany" else 2,
+            )
+
+        # Editing a delta board in place must not change its children
+        edited = game.get_board(turns[1])
+        self.database.detach_board(edited)
+        self.database.execute_arbitrary_sql(
+            "UPDATE provinces SET owner=? WHERE board_id=? and phase=? and province_name=?",
+            ("Italy", 1, turns[1].get_indexed_name(), "Kiel"),
+        )
+        self.database.delete_board(game.get_board(turns[3]))
+        game = self.database.get_game(1)
+        self.assertEqual(
+            game.get_board(turns[1]).get_province("Kiel").owner.name, "Italy"
+        )
+        self.assertEqual(
+            game.get_board(turns[2]).get_province("Kiel").owner.name, "France"
+        )
+        self.assertEqual(
+            game.get_board(turns[4]).get_province("Kiel").owner.name, "Russia"
+        )
+        self.assertEqual(
+            game.get_board(turns[4]).get_province("Paris").owner.name, "France"
+        )
+
+    def test_transaction(self):
+        parser = get_parser("classic")
+        board = parser.parse()
+        turn = board.turn
+        statements = []
+        self.database._connection.set_trace_callback(statements.append)
+        with self.database.transaction():
+            self.save(1, board, turn)
+            self.save(1, parser.parse(), turn.get_next_turn(), parent=turn)
+        self.database._connection.set_trace_callback(None)
+        self.assertEqual(statements.count("COMMIT"), 1)
+
+        with self.assertRaises(RuntimeError):
+            with self.database.transaction():
+                self.save(
+                    1,
+                    parser.parse(),
+                    turn.get_next_turn().get_next_turn(),
+                    parent=turn.get_next_turn(),
+                )
+                board.get_province("Kiel").owner = None
+                self.database.save_board(2, board)
+                raise RuntimeError()
+        self.assertEqual(len(self.database.get_game(1).all_turns()[0]), 2)
+        self.assertEqual(self.database.get_games([2]), {})
+
+        # Writes after a rolled back transaction still work
+        self.save(2, board, turn)
+        self.assertIsNone(
+            self.database.get_game(2).get_board(turn).get_province("Kiel").owner
+        )
+
+    def test_read_snapshots(self):
+        parser = get_parser("classic")
+        board = parser.parse()
+        turn = board.turn
+        self.save(1, board, turn)
+        with self.database._read_cursor() as cursor:
+            self.assertEqual(
+                cursor.execute("SELECT COUNT(*) FROM boards").fetchone()[0], 1
+            )
+            # Commits made after the read started aren't seen by it
+            self.save(1, parser.parse(), turn.get_next_turn(), parent=turn)
+            self.assertEqual(
+                cursor.execute("SELECT COUNT(*) FROM boards").fetchone()[0], 1
+            )
+            with self.assertRaises(sqlite3.OperationalError):
+                cursor.execute("DELETE FROM boards")
+        self.assertEqual(len(self.database.get_game(1).all_turns()[0]), 2)
+
+        # Inside a transaction, reads see its uncommitted writes
+        with self.database.transaction():
+            self.save(
+                1,
+                parser.parse(),
+                turn.get_next_turn().get_next_turn(),
+                parent=turn.get_next_turn(),
+            )
+            self.assertEqual(
+                self.database.get_game(1).all_turns()[0][-1],
+                turn.get_next_turn().get_next_turn(),
+            )
+
+    def test_game_parameters_are_cached(self):
+        parser = get_parser("classic")
+        turn = parser.parse().turn
+        self.save(1, parser.parse(), turn)
+        self.save(1, parser.parse(), turn.get_next_turn(), parent=turn)
+        self.database.execute_arbitrary_sql(
+            "INSERT INTO board_parameters (board_id, parameter_key, parameter_value) VALUES (?, ?, ?)",
+            (1, "players/France/nickname", "Gaul"),
+        )
+
+        game = self.database.get_game(1)
+        first, second = game.get_board(turn), game.get_board(turn.get_next_turn())
+        self.assertIs(first.data, second.data)
+        self.assertIs(game.variant.data, first.data)
+        self.assertEqual(second.data["players"]["France"]["nickname"], "Gaul")
+        self.assertIs(second.get_player("Gaul"), second.get_player("France"))
+        self.assertIsNot(parser.parse().data, first.data)
+        self.assertNotIn("nickname", parser.parse().data["players"]["France"])
+
+        # Changes made behind the cache's back aren't seen until it's told about them
+        self.database.execute_arbitrary_sql(
+            "UPDATE board_parameters SET parameter_value=? WHERE board_id=?",
+            ("Frankia", 1),
+        )
+        self.database.execute_arbitrary_sql(
+            "UPDATE players SET points=? WHERE board_id=?", (7, 1)
+        )
+        self.assertIn(1, self.database._game_parameters)
+        game = self.database.get_game(1)
+        self.assertEqual(
+            game.get_board(turn).data["players"]["France"]["nickname"], "Gaul"
+        )
+
+        self.database.invalidate_game_parameters(1)
+        game = self.database.get_game(1)
+        self.assertEqual(
+            game.get_board(turn).data["players"]["France"]["nickname"], "Frankia"
+        )
+        self.assertEqual(game.get_board(turn).get_player("France").points, 7)
+
+        # Saving a board rewrites the players rows
+        board = game.get_board(turn.get_next_turn())
+        board.get_player("France").points = 12
+        self.save(
+            1, board, turn.get_next_turn().get_next_turn(), parent=turn.get_next_turn()
+        )
+        self.assertEqual(
+            self.database.get_game(1).get_board(turn).get_player("France").points, 12
+        )
+
+    def test_submitted_orders(self):
+        turn = get_parser("classic").parse().turn
+        self.save(1, get_parser("classic").parse(), turn)
+        board = self.database.get_game(1).get_board(turn)
+        paris = board.get_province("Paris").unit
+        brest = board.get_province("Brest").unit
+        paris.order = Move(destination=board.get_province("Burgundy"))
+        brest.order = Hold()
+        phase = turn.get_indexed_name()
+
+        self.assertEqual(
+            self.database.save_submitted_orders(
+                1, {phase: order_rows(board, [paris, brest])}, "France"
+            ),
+            2,
+        )
+        # The same orders again write nothing, and aren't journaled
+        self.assertEqual(
+            self.database.save_submitted_orders(
+                1, {phase: order_rows(board, [paris, brest])}, "France"
+            ),
+            0,
+        )
+        brest.order = Move(destination=board.get_province("Mid-Atlantic Ocean"))
+        self.assertEqual(
+            self.database.save_submitted_orders(
+                1, {phase: order_rows(board, [paris, brest])}, "France"
+            ),
+            1,
+        )
+
+        loaded = self.database.get_game(1).get_board(turn)
+        self.assertIsInstance(loaded.get_province("Paris").unit.order, Move)
+        self.assertEqual(
+            loaded.get_province("Brest").unit.order.destination.name,
+            "Mid-Atlantic Ocean",
+        )
+
+        journal = self.database.get_order_journal(1)
+        self.assertEqual(
+            [
+                (entry_phase, submitted_by, len(changes))
+                for _, entry_phase, _, submitted_by, changes in journal
+            ],
+            [
+                (phase, "France", 2),
+                (phase, "France", 1),
+            ],
+        )
+        self.assertEqual(
+            self.database.replay_orders(1, phase, until=journal[0][0])[
+                ("Brest", False)
+            ][0],
+            "Hold",
+        )
+        self.assertEqual(
+            self.database.replay_orders(1, phase)[("Brest", False)][:2],
+            ("Move", "T1S1901 Mid-Atlantic Ocean"),
+        )
+
+        self.database.delete_board(board)
+        self.assertEqual(self.database.get_order_journal(1), [])
+
+    def test_archive_game(self):
+        self.database = _DatabaseConnection(
+            os.path.join(self._directory.name, "archive.sqlite"),
+            province_keyframe_interval=3,
+        )
+        parser = get_parser("classic")
+        turn = parser.parse().turn
+        retreats = turn.get_next_turn()
+        self.save(1, parser.parse(), turn)
+        board = parser.parse()
+        board.get_province("Kiel").owner = board.get_player("France")
+        portugal = board.get_province("Portugal")
+        board.create_unit(
+            UnitType.FLEET,
+            board.get_player("France"),
+            portugal,
+            None,
+            {board.get_province_and_coast("Spain nc")},
+        )
+        self.save(1, board, retreats, parent=turn)
+        self.database.execute_arbitrary_sql(
+            "INSERT INTO board_parameters (board_id, parameter_key, parameter_value) VALUES (?, ?, ?)",
+            (1, "players/France/nickname", "Gaul"),
+        )
+        self.save(2, parser.parse(), turn)
+        before = self.database.get_game(1)
+
+        self.assertGreater(self.database.archive_game(1), 0)
+        self.assertEqual(self.database.get_game_ids(), {1, 2})
+        self.assertEqual(set(self.database.get_games()), {2})
+        for table in (
+            "boards",
+            "provinces_encoded",
+            "units_encoded",
+            "retreat_options_encoded",
+            "players",
+            "board_parameters",
+        ):
+            self.assertEqual(
+                self.database._connection.execute(
+                    f"SELECT COUNT(*) FROM {table} WHERE board_id=1"
+                ).fetchone(),
+                (0,),
+            )
+        self.assertEqual(
+            self.database._connection.execute("PRAGMA freelist_count").fetchone(), (0,)
+        )
+        with self.assertRaises(ValueError):
+            self.database.archive_game(1)
+
+        self.database.restore_game(1)
+        self.assertFalse(self.database.is_archived(1))
+        after = self.database.get_game(1)
+        for loaded_turn in (turn, retreats):
+            self.assertTrue(
+                boards_equal(
+                    before.get_board(loaded_turn), after.get_board(loaded_turn)
+                )
+            )
+        later = after.get_board(retreats)
+        self.assertEqual(later.get_province("Kiel").owner.name, "France")
+        self.assertEqual(later.data["players"]["France"]["nickname"], "Gaul")
+        self.assertEqual(
+            {
+                province.name
+                for province, _ in later.get_province(
+                    "Portugal"
+                ).dislodged_unit.retreat_options
+            },
+            {"Spain"},
+        )
+        with self.assertRaises(ValueError):
+            self.database.restore_game(1)
+
+    def test_backup(self):
+        parser = get_parser("classic")
+        turn = parser.parse().turn
+        self.save(1, parser.parse(), turn)
+        before = self.database.get_game(1)
+        directory = os.path.join(self._directory.name, "backups")
+
+        # Commits made while the backup is copied, one page at a time, don't keep it from finishing
+        done = threading.Event()
+
+        def write():
+            count = 0
+            while not done.is_set():
+                count += 1
+                self.database.execute_arbitrary_sql(
+                    "INSERT INTO board_parameters (board_id, parameter_key, parameter_value) VALUES (?, ?, ?)",
+                    (2, f"key {count}", "value"),
+                )
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            path = self.database.backup(directory, keep=2, pages_per_step=1)
+        finally:
+            done.set()
+            writer.join()
+        self.database.backup(directory, keep=2, pages_per_step=1)
+        newest = self.database.backup(directory, keep=2, pages_per_step=1)
+        self.assertFalse(path.exists())
+        self.assertEqual(len(os.listdir(directory)), 2)
+
+        restored_file = os.path.join(self._directory.name, "restored.sqlite")
+        with (
+            gzip.open(newest, "rb") as compressed,
+            open(restored_file, "wb") as restored,
+        ):
+            shutil.copyfileobj(compressed, restored)
+        restored = _DatabaseConnection(restored_file)
+        self.assertTrue(
+            boards_equal(before.get_board(turn), restored.get_game(1).get_board(turn))
+        )
+        self.assertEqual(
+            restored._connection.execute(
+                "SELECT COUNT(*) FROM board_parameters WHERE board_id=2"
+            ).fetchone(),
+            self.database._connection.execute(
+                "SELECT COUNT(*) FROM board_parameters WHERE board_id=2"
+            ).fetchone(),
+        )
+
+    def test_memory_backend(self):
+        database = open_database("memory")
+        self.assertFalse(database.persistent)
+        self.assertTrue(self.database.persistent)
+        board = get_parser("classic").parse()
+        board.board_id = 1
+        database.save_board(1, board)
+        game = database.get_game(1)
+        self.assertTrue(boards_equal(board, game.get_board(board.turn)))
+        with self.assertRaises(ValueError):
+            database.backup(self._directory.name, keep=1, pages_per_step=1)
+        with self.assertRaises(ValueError):
+            open_database("postgres")
+
+    def test_game_snapshots(self):
+        # Reads go through the writer connection so the trace sees them
+        self.database = _DatabaseConnection(
+            os.path.join(self._directory.name, "snapshots.sqlite"),
+            province_keyframe_interval=3,
+            read_connections=0,
+        )
+        parser = get_parser("classic")
+        turn = parser.parse().turn
+        retreats = turn.get_next_turn()
+        self.save(1, parser.parse(), turn)
+        board = parser.parse()
+        board.get_province("Kiel").owner = board.get_player("France")
+        portugal = board.get_province("Portugal")
+        board.create_unit(
+            UnitType.FLEET,
+            board.get_player("France"),
+            portugal,
+            None,
+            {board.get_province_and_coast("Spain nc")},
+        )
+        self.save(1, board, retreats, parent=turn)
+        # Saving a board bumps the game's revision once, however many rows it writes
+        [revision] = self.database._connection.execute(
+            "SELECT revision FROM game_revisions WHERE board_id=1"
+        ).fetchone()
+        self.assertEqual(revision, 2)
+        self.database.execute_arbitrary_sql(
+            "INSERT INTO board_parameters (board_id, parameter_key, parameter_value) VALUES (?, ?, ?)",
+            (1, "players/France/nickname", "Gaul"),
+        )
+
+        statements = []
+        self.database._connection.set_trace_callback(statements.append)
+        from_tables = self.database.get_games([1], use_snapshots=True)[1]
+        self.assertTrue(any("FROM units" in statement for statement in statements))
+        statements.clear()
+        restored = self.database.get_games(use_snapshots=True)[1]
+        self.assertFalse(any("FROM units" in statement for statement in statements))
+        self.database._connection.set_trace_callback(None)
+
+        for loaded_turn in (turn, retreats):
+            self.assertTrue(
+                boards_equal(
+                    from_tables.get_board(loaded_turn), restored.get_board(loaded_turn)
+                )
+            )
+        later = restored.get_board(retreats)
+        self.assertEqual(later.get_province("Kiel").owner.name, "France")
+        self.assertEqual(later.get_province("Paris").owner.name, "France")
+        self.assertEqual(later.data["players"]["France"]["nickname"], "Gaul")
+        self.assertEqual(
+            {
+                province.name
+                for province, _ in later.get_province(
+                    "Portugal"
+                ).dislodged_unit.retreat_options
+            },
+            {"Spain"},
+        )
+
+        # Any change to the game's rows makes its snapshot out of date, even one made behind the connection's back
+        self.database.execute_arbitrary_sql(
+            "UPDATE provinces SET owner=? WHERE board_id=? and phase=? and province_name=?",
+            ("Italy", 1, retreats.get_indexed_name(), "Kiel"),
+        )
+        # including deleting a build order through the builds view, as remove_player_order_for_province does
+        self.database.save_build_orders(
+            1, retreats.get_indexed_name(), [("France", "Paris", True, True)], []
+        )
+        revision_sql = "SELECT revision FROM game_revisions WHERE board_id=1"
+        [revision] = self.database._connection.execute(revision_sql).fetchone()
+        self.database.execute_arbitrary_sql(
+            "DELETE FROM builds WHERE board_id=? and phase=? and location=?",
+            (1, retreats.get_indexed_name(), "Paris"),
+        )
+        self.assertEqual(
+            self.database._connection.execute(revision_sql).fetchone(), (revision + 1,)
+        )
+        # The triggers that bumped the revision for them don't outlast the statements
+        self.assertEqual(
+            self.database._connection.execute(
+                "SELECT COUNT(*) FROM sqlite_temp_master"
+            ).fetchone(),
+            (0,),
+        )
+        restored = self.database.get_games([1], use_snapshots=True)[1]
+        self.assertEqual(
+            restored.get_board(retreats).get_province("Kiel").owner.name, "Italy"
+        )
+        # and so does a change to the variant's files
+        self.database.execute_arbitrary_sql(
+            "UPDATE game_snapshots SET fingerprint=? WHERE board_id=?", ("old", 1)
+        )
+        with self.assertLogs("DiploGM.db.database", "INFO") as logs:
+            self.database.get_games([1], use_snapshots=True)
+        self.assertTrue(any("another version" in message for message in logs.output))
+        self.assertEqual(
+            self.database.get_games([1], use_snapshots=True)[1]
+            .get_board(retreats)
+            .get_province("Kiel")
+            .owner.name,
+            "Italy",
+        )
+
+        # Snapshots only hold plain values, so one written by something else can't run code when it's read
+        with self.assertRaises(ValueError):
+            _decode_snapshot(1, zlib.compress(pickle.dumps(print)), ())
+
+        self.database.total_delete(later)
+        self.assertEqual(self.database.get_games(use_snapshots=True), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,64 @@
 import unittest
+from unittest import mock
 
+from DiploGM.db.database import _BoardSource
 from DiploGM.models.unit import UnitType
-from test.utils import BoardBuilder,GameBuilder
+from test.utils import BoardBuilder,GameBuilder,game_state
+from DiploGM.models.order import Hold
+from DiploGM.models.province import PROVINCE_ID_BITS
+from DiploGM.models.turn import PhaseName, Turn
 from DiploGM.parse_order import parse_order
 
 import logging
 import sys
 
+
+def play_orders(g: GameBuilder, path: str):
+    with open(path) as orders_file:
+        orders = None
+        c = None
+        for line in orders_file:
+            line = line.strip()
+
+            if not line:
+                continue
+            if line.startswith("TURN") or line.startswith("RETREATS"):
+                #print("reading turn", line)
+                if orders is not None:
+                    for c in g.game.variant.players:
+                        #print("PLAYER",c.name)
+                        #print(orders[c.name])
+                        messages = parse_order("\n".join([".orders"]+orders[c.name]),c, g.game )["messages"]
+                        if any( "\x1b[0;31m" in m for m in messages):
+                            for message in messages:
+                                print(message)
+                            print("\x1b[0;39m")
+                            #raise Exception("Bad orders")
+                    g.adjudicate()
+                    if line.startswith("TURN") and g.game.can_skip_retreats():
+                        g.adjudicate()
+                    if "4" in line:
+                        pass
+                        #break
+                    #break
+                orders = {c.name:[] for c in g.game.variant.players}
+            elif line[-1]==":":
+                if line[:-1] in orders:
+                    #print("reading country", line)
+                    c = line[:-1]
+                else:
+                    assert line.startswith("T")
+                    #print("reading T", line)
+                    for os in orders.values():
+                        os.append(line[:-1].strip())
+            else:
+                """line = line.replace("_S"," sc")
+                line = line.replace("_E"," ec")
+                line = line.replace("_W"," wc")
+                line = line.replace("_N"," nc")"""
+                orders[c].append(line)
+
+
 class TestGame(unittest.TestCase):
     def test_game_1(self):
         root = logging.getLogger("DiploGM.parse_order")
@@ -20,51 +72,142 @@ class TestGame(unittest.TestCase):
         #root.addHandler(handler)
         g = GameBuilder(empty=False)
         b = g.bb
+        play_orders(g, "test/hTurn5.txt")
 
-        with open("test/hTurn5.txt") as orders_file:
-            orders = None
-            c = None
-            for line in orders_file:
-                line = line.strip()
-
-                if not line:
-                    continue
-                if line.startswith("TURN") or line.startswith("RETREATS"):
-                    #print("reading turn", line)
-                    if orders is not None:
-                        for c in g.game.variant.players:
-                            #print("PLAYER",c.name)
-                            #print(orders[c.name])
-                            messages = parse_order("\n".join([".orders"]+orders[c.name]),c, g.game )["messages"]
-                            if any( "\x1b[0;31m" in m for m in messages):
-                                for message in messages:
-                                    print(message)
-                                print("\x1b[0;39m")
-                                #raise Exception("Bad orders")
-                        g.adjudicate()
-                        if line.startswith("TURN") and g.game.can_skip_retreats():
-                            g.adjudicate()
-                        if "4" in line:
-                            pass
-                            #break
-                        #break
-                    orders = {c.name:[] for c in g.game.variant.players}
-                elif line[-1]==":":
-                    if line[:-1] in orders:
-                        #print("reading country", line)
-                        c = line[:-1]
-                    else:
-                        assert line.startswith("T")
-                        #print("reading T", line)
-                        for os in orders.values():
-                            os.append(line[:-1].strip())
-                else:
-                    """line = line.replace("_S"," sc")
-                    line = line.replace("_E"," ec")
-                    line = line.replace("_W"," wc")
-                    line = line.replace("_N"," nc")"""
-                    orders[c].append(line)
+    def test_live_game_matches_reload(self):
+        # Adjudication adds its boards to the live game instead of reloading it; it should end up the same anyway
+        test = self
+
+        class CheckedGameBuilder(GameBuilder):
+            def adjudicate(self):
+                super().adjudicate()
+                test.assertIs(self.game, self.bb._manager._boards[self.game.board_id])
+                test.assertEqual(game_state(self.game), game_state(self.bb._manager._database.get_game(self.game.board_id)))
+
+        g = CheckedGameBuilder(empty=False)
+        play_orders(g, "test/hTurn5.txt")
+        self.assertGreater(len(g.game.all_turns()), 1)
+
+    def test_lazy_game_matches_reload(self):
+        # Each turn is adjudicated on a game loaded with lazy=True, which builds its older boards as they're used
+        test = self
+        placeholders = []
+
+        class LazyGameBuilder(GameBuilder):
+            def adjudicate(self):
+                super().adjudicate()
+                manager = self.bb._manager
+                test.assertEqual(game_state(self.game), game_state(manager._database.get_game(self.game.board_id)))
+                manager._boards[self.game.board_id] = manager._database.get_games([self.game.board_id], lazy=True)[self.game.board_id]
+                self.game = manager.get_game(self.game.board_id)
+                placeholders.append(len(list(self.game.placeholders())))
+
+        g = LazyGameBuilder(empty=False)
+        play_orders(g, "test/hTurn5.txt")
+        self.assertGreater(max(placeholders), 0)
+
+        game = g.game
+        turn = next(game.placeholders()).turn
+        self.assertNotIn(turn, [board.turn for board in game.loaded_boards()])
+        board = game.get_board(turn)
+        self.assertIs(game.get_board(turn), board)
+        self.assertIs(game.get_board_or_placeholder(turn), board)
+        self.assertEqual(len(list(game.placeholders())), placeholders[-1] - 1)
+
+    def test_orders_copied_onto_placeholders(self):
+        g = GameBuilder(empty=False)
+        manager = g.bb._manager
+        database = manager._database
+        # Up to spring 1903, so that the 1901 moves boards are left as placeholders
+        for _ in range(10):
+            manager._boards[g.game.board_id] = database.get_games([g.game.board_id], lazy=True)[g.game.board_id]
+            g.game = manager.get_game(g.game.board_id)
+            g.adjudicate()
+        self.assertEqual(game_state(g.game), game_state(database.get_game(g.game.board_id)))
+        game = database.get_games([g.game.board_id], lazy=True)[g.game.board_id]
+        turn = game.all_turns()[0][0]
+        self.assertTrue(turn.is_moves())
+        self.assertNotIn(turn, [board.turn for board in game.loaded_boards()])
+
+        # Orders copied onto a board that's still a placeholder show up once it's built
+        copied = database.get_game(game.board_id).get_board(turn)
+        unit = next(iter(copied.units))
+        unit.order = Hold()
+        unit.order.hasFailed = True
+        database.copy_orders(game, [copied])
+        province, _ = game.get_board(turn).get_location(unit.province.name)
+        self.assertIsInstance(province.unit.order, Hold)
+        self.assertTrue(province.unit.order.hasFailed)
+
+    def test_adjudicating_leaves_placeholders_unbuilt(self):
+        g = GameBuilder(empty=False)
+        manager = g.bb._manager
+        database = manager._database
+        for _ in range(10):
+            g.adjudicate()
+        manager._boards[g.game.board_id] = database.get_games([g.game.board_id], lazy=True)[g.game.board_id]
+        g.game = manager.get_game(g.game.board_id)
+        placeholders = {placeholder.turn for placeholder in g.game.placeholders()}
+        self.assertTrue(any(turn.is_moves() for turn in placeholders))
+
+        # Neither the live game nor the copy the moves are adjudicated on builds boards no orders involve
+        built = []
+        build = _BoardSource.build
+
+        def recording_build(source, placeholder, game):
+            built.append(placeholder.turn)
+            return build(source, placeholder, game)
+
+        with mock.patch.object(_BoardSource, "build", recording_build):
+            g.adjudicate()
+        self.assertEqual(built, [])
+        self.assertEqual(placeholders, {placeholder.turn for placeholder in g.game.placeholders()})
+        self.assertEqual(game_state(g.game), game_state(database.get_game(g.game.board_id)))
+
+    def test_cross_board_adjacency(self):
+        g = GameBuilder(empty=False)
+        for _ in range(4):
+            g.adjudicate()
+        game = g.game
+        spring, fall = game.get_board(game.all_turns()[0][0]), game.get_board(game.all_turns()[0][2])
+        self.assertEqual(game.adjacency.linked_boards(spring), [fall])
+
+        # Worked out from the variant, as linking every pair of boards used to store them
+        for province in spring.provinces:
+            variant_province = game.variant.get_province(province.name)
+            expected = {fall.get_province(p.name) for p in variant_province.adjacent} | {fall.get_province(province.name)}
+            self.assertEqual({p for p in province.adjacent if p.board is fall}, expected)
+            self.assertFalse(any(p.board is fall for p in province._adjacent))
+            for other in fall.provinces:
+                self.assertEqual(province.is_adjacent(other), other in expected)
+            for coast in province.get_multiple_coasts() or [None]:
+                self.assertIn((fall.get_province(province.name), coast), province.get_coastal_adjacent(coast))
+
+        # Boards that are gone are no longer adjacent
+        while fall in game.loaded_boards():
+            game.remove_boards([game.all_turns()[0][-1]])
+        self.assertEqual(game.adjacency.linked_boards(spring), [])
+        self.assertFalse(any(p.board is fall for p in spring.get_province("Kiel").adjacent))
+
+    def test_fake_boards_are_kept(self):
+        g = GameBuilder(empty=False)
+        game = g.game
+        turn = Turn(year=1905, phase=PhaseName.FALL_MOVES, timeline=3, start_year=game.start_year)
+        board = game.get_board(turn)
+        self.assertTrue(board.isFake)
+        self.assertIs(game.get_board(Turn(year=1905, phase=PhaseName.FALL_MOVES, timeline=3)), board)
+        with self.assertRaises(AttributeError):
+            turn.timeline = 4
+        self.assertIs(board.turn, turn)
 
+        spain, coast = board.get_province_and_coast("Spain nc")
+        self.assertEqual(coast, "nc")
+        self.assertTrue(spain.isFake)
+        self.assertIs(board.get_province_and_coast("Spain nc")[0], spain)
+        self.assertEqual(board.get_province_and_coast("spa sc"), (spain, "sc"))
+        self.assertIs(board.get_province("Spain"), spain)
+        self.assertIs(game.get_turn_and_province(spain.order_str()), spain)
+        self.assertEqual(spain.key, (turn.key << PROVINCE_ID_BITS) | game.variant.get_province("Spain").id)
 
 
 #         russia_order = ".order\n" + \
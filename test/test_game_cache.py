@@ -0,0 +1,136 @@
+import os
+import tempfile
+import unittest
+
+# Importing the models before DiploGM.utils runs into a circular import
+import DiploGM.utils  # noqa: F401
+from DiploGM.db.database import _DatabaseConnection
+from DiploGM.game_cache import GameCache, estimated_size
+from DiploGM.map_parser.vector.vector import get_parser
+from test.utils import GameBuilder, test_game_id
+
+
+class TestGameCache(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        self.database = _DatabaseConnection(
+            os.path.join(self._directory.name, "test.sqlite"), read_connections=0
+        )
+        for board_id in (1, 2, 3):
+            board = get_parser("classic").parse()
+            board.board_id = board_id
+            self.database.save_board(board_id, board)
+        self.loads = []
+
+    def load(self, board_id):
+        self.loads.append(board_id)
+        return self.database.get_game(board_id)
+
+    def test_loads_on_first_use(self):
+        cache = GameCache(self.load, self.database.get_game_ids(), budget=10**9)
+        self.assertEqual(set(cache), {1, 2, 3})
+        self.assertIn(2, cache)
+        self.assertEqual(self.loads, [])
+
+        game = cache[2]
+        self.assertIs(cache[2], game)
+        self.assertEqual(self.loads, [2])
+        self.assertEqual(cache.loaded(), [2])
+        with self.assertRaises(KeyError):
+            cache[4]
+        stats = cache.stats()
+        self.assertEqual(
+            (stats["hits"], stats["misses"], stats["loaded games"]), (1, 1, 1)
+        )
+        self.assertGreater(stats["load time (s)"], 0)
+
+        # Only games of the given servers are known
+        self.assertEqual(self.database.get_game_ids([1, 3, 4]), {1, 3})
+
+    def test_evicts_least_recently_used(self):
+        size = estimated_size(self.database.get_game(1))
+        cache = GameCache(self.load, {1, 2, 3}, budget=2 * size)
+        cache[1]
+        cache[2]
+        cache[1]
+        cache[3]
+        # 2 was used longest ago
+        self.assertEqual(cache.loaded(), [1, 3])
+        self.assertEqual(cache.stats()["evictions"], 1)
+        cache[2]
+        self.assertEqual(self.loads, [1, 2, 3, 2])
+
+        # Even over budget, the game just asked for stays
+        cache.budget = 0
+        cache[1]
+        self.assertEqual(cache.loaded(), [1])
+
+    def test_pinned_games_stay(self):
+        size = estimated_size(self.database.get_game(1))
+        cache = GameCache(self.load, {1, 2, 3}, budget=size)
+        with cache.pinned(1):
+            cache.pin(1)
+            cache[1]
+            cache[2]
+            cache[3]
+            self.assertEqual(cache.loaded(), [1, 3])
+        # Still pinned once
+        self.assertTrue(cache.is_pinned(1))
+        cache.unpin(1)
+        self.assertFalse(cache.is_pinned(1))
+        self.assertEqual(cache.loaded(), [3])
+
+    def test_added_and_deleted_games(self):
+        cache = GameCache(self.load, {1}, budget=10**9)
+        cache[4] = self.database.get_game(1)
+        self.assertIn(4, cache)
+        self.assertEqual(self.loads, [])
+        del cache[4]
+        self.assertNotIn(4, cache)
+        with self.assertRaises(KeyError):
+            cache[4]
+
+    def test_locked_orders_survive_eviction(self):
+        manager = GameBuilder(empty=False).bb._manager
+        board_id = manager.get_game(test_game_id).board_id
+        game = manager.lock_orders(board_id)
+        self.addCleanup(manager.unlock_orders, board_id)
+        budget = manager._boards.budget
+        self.addCleanup(setattr, manager._boards, "budget", budget)
+        manager._boards.budget = 0
+        # Anything else loaded would push an unpinned game out
+        manager._boards[board_id + 1] = self.database.get_game(1)
+        self.addCleanup(manager._boards.pop, board_id + 1, None)
+        self.assertIs(manager.get_game(board_id), game)
+        self.assertFalse(any(board.orders_enabled for board in game.loaded_boards()))
+
+        # Locks carry over to the boards adjudication makes, and to reloads
+        manager.adjudicate(board_id)
+        self.assertFalse(
+            any(
+                board.orders_enabled
+                for board in manager.get_game(board_id).loaded_boards()
+            )
+        )
+        self.assertFalse(
+            any(
+                board.orders_enabled
+                for board in manager.get_game(board_id, reload=True).loaded_boards()
+            )
+        )
+
+        manager.unlock_orders(board_id)
+        self.assertFalse(manager._boards.is_pinned(board_id))
+        manager._boards[board_id + 1] = self.database.get_game(1)
+        self.assertNotIn(board_id, manager._boards.loaded())
+        self.assertTrue(
+            all(
+                board.orders_enabled
+                for board in manager.get_game(board_id).loaded_boards()
+            )
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
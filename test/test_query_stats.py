@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+
+# Importing the models before DiploGM.utils runs into a circular import
+import DiploGM.utils  # noqa: F401
+from DiploGM.db.database import _DatabaseConnection
+from DiploGM.db.query_stats import normalise_sql
+from DiploGM.map_parser.vector.vector import get_parser
+
+
+class TestQueryStats(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        self.database = _DatabaseConnection(
+            os.path.join(self._directory.name, "test.sqlite"), query_stats=True
+        )
+        self.stats = self.database.query_stats
+        assert self.stats is not None
+
+    def find(self, site: str, statement: str):
+        return [
+            stats
+            for stats in self.stats.statements()
+            if site in stats.site and stats.statement.startswith(statement)
+        ]
+
+    def test_statements_are_recorded(self):
+        board = get_parser("classic").parse()
+        board.board_id = 1
+        self.database.save_board(1, board)
+        self.stats.reset()
+
+        self.database.get_games([1, 2, 3])
+        self.database.get_games([1])
+        # Both loads add up to the same statements, whatever the number of ids
+        [provinces] = self.find(
+            "select_grouped", "SELECT board_id, phase, province_name"
+        )
+        self.assertEqual(provinces.calls, 2)
+        self.assertEqual(provinces.rows, 2 * len(board.provinces))
+        self.assertGreater(provinces.seconds, 0)
+        self.assertIn("?, ...", provinces.statement)
+        self.assertEqual(provinces.args, [1])
+
+        self.database.execute_arbitrary_sql(
+            "INSERT INTO board_parameters (board_id, parameter_key, parameter_value) VALUES (?, ?, ?)",
+            (1, "key", "value"),
+        )
+        [insert] = self.find("execute_arbitrary_sql", "INSERT INTO board_parameters")
+        self.assertEqual((insert.calls, insert.rows), (1, 1))
+
+        with self.assertLogs("DiploGM.db.query_stats", "WARNING"):
+            self.stats.slow_seconds = 1e-9
+            self.database.get_game_ids()
+
+    def test_query_report(self):
+        self.database.get_game_ids()
+        self.database.get_order_journal(1, "1901 Spring Moves Timeline 1")
+        report = self.database.query_report(explain=10)
+        self.assertIn("get_order_journal", report)
+        # The plan shows order_journal being searched through its index rather than scanned
+        self.assertIn("USING INDEX order_journal_by_board", report)
+        self.assertEqual(
+            self.database.explain_query_plan("SELECT * FROM no_such_table")[0][:9],
+            "(no plan:",
+        )
+
+    def test_normalise_sql(self):
+        self.assertEqual(
+            normalise_sql("SELECT a\n  FROM t WHERE b IN (?,?, ?) AND c = ?"),
+            "SELECT a FROM t WHERE b IN (?, ...) AND c = ?",
+        )
+        self.assertEqual(
+            normalise_sql("INSERT INTO t VALUES (?, ?)"), "INSERT INTO t VALUES (?, ?)"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from test.utils import GameBuilder
+
+
+class TestRollback(unittest.TestCase):
+    def test_rollback_keeps_the_live_game(self):
+        g = GameBuilder(empty=False)
+        manager = g.bb._manager
+        # Spring moves, retreats, fall moves, retreats, builds, then the next spring
+        for _ in range(5):
+            g.adjudicate()
+        game = g.game
+        turns = [turn.get_indexed_name() for turn in game.all_turns()[0]]
+        self.assertEqual(len(turns), 6)
+        builds = game.get_board(game.all_turns()[0][-2])
+        fall = game.get_board(game.all_turns()[0][2])
+        fall_provinces = set(fall.provinces)
+        spring = game.get_board(game.all_turns()[0][0])
+        self.assertTrue(
+            any(province.adjacent & fall_provinces for province in spring.provinces)
+        )
+
+        # Builds -> spring has its own checkpoint, which the guess from the game's turns alone can't find
+        manager.rollback(game.board_id)
+        self.assertIs(manager.get_game(game.board_id), game)
+        self.assertEqual(
+            [turn.get_indexed_name() for turn in game.all_turns()[0]], turns[:5]
+        )
+        self.assertIs(game.get_board(game.all_turns()[0][-1]), builds)
+
+        manager.rollback(game.board_id)
+        manager.rollback(game.board_id)
+        # Without checkpoints, e.g. after a restart, rollback goes by the game's turns
+        manager._checkpoints.clear()
+        manager.rollback(game.board_id)
+        self.assertEqual(
+            [turn.get_indexed_name() for turn in game.all_turns()[0]], turns[:2]
+        )
+        self.assertIs(game.get_board(game.all_turns()[0][0]), spring)
+        for province in spring.provinces:
+            self.assertFalse(province.adjacent & fall_provinces)
+
+        # The database agrees with the live game
+        reloaded = manager._database.get_game(game.board_id)
+        self.assertEqual(
+            [turn.get_indexed_name() for turn in reloaded.all_turns()[0]], turns[:2]
+        )
+
+        manager.rollback(game.board_id)
+        with self.assertRaises(ValueError):
+            manager.rollback(game.board_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
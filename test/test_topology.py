@@ -0,0 +1,188 @@
+import unittest
+from unittest import mock
+
+# Importing the models before DiploGM.utils runs into a circular import
+import DiploGM.utils  # noqa: F401
+from DiploGM.map_parser.vector.vector import get_parser
+from DiploGM.adjudicator.adjudicator import _validate_move_army, convoy_is_possible
+from DiploGM.models import topology
+from DiploGM.models.province import ProvinceType
+from DiploGM.models.turn import Turn
+from DiploGM.models.unit import Unit, UnitType
+from test.utils import GameBuilder
+
+
+class TestTopology(unittest.TestCase):
+    def test_boards_share_static_data(self):
+        parser = get_parser("classic")
+        board1 = parser.parse()
+        board2 = parser.parse()
+        self.assertIs(board1.topology, board2.topology)
+
+        for province in board1.provinces:
+            other = board2.get_province(province.name)
+            self.assertIsNot(province, other)
+            self.assertIs(province.variant, other.variant)
+            self.assertIs(province.geometry, other.geometry)
+            self.assertIs(province.all_locs, other.all_locs)
+            self.assertEqual(
+                {p.name for p in province.adjacent}, {p.name for p in other.adjacent}
+            )
+            for adjacent in province.adjacent:
+                self.assertIs(adjacent, board1.get_province(adjacent.name))
+
+    def test_boards_do_not_share_state(self):
+        parser = get_parser("classic")
+        board1 = parser.parse()
+        board2 = parser.parse()
+
+        kiel1 = board1.get_province("Kiel")
+        kiel2 = board2.get_province("Kiel")
+        self.assertIsNot(kiel1.owner, kiel2.owner)
+        self.assertIs(kiel1.owner.board, board1)
+        self.assertIn(kiel1, kiel1.owner.centers)
+        self.assertEqual(kiel1.unit.unit_type, UnitType.FLEET)
+        self.assertIs(kiel1.unit.province, kiel1)
+
+        kiel1.unit = None
+        kiel1.owner = None
+        kiel1.adjacent.clear()
+        board1.data["players"].clear()
+        self.assertIsNotNone(kiel2.unit)
+        self.assertIsNotNone(kiel2.owner)
+        self.assertTrue(kiel2.adjacent)
+        self.assertTrue(parser.parse().data["players"])
+
+    def test_shared_province_data_is_read_only(self):
+        parser = get_parser("classic")
+        board1 = parser.parse()
+        board2 = parser.parse()
+
+        kiel1 = board1.get_province("Kiel")
+        with self.assertRaises(AttributeError):
+            kiel1.has_supply_center = False
+        with self.assertRaises(AttributeError):
+            kiel1.type = ProvinceType.SEA
+        self.assertTrue(board2.get_province("Kiel").has_supply_center)
+        self.assertEqual(board2.get_province("Kiel").type, ProvinceType.LAND)
+
+    def test_province_keys(self):
+        parser = get_parser("classic")
+        board = parser.parse()
+        for province in board.provinces:
+            province.set_turn(board.turn)
+        kiel = board.get_province("Kiel")
+        self.assertEqual(kiel.key & 0xFFFF, kiel.id)
+        self.assertEqual(
+            len({province.key for province in board.provinces}), len(board.provinces)
+        )
+        # The parsed template's provinces aren't numbered, so they have no key
+        template = parser._parse_svg().get_province("Kiel")
+        with self.assertRaises(ValueError):
+            template.set_turn(Turn(1901, board.turn.phase))
+        # Ids have to fit below the turn in Province.key
+        with (
+            mock.patch.object(topology, "PROVINCE_ID_BITS", 4),
+            self.assertRaises(ValueError),
+        ):
+            topology.VariantTopology(parser._parse_svg())
+
+    def test_coasts(self):
+        board = get_parser("classic").parse()
+        spain = board.get_province("Spain")
+        self.assertEqual(spain.get_multiple_coasts(), {"nc", "sc"})
+        for province, _ in spain.get_coastal_adjacent("nc"):
+            self.assertIs(province, board.get_province(province.name))
+
+    def assertMatchesAdjacencySets(self, board):
+        for province in board.provinces:
+            coasts = province.get_multiple_coasts() or {None}
+            for other in board.provinces:
+                self.assertEqual(
+                    _validate_move_army(province, other)[0],
+                    other in province.adjacent and other.type != ProvinceType.SEA,
+                )
+                for coast in coasts:
+                    fleet_adjacent = province.get_coastal_adjacent(coast)
+                    self.assertEqual(
+                        province.is_coastally_adjacent(other, coast),
+                        any(adjacent is other for adjacent, _ in fleet_adjacent),
+                    )
+                    for other_coast in other.get_multiple_coasts():
+                        self.assertEqual(
+                            province.is_coastally_adjacent((other, other_coast), coast),
+                            (other, other_coast) in fleet_adjacent,
+                        )
+
+            for coast in coasts:
+                for unit_type in (UnitType.ARMY, UnitType.FLEET):
+                    if (unit_type == UnitType.ARMY) != (
+                        province.type == ProvinceType.LAND
+                    ) and province.type != ProvinceType.ISLAND:
+                        continue
+                    unit = Unit(unit_type, None, province, coast, None)
+                    unit.add_retreat_options()
+                    if unit_type == UnitType.ARMY:
+                        expected = {
+                            (other, None)
+                            for other in province.adjacent
+                            if other.board is board and other.type != ProvinceType.SEA
+                        }
+                    else:
+                        expected = {
+                            (other, c)
+                            for other, c in province.get_coastal_adjacent(coast)
+                            if other.board is board
+                        }
+                    self.assertEqual(unit.retreat_options, expected)
+
+    def test_adjacency_sets_are_built_when_used(self):
+        board = get_parser("classic").parse()
+        self.assertTrue(
+            all(
+                province._adjacent is None and province._fleet_adjacent is None
+                for province in board.provinces
+            )
+        )
+        spain = board.get_province("Spain")
+        self.assertEqual(spain.get_multiple_coasts(), {"nc", "sc"})
+        self.assertIsNone(spain._fleet_adjacent)
+        self.assertEqual(board.get_location("Spain nc"), (spain, "nc"))
+        self.assertIn(board.get_province("Portugal"), spain.adjacent)
+        self.assertIn(
+            (board.get_province("Gascony"), None), spain.get_coastal_adjacent("nc")
+        )
+        self.assertNotIn(
+            (board.get_province("Marseilles"), None), spain.get_coastal_adjacent("nc")
+        )
+
+    def test_compiled_adjacency_matches_sets(self):
+        board = get_parser("classic").parse()
+        self.assertMatchesAdjacencySets(board)
+
+        london, norway = board.get_province("London"), board.get_province("Norway")
+        self.assertFalse(convoy_is_possible(london, norway))
+        board.get_province("North Sea").unit = Unit(
+            UnitType.FLEET, None, board.get_province("North Sea"), None, None
+        )
+        self.assertTrue(convoy_is_possible(london, norway))
+        self.assertFalse(convoy_is_possible(london, norway, check_fleet_orders=True))
+
+    def test_compiled_adjacency_with_5d_adjacency(self):
+        g = GameBuilder(empty=False)
+        # Spring 1901 gets linked to fall 1901 once that's been reached
+        g.adjudicate()
+        g.adjudicate()
+        board = g.game.get_board(g.game.all_turns()[0][0])
+        self.assertTrue(board.game.adjacency.linked_boards(board))
+        self.assertTrue(
+            any(
+                other.board is not board
+                for other in board.get_province("Kiel").adjacent
+            )
+        )
+        self.assertMatchesAdjacencySets(board)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import copy
+import pickle
+import unittest
+
+from DiploGM.models.turn import PhaseName, Turn
+
+
+class TestTurn(unittest.TestCase):
+    def test_turns_are_interned(self):
+        turn = Turn(1902, PhaseName.FALL_RETREATS, timeline=3)
+        self.assertIs(
+            Turn(year=1902, phase=PhaseName.FALL_RETREATS, timeline=3, start_year=1901),
+            turn,
+        )
+        self.assertIs(Turn.from_key(turn.key), turn)
+        self.assertIs(copy.copy(turn), turn)
+        self.assertIs(copy.deepcopy(turn), turn)
+        self.assertIs(pickle.loads(pickle.dumps(turn)), turn)
+        self.assertIs(Turn.turn_from_string(turn.get_indexed_name()), turn)
+        self.assertIsNone(Turn.turn_from_string("1902 Summer Moves Timeline 3"))
+        with self.assertRaises(AttributeError):
+            turn.year = 1903
+        self.assertEqual(
+            len({turn, Turn(1902, PhaseName.FALL_RETREATS, timeline=3)}), 1
+        )
+
+    def test_turns_order_within_timelines(self):
+        turns = [
+            Turn(-2, PhaseName.WINTER_BUILDS),
+            Turn(1901, PhaseName.SPRING_MOVES),
+            Turn(1901, PhaseName.WINTER_BUILDS),
+            Turn(1902, PhaseName.SPRING_RETREATS),
+            Turn(1901, PhaseName.SPRING_MOVES, timeline=2),
+        ]
+        self.assertEqual(sorted(reversed(turns)), turns)
+        self.assertEqual(Turn.from_key(turns[0].key).year, -2)
+        self.assertIs(turns[2].get_next_turn().get_previous_turn(), turns[2])
+
+    def test_codec(self):
+        for phase in PhaseName:
+            turn = Turn(1902, phase, timeline=3)
+            decoded, rest = Turn.from_code(f"{turn.code} Kiel")
+            self.assertEqual(rest, " Kiel")
+            # Retreats are written like the moves before them
+            self.assertIs(
+                decoded, turn.get_previous_turn() if turn.is_retreats() else turn
+            )
+        self.assertEqual(
+            Turn.from_code("T3Sr1902 Kiel"),
+            (Turn(1902, PhaseName.SPRING_RETREATS, timeline=3), " Kiel"),
+        )
+        self.assertEqual(
+            Turn.from_code("t1fr1901", retreats_only=True),
+            (Turn(1901, PhaseName.FALL_RETREATS), ""),
+        )
+        for bad in ["Kiel", "T1X1901", "T1Sp"]:
+            with self.assertRaises(ValueError):
+                Turn.from_code(bad)
+        with self.assertRaises(ValueError):
+            Turn.from_code("T1S1901", retreats_only=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
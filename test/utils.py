@@ -4,6 +4,7 @@ import tempfile
 from DiploGM.models.board import Board
 from DiploGM.models.game import Game
 from DiploGM.manager import Manager
+from DiploGM.db import database
 from DiploGM.models.order import (
     Core,
     Hold,
@@ -27,6 +28,40 @@ logger = logging.getLogger(__name__)
 map_file = open(os.path.join(tempfile.gettempdir(), "map.html"), mode="w")
 print("<style>body{width:max-content;}</style>", file=map_file)
 
+def game_state(game: Game) -> dict:
+    """Everything about a game's boards that loading it sets, with provinces of other boards by their order_str()."""
+    # Placeholders first, since building a board adds 5D adjacencies to the boards next to it
+    game.build_boards([turn for timeline in game.all_turns() for turn in timeline])
+    state = {}
+    for timeline in game.all_turns():
+        for turn in timeline:
+            board = game.get_board(turn)
+            state[turn.get_indexed_name()] = (
+                board.parent and board.parent.get_indexed_name(),
+                sorted(database._player_rows(board)),
+                sorted((player.name, sorted(vassal.name for vassal in player.vassals)) for player in board.players),
+                sorted(database._province_rows(board)),
+                sorted(database._unit_rows(board), key=str),
+                sorted(database._retreat_option_rows(board)),
+                sorted(database._build_rows(board)),
+                sorted(database._vassal_order_rows(board)),
+                sorted(
+                    (
+                        province.name,
+                        sorted(other.order_str() for other in province.adjacent),
+                        sorted(
+                            (coast, sorted((other.order_str(), other_coast or "") for other, other_coast in adjacent))
+                            for coast, adjacent in (
+                                province.fleet_adjacent.items() if isinstance(province.fleet_adjacent, dict) else [("", province.fleet_adjacent)]
+                            )
+                        ),
+                    )
+                    for province in board.provinces
+                ),
+            )
+    return state
+
+
 def title(title):
     print(f"<h1>{title.upper()}</h1>", file = map_file)
 